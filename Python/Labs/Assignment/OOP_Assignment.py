@@ -8,84 +8,680 @@
 # A mystery adventure game where the user must solve a puzzle on each level to be able to advance through the game
 # During the game, the player will interact with NPCs, collect clues, and solve puzzles to progress through the levels
 # The game consists of multiple levels, each with its own unique puzzle to solve
+# The text, NPCs, clues and puzzles of the levels are kept in content/levels.json, see content_pack.py
+# Every puzzle answer is checked the same way, against hashed answers, see puzzles.py
 # The game is played in the terminal and the user must input their choices
+# Many players can also play at once over the network, see mystery_server.py
+# The game can also be played through a generated mansion with thousands of rooms, see mansion_generator.py
+# Levels publish what the player finds as events, and the game keeps its state and saves from them, see events.py
+# Running with --metrics <prefix> times every command, level and save, and writes <prefix>.prom and <prefix>.json
+# Menu commands can also be typed as words (e.g. search, s), and several can be given on one line: 3;4 legacy;7
+# Running with --record FILE records the session so it can be replayed and checked later, see recording.py
 # This project is a demonstration of object oriented programming and the use of object oriented concepts such as inheritance, encapsulation, and polymorphism
 # The project also demonstrates the use of classes, objects, and methods in Python
 #
-# The game is saved and loaded using a JSON file to store the game state
+# The game is saved and loaded using a JSON file to store the game state, with a journal of changes written after it
+# Saves can instead be kept in an SQLite database with one save per player by running with --sqlite <database>
+# or as compact binary files with one save per player by running with --binary <folder> (zlib compressed with --compress)
+# A damaged save stops the game with an error instead of being loaded with missing parts
 # The game is automatically saved when the player completes a level
 # The player will be prompted to load the game if a save file is found
 # The player can also choose to start a new game if they wish
 
 
+import sys
+import math
 import time
 import random
-import json
+import asyncio
+import inspect
+from collections import deque
+import argparse
 from pathlib import Path
+from functools import partial
+from operator import attrgetter
 from abc import ABC, abstractmethod
 
+from save_storage import (JsonSaveBackend, SQLiteSaveBackend, BinarySaveBackend, CorruptSaveError, check_header,
+                          state_field, has_type)
+from content_pack import load_content_pack
+from mansion_generator import MansionGenerator
+from puzzles import Puzzle, AttemptLimiter, PUZZLE_GENERATORS
+from events import (Event, EventBus, StatementFound, MotiveFound, ItemAwarded, LevelSolved, SessionStats,
+                    EventLogger)
+from metrics import Metrics, NO_METRICS
+from history import History
+from autosave import Autosaver
+from recording import SessionRecorder
+
+
+# Times the pauses between lines of narrative for one player
+# The pauses are awaited, so they never hold up other players, and each player can skip or speed them up
+class Pacer:
+    def __init__(self, speed=1.0, enabled=True):
+        """
+        speed divides every pause (2 plays the narrative twice as fast), enabled=False turns the pauses off,
+        e.g. when nobody is watching
+        """
+
+        self.speed = speed
+        self.enabled = enabled
+        self.skipping = False  # Set when the player skips, until the game next asks them something
+
+    def delay(self, seconds):
+        """
+        How long to actually wait for a pause of `seconds`
+        """
+
+        if not self.enabled or self.skipping or self.speed <= 0:
+            return 0
+        return seconds / self.speed
+
+    def skip(self):
+        """
+        Skip the rest of the pauses until the next prompt
+        """
+
+        self.skipping = True
+
+    def fast_forward(self, factor=2):
+        """
+        Play the narrative faster for the rest of the session
+        """
+
+        self.speed *= factor
+
+    def prompt_shown(self):
+        """
+        The game is asking the player something, so the next narrative is paced normally again
+        """
+
+        self.skipping = False
+
+
+# Collects everything written for one screen and sends it to the player in one write
+# A screen is sent when the game waits for the player (a prompt or a pause) or when it grows past high_water,
+# so a command costs one write to the terminal or socket instead of one per line
+class Renderer:
+    def __init__(self, send, flush_policy="screen", high_water=64 * 1024):
+        """
+        send is called with the text of each screen
+        flush_policy="line" sends every line straight away instead, one write per line like the game used to do
+        """
+
+        self.send = send
+        self.flush_policy = flush_policy
+        self.high_water = high_water
+        self._parts = []
+        self._size = 0
+        self.writes = 0  # How many times send has been called
+
+    def write(self, text):
+        """
+        Add a line to the current screen
+        """
+
+        if self.flush_policy == "line":
+            for line in text.split("\n"):
+                self.writes += 1
+                self.send(line + "\n")
+            return
+
+        self._parts.append(text)
+        self._parts.append("\n")
+        self._size += len(text) + 1
+        if self._size >= self.high_water:
+            self.flush()
+
+    def flush(self, prompt=""):
+        """
+        Send the current screen, followed by the prompt if there is one
+        """
+
+        if prompt:
+            self._parts.append(prompt)
+        if not self._parts:
+            return
+
+        text = "".join(self._parts)
+        self._parts.clear()
+        self._size = 0
+        self.writes += 1
+        self.send(text)
+
+
+# Base class for the input/output channel used by the game
+# All of the game's text goes through one of these instead of calling print() and input() directly
+# Reading is awaited, so many games can share one event loop while each waits for its player (see mystery_server.py)
+class GameIO(ABC):
+    def __init__(self, pacer=None):
+        # Channels without a pacer do not pause at all
+        self.pacer = pacer if pacer is not None else Pacer(enabled=False)
+
+    @abstractmethod
+    async def read(self, prompt=""):
+        """
+        Show the prompt and return the player's answer
+        """
+        pass
+
+    @abstractmethod
+    def write(self, text=""):
+        """
+        Show a line of text to the player
+        """
+        pass
+
+    def flush(self):
+        """
+        Send anything written so far, for channels that collect their output into screens
+        """
+        pass
+
+    async def pause(self, seconds):
+        """
+        Wait between lines of narrative, for as long as the pacer says
+        """
+
+        delay = self.pacer.delay(seconds)
+        if delay > 0:
+            self.flush()  # Show the story so far before waiting
+            await asyncio.sleep(delay)
+
+
+class ConsoleIO(GameIO):
+    def __init__(self, pacer=None, renderer=None):
+        """
+        Keep the dramatic pauses when someone is playing in the terminal, but not when the input is piped in
+        Output is collected into one write per screen, flushed before every prompt
+        """
+
+        super().__init__(pacer if pacer is not None else Pacer(enabled=sys.stdin.isatty()))
+        self.renderer = renderer if renderer is not None else Renderer(self.send, high_water=8 * 1024)
+
+    def send(self, text):
+        """
+        Write a whole screen to the terminal at once
+        """
+
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    async def read(self, prompt=""):
+        """
+        Read the player's answer from the terminal
+        The terminal only has one player, so waiting on input() here does not hold up anyone else
+        """
+
+        self.renderer.flush(prompt)  # The prompt goes out in the same write as the rest of the screen
+        return input()
+
+    def write(self, text=""):
+        """
+        Add the text to the screen being printed
+        """
+
+        self.renderer.write(text)
+
+    def flush(self):
+        """
+        Print whatever is left of the screen
+        """
+
+        self.renderer.flush()
+
+
+class ScriptedIO(GameIO):
+    def __init__(self, inputs):
+        """
+        Feed the game a scripted list of answers and capture everything it writes
+        Used to run the game without a terminal, e.g. for benchmarks
+        """
+
+        super().__init__()  # Scripted runs never pause
+        self._inputs = iter(inputs)
+        self.output = []  # Every line written by the game
+
+    async def read(self, prompt=""):
+        """
+        Return the next scripted answer, raising EOFError like input() once the script runs out
+        """
+
+        self.output.append(prompt)
+        try:
+            return next(self._inputs)
+        except StopIteration:
+            raise EOFError("The scripted input has run out") from None
+
+    def write(self, text=""):
+        """
+        Capture the text instead of printing it
+        """
+
+        self.output.append(text)
+
+
+class OrderedSet:
+    """
+    A set that remembers the order items were added in
+    Used for the inventory, witness statements and suspect motives, so checking if the player already has something
+    does not have to scan a list of long statements, while the view_* methods still show them in the order found
+    Items are never removed, so a snapshot only has to remember how many items there were, see snapshot()
+    """
+
+    __slots__ = ("_items", "_order", "_snapshot")
+
+    def __init__(self, items=()):
+        # A dictionary gives fast lookups, the list keeps the order and is only ever added to
+        self._items = dict.fromkeys(items)
+        self._order = list(self._items)
+        self._snapshot = None  # The last snapshot, given out again until an item is added
+
+    def add(self, item):
+        """
+        Add an item, returns True if it was new and False if it was already there
+        """
+
+        if item in self._items:
+            return False
+        self._items[item] = None
+        self._order.append(item)
+        return True
+
+    def snapshot(self):
+        """
+        The set as it is now, without copying it: the list of items is shared and only its length is remembered,
+        as adding items later never changes the ones already there
+        """
+
+        if self._snapshot is None or self._snapshot[1] != len(self._order):
+            self._snapshot = (self._order, len(self._order))
+        return self._snapshot
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """
+        A new set holding the items of a snapshot
+        The list is shared when the snapshot has all of it, adding items to it does not change the snapshot
+        """
+
+        order, length = snapshot
+        items = cls()
+        items._order = order if length == len(order) else order[:length]
+        items._items = dict.fromkeys(items._order)
+        return items
+
+    def to_list(self):
+        """
+        Return the items as a list, in the order they were added, for saving to JSON
+        """
+
+        return list(self._order)
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def __len__(self):
+        return len(self._order)
+
+    def __eq__(self, other):
+        if isinstance(other, OrderedSet):
+            return self._order == other._order
+        return NotImplemented
+
+    def __repr__(self):
+        return f"OrderedSet({self._order!r})"
+
+
+# Wraps the game's io channel so answers typed ahead on one line are used before asking the player again
+# e.g. after "4 legacy" the puzzle's prompt is answered with "legacy" without waiting for the player
+class InputQueue(GameIO):
+    def __init__(self, io):
+        self.io = io
+        self.pending = deque()  # (answer, True if it starts a new ";" part) waiting to be used, oldest first
+        self.timing = False  # Set to add up how long the player takes to answer, for metrics
+        self.waited = 0.0  # Total seconds spent waiting for the player
+
+    @property
+    def pacer(self):
+        return self.io.pacer
+
+    def queue(self, parts):
+        """
+        Add the rest of a menu line to be used for the next prompts, see CommandTable.parse:
+        the words left in the part of the line being run, then each of the parts after it
+        """
+
+        for number, part in enumerate(parts):
+            self.pending.extend((answer, number > 0 and index == 0) for index, answer in enumerate(part))
+
+    def clear(self):
+        """
+        Throw away any answers that have not been used
+        """
+
+        self.pending.clear()
+
+    def argument(self, default):
+        """
+        The rest of the command's part of the menu line for commands that take a value rather than asking for one,
+        e.g. "undo 3", or the default if there is none ("undo;3" undoes once and then runs command 3)
+        """
+
+        if self.pending and not self.pending[0][1]:
+            return self.pending.popleft()[0]
+        return default
+
+    async def read(self, prompt=""):
+        """
+        Use the next queued answer if there is one, otherwise ask the player
+        """
+
+        if self.pending:
+            answer, _ = self.pending.popleft()
+            self.io.write(f"{prompt}{answer}")  # Show the answer as if the player had typed it here
+            return answer
+        if not self.timing:
+            return await self.io.read(prompt)
+
+        start = time.perf_counter()
+        try:
+            return await self.io.read(prompt)
+        finally:
+            self.waited += time.perf_counter() - start
+
+    def write(self, text=""):
+        self.io.write(text)
+
+    def flush(self):
+        self.io.flush()
+
+    async def pause(self, seconds):
+        await self.io.pause(seconds)
+
+
+class Command:
+    def __init__(self, name, aliases, description, action, checkpoint=True):
+        """
+        A command the player can give at the menu
+        aliases are the words that run it, a number first if it is shown in the menu (e.g. "3", "search", "s")
+        action is called with the game and the current level, and returns True to leave the level's menu
+        checkpoint is False for commands that only show things, or that move through the game's history
+        rather than adding to it, so no snapshot is taken after them
+        """
+
+        self.name = name
+        self.aliases = tuple(alias.lower() for alias in aliases)
+        self.description = description
+        self.action = action
+        self.checkpoint = checkpoint
+
+    async def run(self, game, level):
+        """
+        Run the command, waiting for it if it asks the player anything
+        """
+
+        result = self.action(game, level)
+        if inspect.isawaitable(result):
+            result = await result
+        return bool(result)
+
+
+class CommandTable:
+    """
+    The commands on the game menu, looked up by any of their aliases
+    Levels can add their own commands on top with a `commands` attribute
+    """
 
-class Game:
     def __init__(self):
+        self._commands = []
+        self._by_alias = {}
+        self._menu = None  # The menu text, put together the first time it is shown
+
+    def register(self, command):
         """
-        Set up the game by creating the needed variables, this method is called when the game is created
-        Also prepares a way of storing the current level of the user and the clues they have found
+        Add a command, its aliases must not already be taken
         """
 
+        for alias in command.aliases:
+            if alias in self._by_alias:
+                raise ValueError(f"The alias {alias!r} is already used by {self._by_alias[alias].name}")
+        self._commands.append(command)
+        for alias in command.aliases:
+            self._by_alias[alias] = command
+        self._menu = None
+        return command
+
+    def find(self, word, level=None):
+        """
+        Returns the command for a word the player typed, or None, checking the level's own commands first
+        """
+
+        word = word.strip().lower()
+        for command in getattr(level, "commands", ()):
+            if word in command.aliases:
+                return command
+        return self._by_alias.get(word)
+
+    def parse(self, line, level=None):
+        """
+        Split a line into the parts it stands for, several commands can be separated by ";"
+        and the rest of a command's part of the line is its argument or answers its first prompt
+        e.g. "3;4 legacy;undo 2" -> [["3"], ["4", "legacy"], ["undo", "2"]]
+        """
+
+        parts = []
+        for part in line.split(";"):
+            part = part.strip()
+            word, _, answer = part.partition(" ")
+            if answer and self.find(word, level) is not None:
+                parts.append([word, answer.strip()])
+            elif part:
+                parts.append([part])
+        return parts or [[line]]
+
+    def menu(self):
+        """
+        The menu text, one line per command that has a number
+        """
+
+        if self._menu is None:
+            lines = ["\nWhat would you like to do?"]
+            lines.extend(f"{command.aliases[0]}. {command.description}"
+                         for command in self._commands if command.aliases[0].isdigit())
+            self._menu = "\n".join(lines)
+        return self._menu
+
+    def help(self, level=None):
+        """
+        Every command and the words that run it, including the level's own commands
+        """
+
+        lines = ["\nCommands (several can be given at once, e.g. 3;4 legacy;7):"]
+        for command in list(self._commands) + list(getattr(level, "commands", ())):
+            lines.append(f"- {command.description}: {', '.join(command.aliases)}")
+        return "\n".join(lines)
+
+
+class GameSnapshot:
+    """
+    Everything about a game that changes as it is played, at one moment, see Game.snapshot()
+    The collected items and the level states are shared with the game rather than copied,
+    so a snapshot costs the same however far the player has got
+    """
+
+    __slots__ = ("player_name", "current_level", "inventory", "witness_statements", "suspect_motives", "levels")
+
+    def __init__(self, player_name, current_level, inventory, witness_statements, suspect_motives, levels):
+        self.player_name = player_name
+        self.current_level = current_level
+        self.inventory = inventory
+        self.witness_statements = witness_statements
+        self.suspect_motives = suspect_motives
+        self.levels = levels
+
+    def __eq__(self, other):
+        """
+        True if both snapshots hold the same state, shared parts are compared by identity first,
+        so this does not look through the collected items unless a restore has copied them
+        """
+
+        if not isinstance(other, GameSnapshot):
+            return NotImplemented
+        return (self.player_name == other.player_name and self.current_level == other.current_level
+                and self.levels == other.levels
+                and all(same_items(getattr(self, name), getattr(other, name))
+                        for name in ("inventory", "witness_statements", "suspect_motives")))
+
+    __hash__ = None
+
+    def to_state(self):
+        """
+        The snapshot as a game state dictionary for the save backends
+        """
+
+        return {
+            "player_name": self.player_name,
+            "current_level": self.current_level,
+            "witness_statements": self.witness_statements[0][:self.witness_statements[1]],
+            "suspect_motives": self.suspect_motives[0][:self.suspect_motives[1]],
+            "inventory": self.inventory[0][:self.inventory[1]],
+            "levels": {str(index): list(state) for index, state in
+                       sorted(LevelSequence.saved_states(self.levels).items())},
+        }
+
+
+def same_items(first, second):
+    """
+    True if two OrderedSet snapshots hold the same items
+    """
+
+    return first[1] == second[1] and (first[0] is second[0] or first[0][:first[1]] == second[0][:second[1]])
+
+
+# Seeds for games that are not given one, not taken from the random module so that random.seed() or forking
+# a process never gives two games the same seed
+_seed_source = random.SystemRandom()
+
+
+def session_seed(master_seed, index):
+    """
+    The seed for game number `index` of a batch played from one master seed
+    Every seed only depends on the master seed and the index, like the rooms of a generated mansion, so a batch
+    gives the same games however many processes play it and in whatever order they finish
+    The index can also be a name, a game uses session_seed(game.seed, "names") etc. so each of its random
+    number generators has its own stream
+    """
+
+    return random.Random(f"{master_seed}:{index}").getrandbits(64)
+
+
+class Game:
+    def __init__(self, io=None, save_backend=None, registry=None, seed=None, commands=None, metrics=None,
+                 history_limit=1000, autosaver=None):
+        """
+        Set up the game by creating the needed variables, this method is called when the game is created
+        Also prepares a way of storing the current level of the user and the clues they have found
+        The io channel defaults to the terminal, saves default to save_game.json next to this file
+        and the levels default to the ones registered in level_registry
+        The seed makes the NPC names, generated puzzles and everything left to chance (e.g. the Skeleton's moves)
+        the same every time the game is played with it, a game without a seed picks its own, kept as game.seed
+        The menu commands default to game_commands
+        Everything the levels change in the game goes through the game's event bus, see events.py
+        metrics records how long commands, levels and saves take, see metrics.py, nothing is timed without it
+        A checkpoint is kept after each of the last `history_limit` commands so they can be undone, see history.py
+        Saves are written in the background by the autosaver, games sharing a save backend can share one too
+        """
+
+        # Answers typed ahead on the menu line are used before asking the player, see InputQueue
+        self.io = InputQueue(io if io is not None else ConsoleIO())
+        self.commands = commands if commands is not None else game_commands
+        self.metrics = metrics if metrics is not None else NO_METRICS
+        self.io.timing = self.metrics.enabled  # The player's thinking time is kept apart from the game's own
+        self.attempts = AttemptLimiter()  # How often this session can try each puzzle
+        self.seed = seed if seed is not None else _seed_source.getrandbits(64)
+        self.rng = random.Random(self.seed)  # The game's random numbers, levels use them instead of the random module
+        # Each game has its own names and generated puzzles, reproducible with its seed
+        # Their seeds are derived from it, with the same seed all three would give the same numbers in step
+        self.name_generator = NameGenerator(session_seed(self.seed, "names"))
+        self.puzzle_rng = random.Random(session_seed(self.seed, "puzzles"))
+        if save_backend is None:
+            save_backend = JsonSaveBackend(Path(__file__).parent / "save_game.json")
+        self.save_backend = save_backend
+        self.autosaver = autosaver if autosaver is not None else Autosaver(save_backend, self.metrics)
         self.is_running = False
-        self.levels = [ # List of levels in the game
-            MansionLevel(),
-            StudyLevel(),
-            KitchenLevel(),
-            CellarLevel(),
-            GardenLevel(),
-            ObservatoryLevel(),
-            FinalLevel()
-        ] 
+        # The levels in the game, each one is only created when the player reaches it
+        self.levels = (registry if registry is not None else level_registry).levels_for(self)
         self._current_level = 0 # The current level the player is on
         self._player_name = None
-        self.inventory = []  # List to store items the player has collected
-        self.witness_statements = []  # List to store witness statements
-        self.suspect_motives = []  # List to store suspects
-
-    def start(self):
+        self.inventory = OrderedSet()  # Items the player has collected
+        self.witness_statements = OrderedSet()  # Witness statements the player has collected
+        self.suspect_motives = OrderedSet()  # Suspect motives the player has collected
+        self.history = History(self, history_limit)  # Checkpoints for undo and rewind
+
+        # The game's own state is kept up to date as soon as something happens, then the level is autosaved
+        self.events = EventBus()
+        self.events.subscribe(StatementFound, lambda event: self.witness_statements.add(event.statement))
+        self.events.subscribe(MotiveFound, lambda event: self.suspect_motives.add(event.motive))
+        self.events.subscribe(ItemAwarded, lambda event: self.add_to_inventory(event.item))
+        self.events.subscribe(LevelSolved, self.next_level)
+        self.events.subscribe(LevelSolved, lambda event: self.save_game())
+        # Counting and logging can wait, they get the events in batches
+        self.stats = SessionStats()
+        self.events.subscribe(Event, self.stats, batched=True)
+        self.events.subscribe(Event, EventLogger(session=lambda: self._player_name), batched=True)
+
+    async def start(self):
         """
         Checks for existing save files and loads the game if found, otherwise starts a new game.
         Sets `is_running` to True and creates the instances of the levels.
         Prompts the user with a welcome message and their name if starting a new game.
         """
 
-        # Default save file location
-        save_path = Path(__file__).parent / "save_game.json"
-
-        # Check if the JSON save file exists
-        if save_path.exists():
+        # Check if there are any saves, one name is enough to know
+        await self.autosaver.wait()  # Saves still being written count
+        try:
+            saved_players = await asyncio.to_thread(self.save_backend.players, limit=1)
+        except CorruptSaveError as error:
+            self.report_damaged_save(error)
+            raise
+        if saved_players:
             # Prompt user to load the game
             while True:
-                user_load = input("Save game found! Would you like to load? (yes/no): ").strip().lower()
+                user_load = (await self.io.read("Save game found! Would you like to load? (yes/no): ")).strip().lower()
                 if user_load in ["yes", "no"]:
                     break
-                print("Invalid input. Please enter 'yes' or 'no'.")
+                self.io.write("Invalid input. Please enter 'yes' or 'no'.")
 
             if user_load == "yes":
-                self.load_game(save_path)
-                return
+                if self.save_backend.single_save:
+                    await self.load_game(saved_players[0])
+                    return
+
+                # The backend holds saves for several players, so always ask which player is loading,
+                # even if there is only one save, and only load the save with that name
+                player_name = await self.io.read("Please enter the name you saved with: ")
+                if await self.load_game(player_name):
+                    return
 
         # New game setup
-        print("Welcome to the mystery adventure game created by Null Pointer!\n")
-        print("You need to gather clues throughout the adventure!")
-        print("The clues are used to solve the final puzzle and win the game!")
-        print("Good luck!\n")
+        self.io.write("Welcome to the mystery adventure game created by Null Pointer!\n")
+        self.io.write("You need to gather clues throughout the adventure!")
+        self.io.write("The clues are used to solve the final puzzle and win the game!")
+        self.io.write("Good luck!\n")
 
         # Prompt the user to input their name
-        self._player_name = input("Please enter your name to continue: ")
-        print(f"\nHello {self._player_name}!\n")
+        self._player_name = await self.io.read("Please enter your name to continue: ")
+        self.io.write(f"\nHello {self._player_name}!\n")
 
         self.is_running = True
-        self.game_loop()
+        await self.game_loop()
 
 
-    def game_loop(self):
+    async def game_loop(self):
         """
         The main game loop that runs while the game is running
         This loop facilitates user input and choices throughout the game
@@ -95,58 +691,51 @@ class Game:
         while self.is_running and self._current_level < len(self.levels):
 
             # Get the current level from the list of levels and start the level
+            start, waited = time.perf_counter(), self.io.waited
             current_level = self.levels[self._current_level]
-            current_level.start()
+            # Timings are labelled with the level's class, not its name, a generated mansion names thousands of rooms
+            level_kind = type(current_level).__name__
+            self.metrics.instrument(current_level, LEVEL_METHODS, "level", lambda: self.io.waited, level=level_kind)
+            await current_level.start()
+            if self.metrics.enabled:
+                self.metrics.record("level_transition", start, self.io.waited - waited, level=level_kind)
+            self.history.record("start")  # Only kept for a new game or a loaded one, nothing else has changed
         
             while True: 
+                await self.events.flush()  # Catch the batched subscribers up while the player is thinking
+
                 # Display the options for the user
-                print("\nWhat would you like to do?")
-                print("1. Interact with the NPCs")
-                print("2. View level clues")
-                print("3. Look for clues")
-                print("4. Solve the puzzle")
-                print("5. View witness statements")
-                print("6. View suspect motives")
-                print("7. View inventory")
-                print("8. Quit the game")
-
-                # Get the user's choice
-                choice = input("Enter your choice: ")
-
-                if choice == "1":
-                    current_level.introduce_npcs()
-                elif choice == "2":
-                    self.view_level_clues()
-                elif choice == "3":
-                    # Search the room for clues
-                    current_level.search_room()
-                elif choice == "4":
-                    if current_level.solve_puzzle():
-                        # Add a specific item to the inventory per level except the final level
-                        if self._current_level < len(self.levels) - 1:
-                            self.add_to_inventory(f"Broken Key Part {self._current_level + 1}")
-
-                        # Move to the next level
-                        self._current_level += 1
-                        
-                        # Save the game
-                        self.save_game()
-                        break  # Exit the input loop to move to the next level
-                elif choice == "5":
-                    self.view_witness_statements()
-                elif choice == "6":
-                    self.view_suspect_motives()
-                elif choice == "7":
-                    self.view_inventory()
-                elif choice == "8":
-                    self.quit_game()
-                    break
-                else:
-                    print("Invalid choice. Please try again.")
+                start = time.perf_counter()
+                self.io.write(self.commands.menu())
+                if self.metrics.enabled:
+                    self.metrics.record("menu", start)
+
+                # Get the user's choice, the rest of the line can queue up more commands and answers
+                parts = self.commands.parse(await self.io.read("Enter your choice: "), current_level)
+                self.io.queue([parts[0][1:]] + parts[1:])
+
+                command = self.commands.find(parts[0][0], current_level)
+                if command is None:
+                    self.io.write("Invalid choice. Please try again.")
+                    self.io.clear()  # Do not run the rest of a line that went wrong
+                    continue
+
+                start, waited = time.perf_counter(), self.io.waited
+                finished = await command.run(self, current_level)
+                if command.checkpoint:
+                    self.history.record(command.name)
+                if self.metrics.enabled:
+                    self.metrics.record("command", start, self.io.waited - waited, command=command.name)
+                if finished:
+                    break  # Exit the input loop to move to the next level or quit
 
         if self.is_running: # Check if the game is still running, this means the player has completed all levels
-            print(f"\nCongratulations {self._player_name}! You completed the game.")
-            print("\nThank you for playing!")
+            self.io.write(f"\nCongratulations {self._player_name}! You completed the game.")
+            self.io.write("\nThank you for playing!")
+
+        await self.events.flush()
+        self.io.flush()  # Send the last screen, there is no prompt after it
+        await self.autosaver.wait()  # The player has quit or finished, make sure their last save is written
 
     def view_level_clues(self):
         """
@@ -158,10 +747,10 @@ class Game:
 
         # If the level has been searched, show the clue for the level
         if current_level.searched:
-            print(f"\nClue for {current_level.name}:")
-            print(f"- {current_level.clue}")
+            self.io.write(f"\nClue for {current_level.name}:")
+            self.io.write(f"- {current_level.clue}")
         else:
-            print("\nYou have not found the clue for this level yet.")
+            self.io.write("\nYou have not found the clue for this level yet.")
         
     def view_inventory(self):
         """
@@ -170,23 +759,22 @@ class Game:
 
         # Check if the inventory is empty
         if not self.inventory:
-            print("\nYou have not collected any items yet.")
+            self.io.write("\nYou have not collected any items yet.")
         else: # Print each item in the inventory
-            print("\nInventory:")
+            self.io.write("\nInventory:")
             for item in self.inventory:
-                print(f"- {item}")
+                self.io.write(f"- {item}")
 
     def add_to_inventory(self, item):
         """
         Add an item to the player's inventory
         """
 
-        # Check if the item is already in the inventory
-        if item in self.inventory:
-            print(f"You already have the {item} in your inventory.")
+        # Add the item unless it is already in the inventory
+        if self.inventory.add(item):
+            self.io.write(f"{item} has been added to your inventory.")
         else:
-            self.inventory.append(item)
-            print(f"{item} has been added to your inventory.")
+            self.io.write(f"You already have the {item} in your inventory.")
 
     def view_witness_statements(self):
         """
@@ -194,11 +782,11 @@ class Game:
         """
 
         if not self.witness_statements:
-            print("\nYou have not collected any witness statements yet.")
+            self.io.write("\nYou have not collected any witness statements yet.")
         else:
-            print("\nWitness Statements:")
+            self.io.write("\nWitness Statements:")
             for statement in self.witness_statements:
-                print(f"- {statement}")
+                self.io.write(f"- {statement}")
     
     def view_suspect_motives(self):
         """
@@ -206,72 +794,296 @@ class Game:
         """
 
         if not self.suspect_motives:
-            print("\nYou have not collected any suspect motives yet.")
+            self.io.write("\nYou have not collected any suspect motives yet.")
         else:
-            print("\nSuspect Motives:")
+            self.io.write("\nSuspect Motives:")
             for motive in self.suspect_motives:
-                print(f"- {motive}")
+                self.io.write(f"- {motive}")
 
 
-    def save_game(self):
+    def snapshot(self):
         """
-        Saves the current game state to a JSON file.
+        Take a snapshot of the game, including the state of every level, cheap enough to do after every command
         """
 
-        save_path = Path(__file__).parent / "save_game.json"
+        return GameSnapshot(self._player_name, self._current_level, self.inventory.snapshot(),
+                            self.witness_statements.snapshot(), self.suspect_motives.snapshot(),
+                            self.levels.snapshot())
 
-        # Create a dictionary of the game state
-        game_state = {
-            "player_name": self._player_name,
-            "current_level": self._current_level,
-            "witness_statements": self.witness_statements,
-            "suspect_motives": self.suspect_motives,
-            "inventory": self.inventory
-        }
+    def restore(self, snapshot):
+        """
+        Put the game back the way it was when the snapshot was taken
+        """
 
-        # Write the game state to a JSON file
-        with open(save_path, "w") as file:
-            json.dump(game_state, file, indent=4)
-    
-    def load_game(self, save_path):
+        self._player_name = snapshot.player_name
+        self._current_level = snapshot.current_level
+        self.inventory = OrderedSet.from_snapshot(snapshot.inventory)
+        self.witness_statements = OrderedSet.from_snapshot(snapshot.witness_statements)
+        self.suspect_motives = OrderedSet.from_snapshot(snapshot.suspect_motives)
+        self.levels.restore(snapshot.levels)
+
+    def undo(self):
+        """
+        Take back the last command, or the last N with "undo N"
+        Returns True if that goes back to another level
         """
-        Loads the game state from a JSON file.
+
+        return self._move_through_history(self.history.undo, "undo", "There is nothing to undo.")
+
+    def redo(self):
+        """
+        Run again the commands that were undone, one or N with "redo N"
+        Returns True if that goes on to another level
         """
 
-        # Check if the save file exists
-        if not save_path.exists():
-            print("No save file found.")
+        return self._move_through_history(self.history.redo, "redo", "There is nothing to redo.")
+
+    def rewind(self):
+        """
+        Jump to checkpoint N with "rewind N", see view_history for the numbers
+        Returns True if that is on another level
+        """
+
+        number = self.io.argument(None)
+        if number is None:
+            self.view_history()
+            return False
+        return self._move_through_history(lambda _: self.history.jump(int(number)), "rewind",
+                                          f"There is no checkpoint {number}, type 'history' to see them.", number)
+
+    def _move_through_history(self, move, command, nothing, steps=None):
+        steps = steps if steps is not None else self.io.argument("1")
+        if not steps.isdecimal():
+            self.io.write(f"\nPlease give a number, e.g. '{command} 2'.")
+            self.io.clear()
+            return False
+
+        level = self._current_level
+        checkpoint = move(int(steps))
+        if checkpoint is None:
+            self.io.write(f"\n{nothing}")
+            return False
+        self.io.write(f"\nBack to checkpoint {checkpoint.number}, "
+                      f"after '{checkpoint.label}' on level {checkpoint.level}.")
+        return self._current_level != level  # The new level is started again
+
+    def view_history(self, count=10):
+        """
+        Show the last few checkpoints the player can rewind to
+        """
+
+        checkpoints = list(self.history)[-count:]
+        if not checkpoints:
+            self.io.write("\nThere are no checkpoints yet.")
             return
+        self.io.write("\nCheckpoints (type 'rewind N' to go back to one):")
+        current = self.history.current
+        for checkpoint in checkpoints:
+            here = "   <- you are here" if checkpoint is current else ""
+            self.io.write(f"{checkpoint.number}. after '{checkpoint.label}' on level {checkpoint.level}{here}")
 
-        # Read the game state from the JSON file
-        with open(save_path, "r") as file:
-            game_state = json.load(file)
+    def save_game(self):
+        """
+        Saves the current game state to the save journal.
+        Only the changes since the last save are written, see save_storage.py
+        The save is written by the autosaver in the background, the player does not wait for the disk
+        """
+
+        self.autosaver.save(self.snapshot())
+    
+    async def load_game(self, player_name=None):
+        """
+        Loads the player's game state from the save backend.
+        Returns False if the player has no save.
+        """
+
+        # Read the game state from the backend, checking its player name and level
+        # The other fields are checked as they are read below, so a binary save's payload is only decoded once
+        start = time.perf_counter()
+        try:
+            game_state = await asyncio.to_thread(self.save_backend.load, player_name)
+            if game_state is not None:
+                check_header(game_state)
+                if game_state["current_level"] > len(self.levels):
+                    raise CorruptSaveError(f"Save is on level {game_state['current_level'] + 1}, "
+                                           f"the game only has {len(self.levels)}")
+        except CorruptSaveError as error:
+            self.report_damaged_save(error)
+            raise
+        if self.metrics.enabled:
+            self.metrics.record("storage", start, operation="load")
+
+        # Check if the save exists
+        if game_state is None:
+            self.io.write("No save file found.")
+            return False
+
+        # Read and check the rest of the save before changing anything
+        try:
+            witness_statements = state_field(game_state, "witness_statements")
+            suspect_motives = state_field(game_state, "suspect_motives")
+            inventory = state_field(game_state, "inventory")
+            level_states = {int(index): state for index, state in state_field(game_state, "levels").items()}
+            self.levels.check_states(level_states)
+        except CorruptSaveError as error:
+            self.report_damaged_save(error)
+            raise
 
         # Set the game state variables
-        self._player_name = game_state.get("player_name", "Unknown Player")
-        self._current_level = game_state.get("current_level", 0)
-        self.witness_statements = game_state.get("witness_statements", [])
-        self.suspect_motives = game_state.get("suspect_motives", [])
-        self.inventory = game_state.get("inventory", [])
+        self._player_name = game_state["player_name"]
+        self._current_level = game_state["current_level"]
+        self.witness_statements = OrderedSet(witness_statements)
+        self.suspect_motives = OrderedSet(suspect_motives)
+        self.inventory = OrderedSet(inventory)
+        self.levels.load_states(level_states)
 
-        print(f"Game loaded successfully! Welcome back {self._player_name}!")
-        print(f"You are currently on level {self._current_level + 1}.")
+        self.io.write(f"Game loaded successfully! Welcome back {self._player_name}!")
+        self.io.write(f"You are currently on level {self._current_level + 1}.")
 
         # Continue the game loop
         self.is_running = True
-        self.game_loop()
+        await self.game_loop()
+        return True
+
+    def report_damaged_save(self, error):
+        """
+        Tell the player their save cannot be loaded, the game then stops with the error
+        instead of starting a new game, which would autosave over the damaged save
+        """
+
+        self.io.write(f"Your save is damaged and cannot be loaded: {error}")
+        self.io.flush()
+
+    async def solve_level(self, level):
+        """
+        Try the level's puzzle, publishing the key part and LevelSolved if it is solved,
+        which moves the game on to the next level and saves it
+        Returns True if the level was solved
+        """
+
+        if not await level.solve_puzzle():
+            return False
+
+        # Award a specific item per level except the final level
+        if self._current_level < len(self.levels) - 1:
+            await self.events.publish(ItemAwarded(f"Broken Key Part {self._current_level + 1}"))
+
+        await self.events.publish(LevelSolved(self._current_level, level.name))
+        return True
+
+    def next_level(self, event):
+        """
+        Move to the level after the one that was solved
+        """
+
+        self._current_level = event.level + 1
 
     def quit_game(self):
         """
-        Quits the game
+        Quits the game, returns True so the menu stops
+        """
+        self.io.write("\nThanks for playing! Goodbye.")
+        self.io.clear()
+        self.is_running = False
+        return True
+
+
+# The commands on the game menu, with the number shown in the menu first and the words players can type instead
+game_commands = CommandTable()
+game_commands.register(Command("interact", ("1", "interact", "talk", "t"), "Interact with the NPCs",
+                               lambda game, level: level.introduce_npcs()))
+game_commands.register(Command("clues", ("2", "clues", "c"), "View level clues",
+                               lambda game, level: game.view_level_clues(), checkpoint=False))
+game_commands.register(Command("search", ("3", "search", "s"), "Look for clues",
+                               lambda game, level: level.search_room()))
+game_commands.register(Command("solve", ("4", "solve", "p"), "Solve the puzzle",
+                               lambda game, level: game.solve_level(level)))
+game_commands.register(Command("statements", ("5", "statements", "w"), "View witness statements",
+                               lambda game, level: game.view_witness_statements(), checkpoint=False))
+game_commands.register(Command("motives", ("6", "motives", "m"), "View suspect motives",
+                               lambda game, level: game.view_suspect_motives(), checkpoint=False))
+game_commands.register(Command("inventory", ("7", "inventory", "i"), "View inventory",
+                               lambda game, level: game.view_inventory(), checkpoint=False))
+game_commands.register(Command("quit", ("8", "quit", "q"), "Quit the game",
+                               lambda game, level: game.quit_game()))
+game_commands.register(Command("help", ("help", "?"), "List every command",
+                               lambda game, level: game.io.write(game.commands.help(level)), checkpoint=False))
+# Moving through the history does not add to it, so "undo" twice goes back two commands
+game_commands.register(Command("undo", ("undo", "u"), "Take back the last command, or N with 'undo N'",
+                               lambda game, level: game.undo(), checkpoint=False))
+game_commands.register(Command("redo", ("redo",), "Do again what was undone, or N with 'redo N'",
+                               lambda game, level: game.redo(), checkpoint=False))
+game_commands.register(Command("history", ("history",), "List the checkpoints to rewind to",
+                               lambda game, level: game.view_history(), checkpoint=False))
+game_commands.register(Command("rewind", ("rewind",), "Go back to checkpoint N with 'rewind N'",
+                               lambda game, level: game.rewind(), checkpoint=False))
+
+class NamePoolExhausted(Exception):
+    """
+    Raised when more unique names are asked for than the name pool holds
+    """
+    pass
+
+
+# Name parts for NPCs, kept as tuples so they are only built once
+NAME_PREFIXES = ("Mr.", "Mrs.", "Miss", "Dr.")
+NAME_SURNAMES = (
+    "Smith", "Johnson", "Williams", "Jones", "Brown", "Davis", "Miller",
+    "Wilson", "Moore", "Taylor", "Anderson", "Thomas", "Jackson",
+    "White", "Harris", "Martin", "Thompson", "Garcia", "Martinez",
+    "Robinson", "Clark", "Rodriguez", "Lewis", "Lee"
+)
+NAME_INITIALS = tuple("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+
+
+class NameGenerator:
+    """
+    Generates NPC names like "Dr. Smith"
+    The name pools are built once, and each game session has its own generator with its own seedable random.Random,
+    so the same seed always gives the same names and sessions do not affect each other
+    """
+
+    # Every possible name, built once when the class is created
+    POOL = tuple(f"{prefix} {surname}" for prefix in NAME_PREFIXES for surname in NAME_SURNAMES)
+    # A much bigger pool with an initial, e.g. "Dr. J. Smith", for rooms with hundreds of NPCs
+    LARGE_POOL = tuple(f"{prefix} {initial}. {surname}"
+                       for prefix in NAME_PREFIXES for initial in NAME_INITIALS for surname in NAME_SURNAMES)
+
+    def __init__(self, seed=None, pool=None, rng=None):
+        """
+        Set up the generator with its own random number generator, seeded with `seed` if one is given
+        """
+
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.pool = tuple(pool) if pool is not None else self.POOL
+
+    def generate(self):
+        """
+        Returns one random name, names can repeat between calls
+        """
+
+        return self.rng.choice(self.pool)
+
+    def generate_batch(self, count):
+        """
+        Returns `count` different names in one call, e.g. for every NPC in a room
+        Raises NamePoolExhausted if the pool does not have that many names
         """
-        print("\nThanks for playing! Goodbye.")
-        self.is_running = False
+
+        if count > len(self.pool):
+            raise NamePoolExhausted(f"Asked for {count} unique names but the pool only has {len(self.pool)}")
+        return self.rng.sample(self.pool, count)
+
+
+# Used for NPCs that are not part of a game, e.g. when a level is created on its own
+default_name_generator = NameGenerator()
+
 
 # Base class for all NPCs
 class NPC:
-    def __init__(self, role, dialogue):
-        self.name = self.generate_name()
+    def __init__(self, role, dialogue, name=None, names=None):
+        self.names = names if names is not None else default_name_generator  # Used when no name is given
+        self.name = name if name is not None else self.generate_name()
         self.role = role
         self.dialogue = dialogue
     
@@ -280,15 +1092,7 @@ class NPC:
         This method generates a random name and prefix for each NPC instance
         """
 
-        prefixes = ["Mr.", "Mrs.", "Miss", "Dr."]
-        names = [
-            "Smith", "Johnson", "Williams", "Jones", "Brown", "Davis", "Miller", 
-            "Wilson", "Moore", "Taylor", "Anderson", "Thomas", "Jackson", 
-            "White", "Harris", "Martin", "Thompson", "Garcia", "Martinez", 
-            "Robinson", "Clark", "Rodriguez", "Lewis", "Lee"
-        ]
-
-        return f"{random.choice(prefixes)} {random.choice(names)}"
+        return self.names.generate()
     
     def interact(self):
         """
@@ -342,427 +1146,554 @@ class Witness(Character):
         return self.name
 
 
-# Base abstract class for all levels
-class Level(ABC):
-    def __init__(self, name):
-        self.name = name
-        self.npcs = []
-        self.clue = None
-        self.witness_statement = None
+class LevelRegistry:
+    """
+    The list of levels in the game, in the order they are played
+    Levels are registered as factories (usually the Level class itself) that are called with the game
+    """
 
-    @abstractmethod
-    def start(self):
-        """
-        Starts the level
-        """
-        pass
+    def __init__(self):
+        self._factories = []
 
-    @abstractmethod
-    def introduce_npcs(self):
+    def register(self, factory=None, index=None):
         """
-        Introduce the NPCs in the level
+        Add a level, at the end or at the given position (index=-1 puts it just before the final level)
+        Can be used as a class decorator: @level_registry.register
         """
-        pass
 
-    @abstractmethod
-    def search_room(self):
+        if factory is None:
+            return lambda factory: self.register(factory, index)
+
+        if index is None:
+            self._factories.append(factory)
+        else:
+            self._factories.insert(index, factory)
+        return factory
+
+    @property
+    def factories(self):
         """
-        Search the room for clues
+        The registered level factories, in order
         """
-        pass
 
-    @abstractmethod
-    def solve_puzzle(self):
-        """
-        Attempt to solve the puzzle in the level
+        return tuple(self._factories)
+
+    def levels_for(self, game):
+        """
+        Returns the levels for one game, which are only created when they are first used
         """
-        pass
 
+        return LevelSequence(tuple(self._factories), game)  # Registering more levels later does not change a running game
+
+    def __len__(self):
+        return len(self._factories)
+
+
+class LevelSequence:
+    """
+    The levels of one game
+    Behaves like the list of levels the game used to build up front, but only creates a level when it is looked up,
+    so loading a save on level 6 does not build levels 1 to 5
+    factories can be any sequence of level factories, and with `keep` only that many of the most recently created
+    levels are held on to, so a game with thousands of levels does not keep every room it has been through
+    The state of each level (searched, the fighters' health, ...) can be snapshotted and restored, see snapshot()
+    """
+
+    def __init__(self, factories, game, keep=None):
+        self._factories = factories
+        self._game = game
+        self.keep = keep
+        self._levels = {}  # The levels held so far, by index, in the order they were created
+        self._initial = {}  # The state each held level was created with, by index
+        self._pending = {}  # States to give levels when they are created, from a restored snapshot or a save
+        # The changed states of levels that were let go of, as a chain of (index, state, older entries)
+        # Adding to the chain never changes it, so every snapshot shares it instead of copying it
+        self._archive = None
+        self._archive_top = -1  # The highest index in the archive, levels past it never have to look there
+        self._created = 0
+        # The last snapshot and the (index, state) entries in it, parts that have not changed are given out again
+        # so a history of snapshots only holds each level state once
+        self._last_snapshot = ((), (), None, -1)
+        self._entries = {}
 
-# Ryan Pitman - Level 1: The Mansion
-class MansionLevel(Level):
-    def __init__(self):
-        super().__init__("The Mansion") # Level name
-        self.npcs = [
-            NPC("Butler", "Please do not disturb the master of the house, he is very busy at the moment."),
-            NPC("Maid", "I can't believe a murder happened right here in this house!")
-        ]
-        self.witness = Witness("Groundskeeper Smith", "All I know is, I saw Lady Rosalind enter the house shortly before we found the body! It could not have been her!")
-        self.suspect = Suspect("Miss Ivy", "Miss Ivy was loyal to the mansion owner but feared being fired due to recent accusations of theft.\nThe victim had also been unusually harsh toward her, fueling resentment.")
-        self.clue = "Text on the wall that states, 'Every good house master leaves behind a Le...."
-        self.searched = False
+    def __len__(self):
+        return len(self._factories)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._factories)
+        if not 0 <= index < len(self._factories):
+            raise IndexError("level index out of range")
 
-    def start(self):
+        level = self._levels.get(index)
+        if level is None:
+            level = self._levels[index] = self._factories[index](self._game)
+            self._initial[index] = level.snapshot_state()
+            state = self._pending.pop(index, None)
+            if state is None:
+                state = self._archived(index)
+            if state is not None:
+                level.restore_state(state)
+            self._created += 1
+            if self.keep is not None and len(self._levels) > self.keep:
+                self._let_go(next(iter(self._levels)))
+        return level
+
+    def _let_go(self, index):
         """
-        Introduces the mansion level
+        Stop holding on to a level, keeping its state in the archive if it has changed
         """
 
-        print(f"\nWelcome to {self.name}!")
-        print("You have entered the mansion and find yourself in a grand foyer.")
-        print("You must find the clue to move on to the next level.")
-        print("Try to find the butler and maid in the room to help you!")
+        state = self._levels.pop(index).snapshot_state()
+        self._entries.pop(index, None)
+        if state != self._initial.pop(index):
+            self._archive = (index, state, self._archive)
+            self._archive_top = max(self._archive_top, index)
 
-    def introduce_npcs(self):
+    def _archived(self, index):
         """
-        Introduces the maid and butler in the mansion foyer, along with the groundskeeper
+        The archived state of a level, or None
         """
 
-        print("\nIn the foyer you see the following NPCs:")
-        for npc in self.npcs:
-            print(f"- {npc.name}, the {npc.role}")
-        
-        print(f"\nThere is also {self.witness} near the staircase")
-        
-        # Allow the user to interact with these NPCs
-        choice = input("Who would you like to speak to? (Butler / Maid / Groundskeeper): ").lower()
+        if index > self._archive_top:
+            return None
+        entry = self._archive
+        while entry is not None:
+            if entry[0] == index:
+                return entry[1]
+            entry = entry[2]
+        return None
 
-        # Find the witness and interact
-        if choice == "groundskeeper":
-            statement = self.witness.provide_statement()
-            print(f"\n{statement}")
+    def snapshot(self):
+        """
+        The state of every level that has changed, as an immutable value
+        Only the held levels are looked at, the archive is shared, so this costs the same however many levels
+        the game has been through
+        Anything that has not changed since the last snapshot is shared with it rather than made again
+        """
 
-            if statement not in game.witness_statements:
-                game.witness_statements.append(statement)
+        changed = []
+        for index, level in self._levels.items():
+            values = level.state_values()  # Only copied if the level has changed since the last snapshot
+            entry = self._entries.get(index)
+            if entry is not None and entry[1] == values:
+                changed.append(entry)
+            elif values != self._initial[index]:
+                entry = self._entries[index] = (index, level.snapshot_state())
+                changed.append(entry)
 
-            # Mark the suspect
-            motive = self.suspect.reveal_motive()
+        snapshot = (tuple(changed), tuple(self._pending.items()), self._archive, self._archive_top)
+        if snapshot != self._last_snapshot:
+            self._last_snapshot = tuple(old if new == old else new for new, old in zip(snapshot, self._last_snapshot))
+        return self._last_snapshot
 
-            print("\nYou also learn that Miss Ivy has a motive to commit the crime.")
-            print(f"{motive}")
+    def restore(self, snapshot):
+        """
+        Put every level back the way it was when the snapshot was taken
+        """
 
-            if motive not in game.suspect_motives:
-                game.suspect_motives.append(motive)
-    
-            return
+        changed, pending, self._archive, self._archive_top = snapshot
+        self._pending = dict(pending)
+        self._pending.update(changed)
+        for index, level in self._levels.items():
+            state = self._pending.pop(index, None)
+            if state is None:
+                state = self._archived(index)
+            level.restore_state(state if state is not None else self._initial[index])
 
-        # Find the NPC with that role and interact
-        for npc in self.npcs:
-            if npc.role.lower() == choice:
-                print(f"\n{npc.interact()}")
-                return
-        
-        # The NPC entered was not found
-        print("\nYou were unable to find that NPC in the room.")
+    @staticmethod
+    def saved_states(snapshot):
+        """
+        The changed level states in a snapshot, for a save: {index: state}
+        Levels that were let go of are not saved, the player has moved on from them
+        """
 
-    def search_room(self):
+        changed, pending, _, _ = snapshot
+        states = dict(pending)
+        states.update(changed)
+        return states
+
+    def check_states(self, states):
         """
-        Search the mansion foyer for clues
+        Make sure the level states read from a save ({index: state}) fit the levels they are for,
+        without building the levels, raises CorruptSaveError
         """
-        if self.searched:
-            print("\nYou have already searched the foyer.")
-            return
 
-        print("\nYou search the mansion foyer for clues.")
-        print("You find a note on the wall with a missing word.")
-        print(f"The notes says: {self.clue}")
-        print("You put the note in your pocket for later.")
-        self.searched = True
+        for index, state in states.items():
+            if index >= len(self._factories):
+                raise CorruptSaveError(f"Save has a state for level {index + 1}, "
+                                       f"the game only has {len(self._factories)}")
+            factory = self._factories[index]
+            level_class = getattr(factory, "func", factory)  # Levels are registered as classes or partials of them
+            if not (isinstance(level_class, type) and issubclass(level_class, Level)):
+                level_class = type(self[index])  # Any other factory has to build its level to know what it is
+            level_class.check_state(state)
 
+    def load_states(self, states):
+        """
+        Restore the level states read from a save, see check_states
+        """
 
-    def solve_puzzle(self):
+        self.restore(((), tuple((index, tuple(state)) for index, state in states.items()), None, -1))
+
+    def created(self):
         """
-        Solve the puzzle in the mansion level to collect the clue
+        How many levels have been created so far
         """
 
-        print("\nYou see door with a keypad lock.")
-        print("You need to input a word to unlock the door.")
-        print("It appears to be a 6 letter word.")
+        return self._created
 
-        answer = input("What word would you like to enter?: ").strip().lower()
-        if answer == "legacy":
-            print("\nCorrect! You found the clue.")
-            return True
-        else:
-            print("\nIncorrect word, try again.")
-            return False
-        
 
-#Adam Pekalski - Level 2: The Study
-class StudyLevel(Level):
-    def __init__(self):
-        super().__init__("The Study")  # Level name
-        self.npcs = [
-            NPC("Professor", "Ah, a visitor! Perhaps you can solve this conundrum for me?"),
-            NPC("Librarian", "Hello! Knowledge is the key to all mysteries, you know."),
-        ]
-        self.witness = Witness("Librarian Euclidia", "I sent Miss Ivy out to buy some chalk and scrolls, she was out at the time of the incident.")
-        self.suspect = Suspect("Professor Alabaster", "Professor Alabaster believed the victim had stolen valuable artifacts and withheld them from public display.\nHe may have wanted to recover them or silence the victim.")
-        self.clue = "X is found by finding the inverse of 3 mod 7, modular equations are key."
-        self.searched = False  # Indicates if the room has been searched
+# The levels of the game, filled in from the content pack in the order they are played (see the bottom of this file)
+level_registry = LevelRegistry()
+
+# The text, NPCs, clues and puzzles of every level, from content/levels.json
+game_content = load_content_pack()
+
+
+# The Level methods timed when a game has metrics
+LEVEL_METHODS = ("start", "introduce_npcs", "search_room", "solve_puzzle")
+
+
+# Base abstract class for all levels
+class Level(ABC):
+    commands = ()  # Extra menu commands only available on this level, see CommandTable
+    # The attributes that change as the level is played, kept in snapshots and saves, with the type of each
+    # so a state read from a save can be checked before it is used, see check_state
+    state_fields = {}
 
-    def start(self):
+    def __init__(self, name, game=None):
+        self.name = name
+        self.game = game  # The game this level belongs to
+        self.io = game.io if game is not None else ConsoleIO()
+        self.names = game.name_generator if game is not None else default_name_generator
+        self.rng = game.rng if game is not None else random.Random()  # For anything left to chance in the level
+        self.npcs = []
+        self.clue = None
+        self.witness_statement = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Reads every state field in one call, always giving a tuple
+        fields = cls.state_fields
+        getter = attrgetter(*fields) if fields else (lambda level: ())
+        cls._state_values = staticmethod(getter if len(fields) != 1 else lambda level: (getter(level),))
+
+    def state_values(self):
         """
-        Introduce the Study level.
+        The values of the level's state_fields as they are now, not copied, for comparing with a state
         """
 
-        print(f"\nWelcome to {self.name}!")
-        print(
-            "You enter the Study. The room is dimly lit, with bookshelves lining the walls. "
-            "A small desk with scattered papers sits near the center. "
-            "Two figures are here, looking at you curiously."
-        )
-        print("A strange puzzle glistens on the chalkboard in the corner.")
+        return self._state_values(self)
 
-    def introduce_npcs(self):
+    def snapshot_state(self):
         """
-        Introduce the NPCs in the Study.
+        The values of the level's state_fields, dictionaries are copied as levels change them in place
         """
 
-        print("\nIn the Study, you see the following NPCs:")
-        for npc in self.npcs:
-            print(f"- {npc.name}, the {npc.role}")
+        return tuple(dict(value) if isinstance(value, dict) else value for value in self._state_values(self))
 
-        # Allow interaction with NPCs
-        choice = input("Who would you like to interact with? (Professor / Librarian): ").lower()
+    def restore_state(self, state):
+        """
+        Set the level's state_fields from snapshot_state()
+        """
 
-        if choice == "professor":
-            self.interact_with_professor()
-        elif choice == "librarian":
-            self.interact_with_librarian()
-        else:
-            print("\nYou couldn't find that NPC in the room.")
+        for name, value in zip(self.state_fields, state):
+            setattr(self, name, dict(value) if isinstance(value, dict) else value)
 
-    def interact_with_professor(self):
+    @classmethod
+    def check_state(cls, state):
         """
-        Interact with the Professor NPC.
+        Make sure a level state read from a save has a value of the right type for each of the state_fields
+        Raises CorruptSaveError
         """
 
-        print("\nProfessor Algebrus: 'This mysterious puzzle appeared on my chalkboard, and I have not been able to solve it.'")
-        print("Professor Algebrus: 'Can you help me solve it?'")
+        if len(state) != len(cls.state_fields):
+            raise CorruptSaveError(f"Save has a {cls.__name__} state with {len(state)} values "
+                                   f"instead of {len(cls.state_fields)}")
+        for (name, kind), value in zip(cls.state_fields.items(), state):
+            if not has_type(value, kind):
+                raise CorruptSaveError(f"Save has an invalid {name} for {cls.__name__}: {value!r}")
 
-
-    def interact_with_librarian(self):
+    def create_npcs(self, *npcs):
         """
-        Interact with the Librarian NPC.
+        Create the NPCs for the level from (role, dialogue) pairs, every NPC in the room gets a different name
         """
 
-        print("\nLibrarian Euclidia: 'I don’t have puzzles, but I can share some wisdom.'")
-        statment = self.witness.provide_statement()
-        print(f"\n{statment}")
+        names = self.names.generate_batch(len(npcs))
+        return [NPC(role, dialogue, name, self.names) for (role, dialogue), name in zip(npcs, names)]
 
-        if statment not in game.witness_statements:
-            game.witness_statements.append(statment)
-        
-        motive = self.suspect.reveal_motive()
-        print("\nYou also learn that another professor, Professor Alabaster, has a motive to commit the crime.")
-        print(f"{motive}")
+    @abstractmethod
+    async def start(self):
+        """
+        Starts the level
+        """
+        pass
+
+    @abstractmethod
+    async def introduce_npcs(self):
+        """
+        Introduce the NPCs in the level
+        """
+        pass
 
-        if motive not in game.suspect_motives:
-            game.suspect_motives.append(motive)
+    @abstractmethod
+    async def search_room(self):
+        """
+        Search the room for clues
+        """
+        pass
 
-    def search_room(self):
+    @abstractmethod
+    async def solve_puzzle(self):
         """
-        Search the Study for clues.
+        Attempt to solve the puzzle in the level
         """
+        pass
 
-        if self.searched:
-            print("\nYou already found the clue for this level.")
-            return
 
-        print("\nYou search the Study for anything unusual.")
-        print("You find a book on mathematics, with a note on the page.")
-        print(f"The note reads: {self.clue}")
-        print("You take the note with you.")
-        self.searched = True
+# A level played from its entry in the content pack
+# The level only follows the steps written in content/levels.json, so a new room needs no new code
+class ContentLevel(Level):
+    content_id = None  # Which level in the content pack this class plays
+    state_fields = {"searched": bool}
+    _puzzles = {}  # The Puzzle for each level in the content pack, by content id
+
+    # The ways an answer can be tidied up before it is checked
+    NORMALIZERS = {
+        "none": lambda text: text,
+        "lower": lambda text: text.lower(),
+        "strip_lower": lambda text: text.strip().lower(),
+    }
+
+    def __init__(self, game=None, content_id=None, content=None):
+        self.content_id = content_id or self.content_id
+        self.content = content if content is not None else game_content.level(self.content_id)
+        super().__init__(self.content["name"], game)
+
+        if self.content.get("npcs"):
+            self.npcs = self.create_npcs(*self.content["npcs"])
+        witness = self.content.get("witness")
+        suspect = self.content.get("suspect")
+        self.witness = Witness(witness["name"], witness["statement"]) if witness else None
+        self.suspect = Suspect(suspect["name"], suspect["motive"]) if suspect else None
+        self.clue = self.content["clue"]
+        self.searched = False
+
+        # A level whose puzzle has a generator gets a fresh puzzle, and the clue that goes with it, in every game
+        self.puzzle_lines = self.content["puzzle"]["lines"]
+        self.generated_puzzle = None
+        # A generated room with no fixed answer gets a puzzle even when it is not part of a game
+        generator = self.content["puzzle"].get("generator")
+        fixed_answer = "answer" in self.content["puzzle"] or "answer_hashes" in self.content["puzzle"]
+        if generator is not None and (game is not None or not fixed_answer):
+            rng = game.puzzle_rng if game is not None else None
+            self.generated_puzzle = PUZZLE_GENERATORS[generator](rng).generate()
+            self.clue = self.generated_puzzle.clue
+            self.puzzle_lines = self.generated_puzzle.lines
+
+        # Values for the {placeholders} in the level's text
+        self.placeholders = {
+            "name": self.name,
+            "clue": self.clue,
+            "witness": self.witness.name if self.witness else "",
+            "statement": self.witness.provide_statement() if self.witness else "",
+            "motive": self.suspect.reveal_motive() if self.suspect else "",
+        }
 
-    def solve_puzzle(self):
+    def text(self, line):
         """
-        Solve the puzzle in the Study level.
+        Fill in the {placeholders} in a line of the level's text
         """
 
-        print("\nThe puzzle is still on the chalkboard: 3x ≡ 1 (mod 7).")
-        print("Enter the correct value of x to proceed.")
+        return line.format_map(self.placeholders)
 
-        answer = input("Enter your answer: ")
-        if answer.isdigit() and int(answer) == 5:
-            print("\nCorrect! You solved the puzzle.")
-            return True
-        else:
-            print("\nIncorrect answer, try again.")
-            return False
+    async def run(self, steps):
+        """
+        Play a list of steps from the content pack: lines of text, recording a statement or motive,
+        talking to an NPC or pausing
+        """
 
-# Qiu Xie - Level 3: The Kitchen
-class KitchenLevel(Level):
-    def __init__(self):
-        super().__init__("The Kitchen")
-        self.npcs = [
-            NPC("Head Chef", "Hello. I cook the meals for the mansion."),
-            NPC("Sous Chef", "I am the sous chef, I assist the head chef in the kitchen.")
-        ]
-        # Clue for the kitchen level
-        self.clue = "A old tattered recipe, with some words faded, it says 'Bread: 2 Eggs, 500ml Milk, 50 Grams Sugar, 30 Grams Yeast, ...\nIt has poorly written handwriting at the bottom that says 'The flour weight is 10 times the sugar"
-        self.suspect = Suspect("Lady Rosalind", "Lady Rosalind had a complicated relationship with the victim. They recently quarreled, and she was concerned about her reputation.")
-        self.witness = Witness("Chef De Cuisine", "During the incident, I was preparing a meal alongside the Colonel.\nHe wished to learn more about cooking.")
-        self.searched = False
+        for step in steps:
+            if isinstance(step, str):
+                self.io.write(self.text(step))
+            elif "record" in step:
+                if step["record"] == "statement":
+                    await self.game.events.publish(StatementFound(self.witness.provide_statement()))
+                else:
+                    await self.game.events.publish(MotiveFound(self.suspect.reveal_motive()))
+            elif "interact" in step:
+                npc = next(npc for npc in self.npcs if npc.role == step["interact"])
+                self.io.write(f"\n{npc.interact()}")
+            elif "pause" in step:
+                await self.io.pause(step["pause"])
 
-    def start(self):
+    async def start(self):
         """
-        Introduce the kitchen level
+        Introduce the level
         """
 
-        print("\nYou have now entered the kitchen")
-        print("Along the counters are lavish ingredients and cooking utensils.")
-        print("Inside the kitchen there are the two main chefs of the house, along with all the kitchen staff")
+        await self.run(self.content["start"])
 
-    def introduce_npcs(self):
+    async def introduce_npcs(self):
         """
-        Introduce the NPCs in the kitchen
+        List the NPCs in the room and let the player choose who to speak to
         """
 
-        print("\nIn the Kitchen you see the following NPCs:")
+        talk = self.content["talk"]
+        self.io.write(self.text(talk["heading"]))
         for npc in self.npcs:
-            print(f"- {npc.name}, the {npc.role}")
+            self.io.write(f"- {npc.name}, the {npc.role}")
+        await self.run(talk.get("after_list", []))
 
-        # Allow the user to interact with these NPCs
-        choice = input("Who would you like to speak to? (Head Chef / Sous Chef): ").lower()
+        choice = self.NORMALIZERS[talk.get("normalize", "lower")](await self.io.read(self.text(talk["prompt"])))
+
+        # Choices with their own steps come first, e.g. a witness who is not one of the NPCs
+        options = talk.get("options", {})
+        if choice in options:
+            await self.run(options[choice])
+            return
 
         # Find the NPC with that role and interact
-        for npc in self.npcs:
-            if npc.role.lower() == choice:
-                print(f"\n{npc.interact()}")
-                break
-        
+        if talk.get("match_roles", False):
+            for npc in self.npcs:
+                if npc.role.lower() == choice:
+                    self.io.write(f"\n{npc.interact()}")
+                    return
+
+        # The NPC entered was not found
+        await self.run(talk.get("not_found", []))
 
-    def search_room(self):
+    async def search_room(self):
         """
-        Search the kitchen for clues
+        Search the room for clues
         """
 
+        search = self.content["search"]
         if self.searched:
-            print("\nYou have already searched the kitchen.")
+            await self.run(search["already"])
             return
-        
-        # Search the kitchen for clues
-        print("\nYou search the kitchen for clues.")
-        print("You find a cup of coffee on the table.")
-        print("'It just a cup of coffee, nothing else.'")
-        print("\nYou continue to search the kitchen.")
-        print("You find a piece of paper on the kitchen table.")
-        # Print the clue found in the kitchen
-        print(f"It is: {self.clue}")
-        print("You put the note in your pocket for later.")
+
+        await self.run(search["steps"])
         self.searched = True
 
-        print(f"\nThe {self.witness} approaches you as you search the kitchen.")
-        statement = self.witness.provide_statement()
-        print(f"\n{statement}")
+    @property
+    def puzzle(self):
+        """
+        The level's Puzzle, the answer hashes are worked out once per level in the content pack and shared
+        """
+
+        if self.generated_puzzle is not None:
+            return self.generated_puzzle.puzzle
 
-        if statement not in game.witness_statements:
-            game.witness_statements.append(statement)
+        puzzle = ContentLevel._puzzles.get(self.content_id)
+        if puzzle is None:
+            puzzle = ContentLevel._puzzles[self.content_id] = Puzzle.from_content(self.content_id, self.content["puzzle"])
+        return puzzle
+
+    def attempt_allowed(self):
+        """
+        Use up one of the session's attempts at this level's puzzle, telling the player if they have to wait
+        """
 
-        # Mark the suspect
-        motive = self.suspect.reveal_motive()
-        print("\nYou also learn from the chef that Lady Rosalind has a motive to commit the crime.")
-        print(f"{motive}")
+        attempts = self.game.attempts if self.game is not None else None
+        if attempts is None or attempts.allow(self.content_id):
+            return True
 
-        if motive not in game.suspect_motives:
-            game.suspect_motives.append(motive)
+        self.io.write(f"\nYou need to take a moment before trying again. "
+                      f"Try again in {math.ceil(attempts.wait_time(self.content_id))} seconds.")
+        self.game.io.clear()  # Any answers typed ahead were meant for this attempt
+        return False
 
-    def solve_puzzle(self):
+    async def solve_puzzle(self):
         """
-        Solve the puzzle in the kitchen level to collect the clue
+        Ask the player for the answer to the level's puzzle
         """
 
-        # Solve the puzzle to unlock the door
-        print("\nYou see a scale attached to the door.")
-        print("You need to balance the scale to unlock the door.")
-        print("The scale is currently unbalanced.")
-        print("You need to add the correct weight to the scale to balance it.")
-        print("It appears as though there is a white powder on the table.")
+        if not self.attempt_allowed():
+            return False
+
+        puzzle = self.content["puzzle"]
+        await self.run(self.puzzle_lines)
 
-        # Get the user's input for the weight
-        weight = input("What weight would you like to add to the scale?: ").strip().lower()
-        if weight == '500':
-            print("\nCorrect! The door clicks open.")
+        answer = await self.io.read(self.text(puzzle["prompt"]))
+        if self.puzzle.check(answer):
+            await self.run(puzzle["correct"])
             return True
         else:
-            print("\nIncorrect weight, try again.")
+            await self.run(puzzle["incorrect"])
             return False
-        
 
-# Daniel Smyth - Level 4: The Cellar
-class CellarLevel(Level):
-    def __init__(self):
-        super().__init__("The Cellar")
-        self.Detective = {"health": 35, "damage": 8, "charge": False, "user": "Detective"}
-        self.Skeleton = {"health": 25, "damage": 7, "charge": False, "user": "Skeleton"}
-        self.movelist = ["attack", "defend", "charge"]  # Possible moves for the Skeleton
-        self.npcs = [
-            NPC("Groundskeeper", "I saw someone come down here with a clinking sack. After the murder, I've come down here to investigate, but something's clattering and rattling inside.")
-        ]
-        self.suspect = Suspect(
-            "Mr. Blackthorn",
-            "Mr. Blackthorn was in massive debt to the mansion owner. He stood to gain financially from stealing the deeds of the manor."
-        )
-        self.witness = Witness("Artifacts", "You do not find Professor Alabasters prints on the artifacts as you expected.\nYou found Mr. Blackthorns prints on the chest.")
-        self.clue = "It appears as though someone was trying to hide something in the cellar, maybe inside this chest?"
-        self.searched = False
 
-    def start(self):
-        """
-        Introduce the cellar level.
-        """
+# Ryan Pitman - Level 1: The Mansion
+class MansionLevel(ContentLevel):
+    content_id = "mansion"
 
-        print("\nWelcome to The Cellar!")
-        print("The cellar is damp, cold, and cloaked in darkness.")
-        print("A Groundskeeper stands near the door, his lantern casting flickering shadows.")
 
-    def introduce_npcs(self):
-        """
-        Introduce the NPCs in the Cellar.
-        """
+#Adam Pekalski - Level 2: The Study
+class StudyLevel(ContentLevel):
+    content_id = "study"
 
-        print("\nIn the Cellar, you see:")
-        for npc in self.npcs:
-            print(f"- {npc.name}, the {npc.role}")
-        choice = input("Would you like to speak to the Groundskeeper? (yes/no): ").lower()
-        if choice == "yes":
-            print(f"\n{self.npcs[0].interact()}")
-            print("You learn that Mr. Blackthorn has a motive to commit the crime.")
-            motive = self.suspect.reveal_motive()
-            print(f"{motive}")
-            if motive not in game.suspect_motives:
-                game.suspect_motives.append(motive)
-        else:
-            print("\nYou decide not to speak to the Groundskeeper.")
 
-    def search_room(self):
-        """
-        Search the room for clues.
-        """
+# Qiu Xie - Level 3: The Kitchen
+class KitchenLevel(ContentLevel):
+    content_id = "kitchen"
+
+
+# What each fighter in the Cellar keeps track of, the type of each key
+FIGHTER_STATE = {"health": int, "damage": int, "charge": bool, "user": str}
 
-        if self.searched:
-            print("\nYou have already found the chest.")
-        else:
-            print("\nYou cautiously search the cellar. The faint sound of rattling echoes in the darkness.")
-            print("You find a locked chest, but something seems to be guarding it.")
-            self.searched = True
 
-    def solve_puzzle(self):
+# Daniel Smyth - Level 4: The Cellar
+class CellarLevel(ContentLevel):
+    content_id = "cellar"
+    state_fields = {"searched": bool, "Detective": FIGHTER_STATE, "Skeleton": FIGHTER_STATE}
+    policy = None  # Table of the best moves, loaded the first time a player asks for a hint
+    # Extra menu command for this level, the hint can also be asked for during the fight
+    commands = (Command("hint", ("hint", "h"), "Ask for the best move against the Skeleton",
+                        lambda game, level: level.hint()),)
+
+    def __init__(self, game=None, content_id=None, content=None):
+        super().__init__(game, content_id, content)
+        fighters = self.content["fighters"]
+        self.Detective = {"health": fighters["detective"]["health"], "damage": fighters["detective"]["damage"],
+                          "charge": False, "user": "Detective"}
+        self.Skeleton = {"health": fighters["skeleton"]["health"], "damage": fighters["skeleton"]["damage"],
+                         "charge": False, "user": "Skeleton"}
+        self.movelist = ["attack", "defend", "charge"]  # Possible moves for the Skeleton
+
+    async def solve_puzzle(self):
         """
         Engage in combat with the Skeleton to obtain the clue.
         """
 
+        puzzle = self.content["puzzle"]
         if not self.searched:
-            print("\nYou haven't found the chest yet. Explore the cellar first!")
+            await self.run(puzzle["locked"])
+            return False
+        if not self.attempt_allowed():
             return False
 
-        print("\nYou approach the chest, but a Skeleton emerges from the shadows!")
-        print("To retrieve the key around its neck, you must defeat it in combat.")
+        await self.run(puzzle["lines"])
         
         # Combat loop
         while self.Detective["health"] > 0 and self.Skeleton["health"] > 0:
-            print(f"\nDetective's Health: {self.Detective['health']}, Charge: {self.Detective['charge']}")
-            print(f"Skeleton's Health: {self.Skeleton['health']}, Charge: {self.Skeleton['charge']}")
+            self.io.write(f"\nDetective's Health: {self.Detective['health']}, Charge: {self.Detective['charge']}")
+            self.io.write(f"Skeleton's Health: {self.Skeleton['health']}, Charge: {self.Skeleton['charge']}")
 
             # Get the Detective's move
-            input1 = input("Detective | Choose your move (attack/charge/defend): ").strip().lower()
+            input1 = (await self.io.read("Detective | Choose your move (attack/charge/defend/hint): ")).strip().lower()
+
+            # Asking for a hint does not use up a turn
+            if input1 == "hint":
+                self.hint()
+                continue
 
             # Skeleton randomly selects a move
-            input2 = random.choice(self.movelist)
+            input2 = self.rng.choice(self.movelist)
 
-            print(f"\nDetective chose: {input1}")
-            print(f"Skeleton chose: {input2}")
+            self.io.write(f"\nDetective chose: {input1}")
+            self.io.write(f"Skeleton chose: {input2}")
 
             # Perform the moves
             self.move(input1, input2, self.Detective, self.Skeleton)
@@ -770,25 +1701,14 @@ class CellarLevel(Level):
 
         # Determine combat outcome
         if self.Detective["health"] <= 0 and self.Skeleton["health"] <= 0:
-            print("\nBoth the Skeleton and the Detective collapse!")
-            print("You wake up at the top of the cellar stairs, unsure of what happened.")
+            await self.run(puzzle["double_ko"])
             return False
         elif self.Detective["health"] <= 0:
-            print("\nThe Skeleton defeats you! You stumble upstairs in defeat.")
+            await self.run(puzzle["lose"])
             return False
         elif self.Skeleton["health"] <= 0:
-            print("\nThe Skeleton crumbles to dust, dropping the key!")
-            print("You unlock the chest and discover artifacts hidden inside.")
-            print("You dust the artifacts for fingerprints.")
-
-            # Add the witness statement to the game
-            statement = self.witness.provide_statement()
-
-            if statement not in game.witness_statements:
-                game.witness_statements.append(statement)
-            
-            print(f"\n{statement}")
-
+            # The win steps add the witness statement to the game
+            await self.run(puzzle["win"])
             return True
 
     def move(self, main_move, other_move, main_stats, other_stats):
@@ -803,7 +1723,7 @@ class CellarLevel(Level):
         elif main_move in ["charge", "chg"]:
             self.charge(main_stats)
         else:
-            print(f"Invalid move: {main_move}. {main_stats['user']} wastes their turn.")
+            self.io.write(f"Invalid move: {main_move}. {main_stats['user']} wastes their turn.")
 
     def attack(self, main_stats, other_move, other_stats):
         """
@@ -814,10 +1734,10 @@ class CellarLevel(Level):
         main_stats["charge"] = False  # Reset charge after attack
         if other_move in ["defend", "def"]:
             reduced_damage = int(damage * 0.25)
-            print(f"{other_stats['user']} defends and reduces damage by {damage - reduced_damage}.")
+            self.io.write(f"{other_stats['user']} defends and reduces damage by {damage - reduced_damage}.")
             damage = reduced_damage
         other_stats["health"] -= damage
-        print(f"{main_stats['user']} deals {damage} damage to {other_stats['user']}.")
+        self.io.write(f"{main_stats['user']} deals {damage} damage to {other_stats['user']}.")
 
     def charge(self, main_stats):
         """
@@ -826,278 +1746,192 @@ class CellarLevel(Level):
 
         main_stats["charge"] = not main_stats["charge"]
         status = "charged" if main_stats["charge"] else "uncharged"
-        print(f"{main_stats['user']} has {status} their attack.")
+        self.io.write(f"{main_stats['user']} has {status} their attack.")
 
     def defend(self, main_stats):
         """
         Handle defend logic.
         """
 
-        print(f"{main_stats['user']} takes a defensive stance.")
-
-#Erik Hansen Lopez - Level 5: The Garden
-class GardenLevel(Level):
-    def __init__(self):
-        super().__init__("The Garden")  # Level name
-        # Set NPCs in the Garden level
-        self.npcs = [
-            NPC("Gardener", "I've been trying to identify this mysterious plant in the note. Can you help me solve this puzzle?"),
-            NPC("Herbologist", "If I may, I think the puzzle refers to a poisonous plant. Something with 'shade,' perhaps?")
-        ]
-        self.witness = Witness("Gardener", "Dr. Steele was with me at the time of the murder.\nAnd look, the footprints in the Nightshade patch are too small for Dr. Steele's foot size.")
-        self.suspect = Suspect("Colonel Hawthorne", "The victim has recently threatened to reveal a scandal from Hawthrones past, which would ruin is reputation")
-        self.clue = "A poisonous plant, that might be something to do with 'shade'"
-        self.searched = False  # Track whether the level's puzzle has been solved
-
-    def start(self):
-        """
-        Start the Garden level
-        """
-
-        print(f"\nWelcome to the {self.name}!")
-        print(
-            "You enter the Garden. The room is bright, with vibrant-colored flowers and plants growing everywhere.\n"
-            "Right in the center of the room stands a beautiful fountain where two figures can be spotted.\n"
-            "One is staring at a note in confusion, while the other is examining the flowers."
-        )
-
-    def introduce_npcs(self):
-        """
-        Introduce the gardener and herbologist in the garden.
-        """
-
-        print("\nIn the Garden, you see the following NPCs:")
-        for npc in self.npcs:
-            print(f"- {npc.name}, the {npc.role}")
-
-        # Allow the user to interact with these NPCs
-        choice = input("\nWho would you like to speak to? (Gardener / Herbologist): ").strip().lower()
-        if choice == "gardener":
-            self.interact_with_gardener()
-        elif choice == "herbologist":
-            self.interact_with_herbologist()
-        else:
-            print("\nInvalid choice. Please try again.")
+        self.io.write(f"{main_stats['user']} takes a defensive stance.")
 
-    def interact_with_gardener(self):
+    def hint(self):
         """
-        Interact with the gardener NPC
+        Suggest the best move for the current fight using the precomputed table from cellar_solver.py
         """
 
-        print(f"\n{self.npcs[0].interact()}")
-        print("I swear I've seen this plant before, but I can't remember the name.")
+        if self.Detective["health"] <= 0 or self.Skeleton["health"] <= 0:
+            self.io.write("\nHint: the fight is over, there is no move to suggest.")
+            return
 
-    def interact_with_herbologist(self):
-        """
-        Interact with the herbologist NPC
-        """
+        # The table is loaded once and shared by every Cellar level
+        if CellarLevel.policy is None or not CellarLevel.policy.covers(
+                self.Detective["health"], self.Detective["damage"], self.Skeleton["health"], self.Skeleton["damage"]):
+            from cellar_solver import CellarPolicy
+            CellarLevel.policy = CellarPolicy.for_fighters(self.Detective, self.Skeleton)
 
-        print(f"\n{self.npcs[1].interact()}")
-        print("The Herbologist continues: 'The answer might be a poisonous plant. But which one? Something with 'shade,' perhaps?'")
-        print("You also learn that Colonel Hawthorne has a motive to commit the crime.")
-        motive = self.suspect.reveal_motive()
-        print(f"{motive}")
+        move, chance = CellarLevel.policy.lookup(self.Detective, self.Skeleton)
+        self.io.write(f"\nHint: your best move is to {move}, giving you a {chance:.0%} chance of winning.")
 
-        if motive not in game.suspect_motives:
-            game.suspect_motives.append
-        
 
-    def solve_puzzle(self):
-        """
-        Solve the puzzle in the Garden level
-        """
+#Erik Hansen Lopez - Level 5: The Garden
+class GardenLevel(ContentLevel):
+    content_id = "garden"
 
-        print("\nThe note reads:")
-        print("'I am a plant with dark purple or black berries and a reputation for being highly toxic.'")
-        print("'My leaves are broad and oval-shaped, and I am often associated with witchcraft and dark magic. What am I?'")
-        
-        # Correct answer to the puzzle
-        correct_answer = "nightshade"
-        user_answer = input("Enter your answer: ").strip().lower()
 
-        if user_answer == correct_answer:
-            print("\nYou identify the plant as Nightshade.")
-            print("Looking around the patches, you realize there are footprints nearby.")
-            print("The footprints are too small for Dr. Steele's foot size.")
+# Andrew Cotter - Level 6: The Observatory
+class ObservatoryLevel(ContentLevel):
+    content_id = "observatory"
 
-            # Add the witness statement to the game
-            statement = self.witness.provide_statement()
 
-            if statement not in game.witness_statements:
-                game.witness_statements.append(statement)
+class FinalLevel(ContentLevel):
+    content_id = "final"
+    state_fields = {"searched": bool, "in_chamber": bool, "has_entered": bool}
 
-            return True
-        else:
-            print("\nHmm, that’s not quite right. Keep thinking!")
+    def __init__(self, game=None, content_id=None, content=None):
+        super().__init__(game, content_id, content)
+        self.in_chamber = False
+        self.has_entered = False
 
-    def search_room(self):
+    async def introduce_npcs(self):
         """
-        Search the room for clues.
+        Introduces the final NPC who reveals the murderer
         """
 
-        if self.searched:
-            print("\nYou have already searched the room in this level.")
-        else:
-            print("\nYou search the garden carefully, noticing a note held by the Gardener.")
-            print("Perhaps solving the puzzle on the note will lead to more information.")
-            print("You think about what the Herbologist said about a poisonous plant.")
-            self.searched = True
-
-# Andrew Cotter - Level 6: The Observatory
-class ObservatoryLevel(Level):
-    def __init__(self):
-        super().__init__("The Observatory") # Level name
-        self.npcs = [
-            NPC("Professor", "Hmm? You say that somebody was murdered?"),
-            NPC("Colonel", "What? A murder? How could that have happened?")
-        ]
-        self.suspect = Suspect("Dr. Victor Steele", "The mansion ownder funded Dr. Steeles Experiments but recently withdrew support, jeapordizing his career")
-        self.clue = "After looking through the telescope you discover that it is aimed at the constellation 'ursa major'"
-        self.searched = False
+        chamber = self.content["chamber"]
+        if not self.in_chamber:
+            await self.run(chamber["not_entered"])
+            return
+        
+        if self.has_entered:
+            await self.run(chamber["already"])
+            return
+        
+        await self.run(chamber["reveal"])
+        self.has_entered = True
 
-    def start(self):
+    async def search_room(self):
         """
-        Introduces the observatory level
+        Enters the player into the hidden chamber
         """
+        if self.searched:
+            await self.run(self.content["search"]["already"])
+            return
+        self.in_chamber = True
+        await self.introduce_npcs()
+        self.searched = True
 
-        print(f"\nWelcome to {self.name}!")
-        print("You enter the observatory, a large telescope dominates the middle of the room, star charts cover the walls.")
-        print("In the room stands a colonel and professor")
-
-    def introduce_npcs(self):
+    async def solve_puzzle(self):
         """
-        Introduces the colonel and professor in the observatory
+        Prints the end game message
         """
+        await self.run(self.content["puzzle"]["lines"])
+        
+        return True
 
-        print("\nIn the observatory you see the following NPCs:")
-        for npc in self.npcs:
-            print(f"- {npc.name}, the {npc.role}")
-
-        # Allow the user to interact with these NPCs
-        choice = input("Who would you like to speak to? (Professor / Colonel): ").lower()
 
-        # Find the NPC with that role and interact
-        for npc in self.npcs:
-            if npc.role.lower() == choice:
-                print(f"\n{npc.interact()}")
-                return
-        
-        # The NPC entered was not found
-        print("\nYou were unable to find that NPC in the room.")
+# Levels that need their own code, any other level in the content pack is played by the class for its kind
+LEVEL_CLASSES = {level.content_id: level for level in (
+    MansionLevel, StudyLevel, KitchenLevel, CellarLevel, GardenLevel, ObservatoryLevel, FinalLevel)}
+KIND_CLASSES = {"room": ContentLevel, "combat": CellarLevel, "finale": FinalLevel}
 
-    def search_room(self):
-        """
-        Search the observatory for clues
-        """
+for level_id in game_content.level_ids():
+    level_class = LEVEL_CLASSES.get(level_id) or KIND_CLASSES[game_content.kind(level_id)]
+    level_registry.register(partial(level_class, content_id=level_id))
 
-        if self.searched:
-            print("\nYou have already searched the observatory.")
-            return
 
-        print("\nYou search the observatory for clues.")
-        print("You find star charts covering the walls depicting a number of constellations, you note what constellations you see.")
-        print(f"You decide to check the telescope. {self.clue}")
-        print("You put the note in your pocket for later.")
-        self.searched = True
+class GeneratedMansion:
+    """
+    The levels of a procedurally generated mansion, used in place of level_registry:
+    Game(registry=GeneratedMansion(10000))
+    Each room is generated when the player reaches it and only the last few levels are kept,
+    so the memory a game uses does not grow with the size of the mansion
+    The last level is always the final level from the content pack
+    """
 
-        # Add the suspect motive to the game
-        motive = self.suspect.reveal_motive()
-        print("\nThe colonel approaches you, and informs you that Dr. Victor Steele has a motive to commit the crime.")
-        print(f"{motive}")
+    keep = 2  # How many levels each game holds on to
 
-        if motive not in game.suspect_motives:
-            game.suspect_motives.append(motive)
+    def __init__(self, rooms, seed=None):
+        self.generator = MansionGenerator(rooms, seed)
 
+    def __len__(self):
+        return len(self.generator)
 
-    def solve_puzzle(self):
+    def __getitem__(self, index):
         """
-        Solve the puzzle in the mansion level to collect the clue
+        The factory for one level, the room's content is generated here
         """
 
-        print("\nYou see a lockbox with a constellation on it.")
-        print("You need to input the name of the constellation to unlock it.")
+        if index == len(self.generator) - 1:
+            return LEVEL_CLASSES["final"]
+        content = self.generator.room(index)
+        return partial(KIND_CLASSES[content["kind"]], content_id=content["id"], content=content)
 
-        answer = input("What word would you like to enter?: ").strip().lower()
-        if answer == "ursa major":
-            print("Correct! You found the clue.")
-            return True
-        else:
-            print("Incorrect word, try again.")
-            return False
-
-class FinalLevel(Level):
-    def __init__(self):
-        super().__init__("The Final Level")
-        self.searched = False
-        self.in_chamber = False
-        self.has_entered = False
-        self.clue = "Mr. Blackthorn is standing in the chamber!"
-
-    def start(self):
+    def levels_for(self, game):
         """
-        Starts the final level of the game
+        Returns the levels for one game, created one at a time as the player advances
         """
-        print("\nYou have found a doorway that leads to a hidden chamber.")
-        print("The door is locked with a complex mechanism.")
-        print("You check your inventory and find the broken key parts you collected.")
-        print("It seems that you need to assemble the key to unlock the door.")
-        print("You carefully assemble the key and insert it into the lock.")
-        print("The door clicks open, revealing a hidden chamber.")
 
+        return LevelSequence(self, game, self.keep)
 
-    def introduce_npcs(self):
-        """
-        Introduces the final NPC who reveals the murderer
-        """
 
-        if not self.in_chamber:
-            print("\nYou have not entered the hidden chamber yet.")
-            return
-        
-        if self.has_entered:
-            print("\nNo time to waste! Arrest the suspect!")
-            return
-        
-        print("\nYou enter the hidden chamber.")
-        time.sleep(1)
-        print("In the center of the room, you see a figure standing in the shadows.")
-        time.sleep(1)
-        print("As you approach, the figure steps forward into the light.")
-        time.sleep(1)
-        print("It is the entrepreneur, Mr. Blackthorn.")
-        time.sleep(1)
-        print("He looks at you with a cold, calculating gaze.")
-        time.sleep(1)
-        print("You realize that he is the mastermind behind the murder")
+def static_text():
+    """
+    Returns every fixed piece of text that can end up in a save: witness statements, suspect motives and key parts
+    The binary save format stores these as small ids instead of the full text
+    """
 
-        self.has_entered = True
+    text = []
+    for level_factory in level_registry.factories:
+        level = level_factory()
+        witness = getattr(level, "witness", None)
+        suspect = getattr(level, "suspect", None)
+        if witness is not None:
+            text.append(witness.provide_statement())
+        if suspect is not None:
+            text.append(suspect.reveal_motive())
 
-    def search_room(self):
-        """
-        Enters the player into the hidden chamber
-        """
-        if self.searched:
-            print("You have already searched the hidden chamber")
-            return
-        self.in_chamber = True
-        self.introduce_npcs()
-        self.searched = True
+    # Every level except the final one awards a key part
+    text.extend(f"Broken Key Part {number}" for number in range(1, len(level_registry)))
+    return text
 
-    def solve_puzzle(self):
-        """
-        Prints the end game message
-        """
-        print("\nYou successfully found the truth of the murder in this mansion")
-        print("By collecting witness statements and clues, you were able to eliminate possibilities of the suspects")
-        print("You arrest Mr. Blackthorn in his hidden chamber for the murder")
-        print("He used nightshade from the garden to poison the food of the victim")
-        
-        return True
 
 # Main method to run the game
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mystery adventure game by Null Pointer")
+    parser.add_argument("--sqlite", metavar="DATABASE", help="keep one save per player in an SQLite database")
+    parser.add_argument("--binary", metavar="FOLDER", help="keep one compact binary save per player in a folder")
+    parser.add_argument("--compress", action="store_true", help="compress the binary saves with zlib")
+    parser.add_argument("--pace", metavar="SPEED", type=float, default=1.0,
+                        help="speed of the pauses in the story, 2 is twice as fast and 0 turns them off (default 1)")
+    parser.add_argument("--rooms", metavar="ROOMS", type=int,
+                        help="play through a generated mansion with this many levels instead")
+    parser.add_argument("--mansion-seed", metavar="SEED", type=int, help="generate the same mansion every time")
+    parser.add_argument("--metrics", metavar="PREFIX",
+                        help="time the game and write PREFIX.prom (Prometheus) and PREFIX.json when it ends")
+    parser.add_argument("--record", metavar="FILE", help="record the session to FILE to replay it with recording.py")
+    args = parser.parse_args()
+
     # Create a game instance
-    game = Game()
+    save_backend = None
+    if args.sqlite:
+        save_backend = SQLiteSaveBackend(args.sqlite)
+    elif args.binary:
+        save_backend = BinarySaveBackend(args.binary, static_text(), compress=args.compress)
+    registry = GeneratedMansion(args.rooms, args.mansion_seed) if args.rooms else None
+    metrics = Metrics() if args.metrics else None
+    io = ConsoleIO(Pacer(speed=args.pace, enabled=sys.stdin.isatty()))
+    recorder = None
+    if args.record:
+        if save_backend is None:
+            save_backend = JsonSaveBackend(Path(__file__).parent / "save_game.json")
+        recorder = SessionRecorder(args.record, io, save_backend)
+        io, save_backend = recorder.io, recorder.save_backend
+    game = Game(io=io, save_backend=save_backend, registry=registry, metrics=metrics)
 
     # Start the game
-    game.start()
\ No newline at end of file
+    try:
+        asyncio.run(recorder.play(game, registry) if recorder is not None else game.start())
+    finally:
+        if metrics is not None:
+            metrics.export(args.metrics)
\ No newline at end of file
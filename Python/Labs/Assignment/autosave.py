@@ -0,0 +1,168 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Background autosaving for the mystery adventure game
+# Solving a level used to wait for the save to reach the disk before the player saw the next level, so a slow or
+# network mounted disk made every solve slow. Now Game.save_game() only hands a snapshot of the game (see
+# Game.snapshot) to an Autosaver and returns straight away, and a worker thread turns it into a game state and writes it
+# If a player saves again before their last save was written, only the newest one is written (the older one is
+# dropped), so a burst of saves costs one write. An SQLite backend gets every waiting save in one transaction
+# Waiting saves are written when the game is quit and when Python exits, and each Autosaver counts its writes,
+# dropped writes, failed writes and how long saves waited to be written (the save lag)
+#
+# Usage: autosaver = Autosaver(save_backend); autosaver.save(game.snapshot()); autosaver.flush()
+
+import time
+import atexit
+import asyncio
+import logging
+import threading
+import weakref
+
+from metrics import NO_METRICS
+
+
+logger = logging.getLogger("mystery.autosave")
+
+
+class Autosaver:
+    def __init__(self, save_backend, metrics=None):
+        """
+        Writes game snapshots to save_backend in the background, one Autosaver can be shared by many games
+        The worker thread is only running while there are saves waiting to be written
+        With metrics the write times are recorded as storage (operation=save) and the save lag as save_lag
+        """
+
+        self.save_backend = save_backend
+        self.metrics = metrics if metrics is not None else NO_METRICS
+        self._pending = {}  # Player name -> (newest snapshot, when the oldest unwritten save was asked for)
+        self._condition = threading.Condition()
+        self._worker = None
+        self._asked = 0  # Saves asked for so far, flush() waits until the worker has dealt with all of them
+        self._done = 0
+        self._error = None  # The last write that failed, raised by flush()
+        self.writes = 0
+        self.dropped = 0  # Saves replaced by a newer one before they were written
+        self.failed = 0
+        self.last_lag = 0.0  # Seconds from asking for the last save written until it was written
+        self.max_lag = 0.0
+        # Created here so the worker thread only ever adds to them
+        self._write_times = self.metrics.histogram("storage", operation="save")
+        self._lags = self.metrics.histogram("save_lag")
+        _autosavers.add(self)
+
+    @property
+    def pending(self):
+        """
+        How many players have a save waiting to be written
+        """
+
+        return len(self._pending)
+
+    def save(self, snapshot):
+        """
+        Ask for a snapshot to be written, returns without waiting for it
+        """
+
+        with self._condition:
+            self._asked += 1
+            earlier = self._pending.get(snapshot.player_name)
+            if earlier is not None:
+                self.dropped += 1
+            self._pending[snapshot.player_name] = (snapshot, earlier[1] if earlier else time.perf_counter())
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="autosave", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        """
+        Write saves until there are none waiting, everything asked for while a write is going on is
+        written afterwards in one go
+        """
+
+        while True:
+            with self._condition:
+                if not self._pending:
+                    self._worker = None
+                    return
+                batch, self._pending, upto = list(self._pending.values()), {}, self._asked
+            self._write(batch)
+            with self._condition:
+                self._done = upto
+                self._condition.notify_all()
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        try:
+            states = [snapshot.to_state() for snapshot, _ in batch]
+            if len(states) > 1 and hasattr(self.save_backend, "save_many"):
+                self.save_backend.save_many(states)
+            else:
+                for state in states:
+                    self.save_backend.save(state)
+        except Exception as error:
+            logger.exception("Autosave of %d game(s) failed", len(batch))
+            with self._condition:
+                self.failed += len(batch)
+                self._error = error
+            return
+
+        written = time.perf_counter()
+        with self._condition:
+            self.writes += len(batch)
+            for _, asked in batch:
+                self.last_lag = written - asked
+                self.max_lag = max(self.max_lag, self.last_lag)
+                if self.metrics.enabled:
+                    self._lags.add(self.last_lag)
+        if self.metrics.enabled:
+            self._write_times.add(written - start)
+
+    def flush(self, timeout=None):
+        """
+        Wait until every save asked for so far has been written, saves asked for while waiting are not waited for
+        Raises the error of a write that failed since the last flush, so a lost save is never silent
+        """
+
+        with self._condition:
+            asked = self._asked
+            self._condition.wait_for(lambda: self._done >= asked, timeout)
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    async def wait(self):
+        """
+        flush() for a game, the event loop keeps running other games while it waits
+        """
+
+        if self._done < self._asked or self._error is not None:
+            await asyncio.to_thread(self.flush)
+
+    def stats(self):
+        """
+        The counters as a dictionary, e.g. for a status line
+        """
+
+        return {"writes": self.writes, "dropped": self.dropped, "failed": self.failed, "pending": self.pending,
+                "last_lag": self.last_lag, "max_lag": self.max_lag}
+
+
+# Every Autosaver still in use, so waiting saves can be written when Python exits
+_autosavers = weakref.WeakSet()
+
+
+@atexit.register
+def flush_all():
+    """
+    Write every waiting save, called when Python exits
+    """
+
+    for autosaver in list(_autosavers):
+        try:
+            autosaver.flush()
+        except Exception:
+            logger.exception("Autosave could not be written before exiting")
@@ -0,0 +1,88 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Benchmark for background autosaving (see autosave.py)
+# Plays the scripted playthroughs with a save backend that takes DELAY milliseconds for every write, like a slow or
+# network mounted disk, and compares how long the "Solve the puzzle" command takes when the game waits for each save
+# to be written (the way it used to) and when the autosaver writes it in the background
+#
+# Usage: python benchmark_autosave.py [playthroughs] [--delay MS]
+
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+from OOP_Assignment import Game
+from benchmark_playthrough import PlaythroughIO, PLAYTHROUGH_SCRIPT
+from save_storage import JsonSaveBackend
+from metrics import Metrics
+
+
+class SlowSaveBackend(JsonSaveBackend):
+    def __init__(self, save_path, delay):
+        """
+        A JSON save backend where every save takes at least `delay` seconds
+        """
+
+        super().__init__(save_path)
+        self.delay = delay
+
+    def save(self, state):
+        time.sleep(self.delay)
+        super().save(state)
+
+
+async def run_all(playthroughs, delay, wait_for_saves):
+    """
+    Play every playthrough, returns the metrics and the autosave counters added up
+    """
+
+    metrics = Metrics()
+    totals = {"writes": 0, "dropped": 0, "max_lag": 0.0}
+    with tempfile.TemporaryDirectory() as folder:
+        save_path = Path(folder) / "save_game.json"
+        for seed in range(playthroughs):
+            save_path.unlink(missing_ok=True)
+            game = Game(io=PlaythroughIO(PLAYTHROUGH_SCRIPT), save_backend=SlowSaveBackend(save_path, delay),
+                        seed=seed, metrics=metrics)
+            if wait_for_saves:
+                # The old behaviour, the solve command waits until the save is on disk
+                async def save_and_wait(game=game, save=game.save_game):
+                    save()
+                    await game.autosaver.wait()
+                game.save_game = save_and_wait
+
+            try:
+                await game.start()
+            except EOFError:
+                await game.autosaver.wait()  # Lost the Cellar fight
+            stats = game.autosaver.stats()
+            totals["writes"] += stats["writes"]
+            totals["dropped"] += stats["dropped"]
+            totals["max_lag"] = max(totals["max_lag"], stats["max_lag"])
+    return metrics, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare solve latency with and without background autosaving")
+    parser.add_argument("playthroughs", nargs="?", type=int, default=50, help="number of playthroughs (default 50)")
+    parser.add_argument("--delay", metavar="MS", type=float, default=20.0, help="time each save takes (default 20)")
+    args = parser.parse_args()
+
+    print(f"Every save takes {args.delay:.0f} ms, {args.playthroughs} playthroughs")
+    for name, wait_for_saves in (("Waiting for the save", True), ("Background autosave", False)):
+        metrics, totals = asyncio.run(run_all(args.playthroughs, args.delay / 1000, wait_for_saves))
+        solve = metrics.histogram("command", command="solve")
+        lag = metrics.histogram("save_lag")
+        print(f"{name:<22} solve mean {solve.total / solve.count * 1e3:7.3f} ms, "
+              f"p99 <= {solve.quantile(0.99) * 1e3:7.3f} ms   {totals['writes']} writes, {totals['dropped']} dropped, "
+              f"save lag mean {lag.total / max(lag.count, 1) * 1e3:.1f} ms, max {totals['max_lag'] * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Microbenchmark of the OrderedSet used for the inventory, witness statements and suspect motives
+# against the plain list with an `in` check that the game used before
+#
+# Usage: python benchmark_collections.py
+
+import time
+
+from OOP_Assignment import OrderedSet
+
+
+SIZES = [1_000, 10_000, 50_000]
+LOOKUPS = 2_000
+
+
+def statement(number):
+    """
+    A long statement like the ones the witnesses give
+    """
+
+    return f"Witness {number}'s statement: All I know is, I saw someone enter the house shortly before we found the body! ({number})"
+
+
+def fill_list(items):
+    """
+    The old way of collecting statements
+    """
+
+    collected = []
+    for item in items:
+        if item not in collected:
+            collected.append(item)
+    return collected
+
+
+def fill_set(items):
+    """
+    Collecting statements with the OrderedSet
+    """
+
+    collected = OrderedSet()
+    for item in items:
+        collected.add(item)
+    return collected
+
+
+def time_lookups(collection, probes):
+    """
+    Average time of one membership check in microseconds
+    """
+
+    start = time.perf_counter()
+    for probe in probes:
+        probe in collection
+    return (time.perf_counter() - start) / len(probes) * 1e6
+
+
+def main():
+    print(f"{'Entries':>8} | {'list insert us':>15} {'list lookup us':>15} | {'set insert us':>14} {'set lookup us':>14}")
+
+    for size in SIZES:
+        items = [statement(number) for number in range(size)]
+        # Look for a mix of statements the player has and has not found, built fresh so they are not the same objects
+        probes = [statement(number * 7 % (size * 2)) for number in range(LOOKUPS)]
+
+        # Inserting into a list is quadratic overall, so only time it for the smaller sizes
+        if size <= 10_000:
+            start = time.perf_counter()
+            as_list = fill_list(items)
+            list_insert = (time.perf_counter() - start) / size * 1e6
+            list_lookup = time_lookups(as_list, probes)
+        else:
+            list_insert = list_lookup = float("nan")
+
+        start = time.perf_counter()
+        as_set = fill_set(items)
+        set_insert = (time.perf_counter() - start) / size * 1e6
+        set_lookup = time_lookups(as_set, probes)
+
+        print(f"{size:>8} | {list_insert:>15.3f} {list_lookup:>15.3f} | {set_insert:>14.3f} {set_lookup:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
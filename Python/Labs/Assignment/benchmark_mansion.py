@@ -0,0 +1,152 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Scaling benchmark for the mystery adventure game
+# Plays one game through a generated mansion (see mansion_generator.py) without a terminal, talking to the witness,
+# searching and solving the puzzle in every room, and reports:
+# - the cost of moving from one level to the next (from answering a puzzle until the next room's menu is shown,
+#   which includes the save and generating the next room)
+# - how the memory used grows with the number of rooms played
+# - how big the save gets
+#
+# Usage: python benchmark_mansion.py [number of rooms] [--seed SEED] [--sqlite]
+
+import time
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+from collections import deque
+
+from OOP_Assignment import Game, GameIO, GeneratedMansion
+from benchmark_playthrough import STUDY_ANSWER, KITCHEN_ANSWER, STUDY_PUZZLE, KITCHEN_CLUE, solve_from_text, percentile
+from puzzles import RiddlePuzzles
+from save_storage import JsonSaveBackend, SQLiteSaveBackend
+
+
+RIDDLE_ANSWERS = {f"'{riddle}'": answer for riddle, answer, _ in RiddlePuzzles.RIDDLES}
+ROOM_COMMANDS = ("1", "3", "4")  # Talk to the witness, search the room and solve the puzzle
+
+
+class MansionIO(GameIO):
+    def __init__(self, game_ref):
+        """
+        Plays every room of the mansion the same way, only keeping the last few lines the game has written
+        game_ref is a function returning the game, the player looks up who the witness is from the level
+        """
+
+        super().__init__()
+        self.game_ref = game_ref
+        self.recent = deque(maxlen=20)  # Enough to see the clue and the puzzle
+        self.commands = iter(())
+        self.room = None
+        self.solved_at = None
+        self.transitions = []  # Seconds from solving a puzzle to the next room's menu
+
+    def answer_puzzle(self):
+        """
+        Work out the answer from the text the player has seen
+        """
+
+        text = "\n".join(self.recent)
+        for line in reversed(self.recent):
+            if line in RIDDLE_ANSWERS:
+                return RIDDLE_ANSWERS[line]
+        if STUDY_PUZZLE.search(text):
+            return solve_from_text(STUDY_ANSWER, text)
+        if KITCHEN_CLUE.search(text):
+            return solve_from_text(KITCHEN_ANSWER, text)
+        return ""
+
+    async def read(self, prompt=""):
+        game = self.game_ref()
+        if prompt.startswith("Please enter your name"):
+            return "Benchmark"
+        if "Who would you like to speak to?" in prompt:
+            return game.levels[game._current_level].witness.name.rsplit(" ", 1)[0]
+        if prompt.startswith("Enter your answer"):
+            self.solved_at = time.perf_counter()
+            return self.answer_puzzle()
+
+        # The menu, each room is played with the same commands
+        if self.room != game._current_level:
+            if self.solved_at is not None:
+                self.transitions.append(time.perf_counter() - self.solved_at)
+            self.room = game._current_level
+            self.commands = iter(ROOM_COMMANDS)
+            self.recent.clear()  # Only this room's puzzle matters now
+        return next(self.commands, "8")  # Give up if a room could not be solved
+
+    def write(self, text=""):
+        self.recent.append(text)
+
+
+async def play(rooms, seed, save_backend, memory_every, history_limit=1000):
+    """
+    Play the whole mansion, returns the game, its io and (rooms played, traced memory in bytes) samples
+    """
+
+    io = MansionIO(lambda: game)
+    game = Game(io=io, save_backend=save_backend, registry=GeneratedMansion(rooms, seed), seed=seed,
+                history_limit=history_limit)
+
+    samples = []
+    original_save = game.save_game
+
+    def save_and_sample():
+        original_save()
+        if tracemalloc.is_tracing() and game._current_level % memory_every == 0:
+            samples.append((game._current_level, tracemalloc.get_traced_memory()[0]))
+
+    game.save_game = save_and_sample
+    await game.start()
+    return game, io, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play through a generated mansion and report how the engine scales")
+    parser.add_argument("rooms", nargs="?", type=int, default=10000, help="number of levels (default 10000)")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the mansion and the game (default 1)")
+    parser.add_argument("--sqlite", action="store_true", help="save to SQLite instead of the JSON journal")
+    parser.add_argument("--memory", action="store_true", help="trace memory use as the rooms are played (slower)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        folder = Path(folder)
+        if args.sqlite:
+            save_backend = SQLiteSaveBackend(folder / "saves.db")
+        else:
+            save_backend = JsonSaveBackend(folder / "save_game.json")
+
+        if args.memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        game, io, samples = asyncio.run(play(args.rooms, args.seed, save_backend, max(args.rooms // 10, 1)))
+        elapsed = time.perf_counter() - start
+        if args.memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        save_backend.close()
+        save_size = sum(path.stat().st_size for path in folder.iterdir())
+
+    transitions = io.transitions
+    print(f"Rooms:             {game._current_level} of {args.rooms} played, "
+          f"{game.levels.created()} levels created, {len(game.levels._levels)} held at the end")
+    print(f"Total time:        {elapsed:.3f} s ({game._current_level / elapsed:.0f} rooms/sec)")
+    print(f"Level transition:  mean {sum(transitions) / max(len(transitions), 1) * 1e6:.1f} us, "
+          f"p50 {percentile(transitions, 0.5) * 1e6:.1f} us, p99 {percentile(transitions, 0.99) * 1e6:.1f} us")
+    print(f"Collected:         {len(game.witness_statements)} statements, {len(game.suspect_motives)} motives, "
+          f"{len(game.inventory)} items")
+    print(f"Save size:         {save_size / 1e3:.1f} kB on disk")
+    if args.memory:
+        print(f"Peak memory:       {peak / 1e6:.2f} MB traced")
+        for played, traced in samples:
+            print(f"  after {played:>6} rooms: {traced / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
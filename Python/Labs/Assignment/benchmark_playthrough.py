@@ -0,0 +1,222 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Benchmark for the mystery adventure game
+# Runs complete scripted playthroughs from the Mansion to the Final Level without a terminal
+# and reports how many playthroughs per second the engine can handle and the latency of each menu command
+#
+# With --metrics PREFIX the playthroughs are also run with timing turned on (see metrics.py), the cost of the
+# timing is reported and the metrics are written to PREFIX.prom and PREFIX.json
+#
+# Each playthrough's seed comes from one master seed (--seed) and its number, see session_seed, and with --workers N
+# the playthroughs are shared between N processes. The outcome digest (a checksum of what every game wrote) is the
+# same for any number of workers, so a batch of games can be spread over processes without changing its results
+#
+# Usage: python benchmark_playthrough.py [number of playthroughs] [--seed MASTER] [--workers N] [--metrics PREFIX]
+
+import re
+import sys
+import time
+import zlib
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from OOP_Assignment import Game, ScriptedIO, session_seed
+from save_storage import JsonSaveBackend
+from metrics import Metrics
+
+
+# The Study and Kitchen puzzles are different in every game, the player works them out from the text they have seen
+STUDY_ANSWER = "<study answer>"
+KITCHEN_ANSWER = "<kitchen answer>"
+STUDY_PUZZLE = re.compile(r"(\d+)x ≡ 1 \(mod (\d+)\)")
+KITCHEN_CLUE = re.compile(r"(\d+) Grams Sugar.*?flour weight is (\d+) times", re.DOTALL)
+
+
+def solve_from_text(answer, text):
+    """
+    Replace STUDY_ANSWER or KITCHEN_ANSWER with the answer worked out from the game's text, other answers are kept
+    """
+
+    if answer == STUDY_ANSWER:
+        value, modulus = map(int, STUDY_PUZZLE.findall(text)[-1])
+        return str(pow(value, -1, modulus))
+    if answer == KITCHEN_ANSWER:
+        sugar, ratio = map(int, KITCHEN_CLUE.findall(text)[-1])
+        return str(sugar * ratio)
+    return answer
+
+
+# The answers a player gives to get through every level, in order
+PLAYTHROUGH_SCRIPT = [
+    "Benchmark",  # Player name
+    # Level 1: The Mansion
+    "1", "groundskeeper", "2", "3", "2", "4", "legacy",
+    # Level 2: The Study
+    "1", "librarian", "3", "4", STUDY_ANSWER,
+    # Level 3: The Kitchen
+    "1", "head chef", "3", "4", KITCHEN_ANSWER,
+    # Level 4: The Cellar, the fight itself is answered by PlaythroughIO
+    "1", "yes", "3", "4",
+    # Level 5: The Garden
+    "1", "herbologist", "3", "4", "nightshade",
+    # Level 6: The Observatory
+    "3", "4", "ursa major",
+    # Level 7: The Final Level
+    "5", "6", "7", "3", "4",
+]
+
+MENU_PROMPT = "Enter your choice: "
+
+
+class PlaythroughIO(ScriptedIO):
+    def __init__(self, inputs):
+        """
+        Scripted io channel that also times every menu command and always attacks in the Cellar fight
+        """
+
+        super().__init__(inputs)
+        self.command_times = []  # Time each menu prompt was shown
+
+    async def read(self, prompt=""):
+        """
+        Answer the fight prompts automatically and record when each menu prompt is reached
+        """
+
+        if prompt == MENU_PROMPT:
+            self.command_times.append(time.perf_counter())
+        if prompt.startswith("Detective |"):
+            self.output.append(prompt)
+            return "attack"
+        answer = await super().read(prompt)
+        if answer in (STUDY_ANSWER, KITCHEN_ANSWER):
+            answer = solve_from_text(answer, "\n".join(self.output))
+        return answer
+
+
+async def run_playthrough(seed, save_path, metrics=None):
+    """
+    Run one scripted playthrough and return (completed, command latencies, CRC32 of everything the game wrote)
+    """
+
+    io = PlaythroughIO(PLAYTHROUGH_SCRIPT)
+    game = Game(io=io, save_backend=JsonSaveBackend(save_path), seed=seed, metrics=metrics)
+
+    try:
+        await game.start()
+        completed = game._current_level == len(game.levels)
+    except EOFError:
+        # The detective lost the Cellar fight and the script ran out
+        completed = False
+        await game.autosaver.wait()  # The next playthrough must not find this one's save
+
+    latencies = [end - start for start, end in zip(io.command_times, io.command_times[1:])]
+    return completed, latencies, zlib.crc32("\n".join(io.output).encode("utf-8"))
+
+
+def percentile(values, fraction):
+    """
+    Return the value at the given fraction of the sorted list
+    """
+
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run_all(numbers, master_seed=0, metrics=None):
+    """
+    Run the numbered playthroughs one after another on one event loop
+    Returns (outcomes, latencies, elapsed seconds), outcomes are (number, completed, output checksum)
+    """
+
+    outcomes = []
+    latencies = []
+
+    with tempfile.TemporaryDirectory() as folder:
+        save_path = Path(folder) / "save_game.json"
+
+        start = time.perf_counter()
+        for number in numbers:
+            save_path.unlink(missing_ok=True)  # Every playthrough starts as a new game
+            finished, command_latencies, checksum = await run_playthrough(session_seed(master_seed, number),
+                                                                          save_path, metrics)
+            outcomes.append((number, finished, checksum))
+            latencies.extend(command_latencies)
+        elapsed = time.perf_counter() - start
+
+    return outcomes, latencies, elapsed
+
+
+def run_batch(numbers, master_seed):
+    """
+    run_all() for one worker process
+    """
+
+    return asyncio.run(run_all(numbers, master_seed))
+
+
+def run_parallel(playthroughs, master_seed, workers):
+    """
+    Share the playthroughs between worker processes, returning the same as run_all() with the outcomes in order
+    """
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers) as pool:
+        batches = pool.map(run_batch, [range(first, playthroughs, workers) for first in range(workers)],
+                           [master_seed] * workers)
+        outcomes = []
+        latencies = []
+        for batch_outcomes, batch_latencies, _ in batches:
+            outcomes.extend(batch_outcomes)
+            latencies.extend(batch_latencies)
+    return sorted(outcomes), latencies, time.perf_counter() - start
+
+
+def outcome_digest(outcomes):
+    """
+    One checksum of every playthrough's result and output, in playthrough order
+    """
+
+    return zlib.crc32(repr(sorted(outcomes)).encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time scripted playthroughs of the mystery game")
+    parser.add_argument("playthroughs", nargs="?", type=int, default=1000, help="number of playthroughs (default 1000)")
+    parser.add_argument("--seed", type=int, default=0, help="master seed the playthroughs' seeds come from (default 0)")
+    parser.add_argument("--workers", type=int, default=1, help="processes to share the playthroughs between (default 1)")
+    parser.add_argument("--metrics", metavar="PREFIX", help="also run with timing on and write PREFIX.prom and PREFIX.json")
+    args = parser.parse_args()
+    playthroughs = args.playthroughs
+    if args.workers > 1:
+        outcomes, latencies, elapsed = run_parallel(playthroughs, args.seed, args.workers)
+    else:
+        outcomes, latencies, elapsed = asyncio.run(run_all(range(playthroughs), args.seed))
+    completed = sum(finished for _, finished, _ in outcomes)
+
+    print(f"Playthroughs:      {playthroughs} ({completed} completed, {playthroughs - completed} lost the Cellar fight)")
+    print(f"Outcome digest:    {outcome_digest(outcomes):08x} (master seed {args.seed}, {args.workers} workers)")
+    print(f"Total time:        {elapsed:.3f} s")
+    print(f"Playthroughs/sec:  {playthroughs / elapsed:.1f}")
+    print(f"Commands timed:    {len(latencies)}")
+    print(f"Command latency:   mean {sum(latencies) / max(len(latencies), 1) * 1e6:.1f} us, "
+          f"p50 {percentile(latencies, 0.5) * 1e6:.1f} us, p99 {percentile(latencies, 0.99) * 1e6:.1f} us")
+
+    if args.metrics:
+        metrics = Metrics()
+        _, _, timed_elapsed = asyncio.run(run_all(range(playthroughs), args.seed, metrics))
+        metrics.export(args.metrics)
+        print(f"With metrics:      {timed_elapsed:.3f} s ({(timed_elapsed / elapsed - 1) * 100:+.1f}% time), "
+              f"written to {args.metrics}.prom and {args.metrics}.json")
+
+
+if __name__ == "__main__":
+    main()
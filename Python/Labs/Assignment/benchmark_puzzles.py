@@ -0,0 +1,99 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Benchmark for the puzzle generators in puzzles.py
+# Measures how many puzzles per second each generator makes, one at a time and streamed in bulk as JSON lines
+# for pre-generation, and checks that verifying a right answer takes as long as verifying a wrong one
+#
+# Usage: python benchmark_puzzles.py [number of puzzles]
+
+import io
+import sys
+import json
+import time
+import random
+
+from puzzles import Puzzle, PUZZLE_GENERATORS
+
+
+def time_generate(generator, count):
+    """
+    Puzzles per second made one at a time, e.g. when a level is created
+    """
+
+    start = time.perf_counter()
+    for _ in range(count):
+        generator.generate()
+    return count / (time.perf_counter() - start)
+
+
+def time_bulk(generator, count):
+    """
+    Puzzles per second streamed to JSON lines, as `python puzzles.py GENERATOR COUNT` does
+    """
+
+    out = io.StringIO()
+    start = time.perf_counter()
+    for generated in generator.stream(count):
+        out.write(json.dumps(generated.to_record(), ensure_ascii=False) + "\n")
+    return count / (time.perf_counter() - start)
+
+
+def sample_puzzle(generator):
+    """
+    Make one puzzle the way generator.generate() does, returning (puzzle, right answer, wrong answer)
+    Generated puzzles only keep the hashes of their answers, so the answer is taken before it is hashed
+    """
+
+    while True:
+        _, _, answer, values = generator.make()
+        if generator.is_valid(answer, values):
+            break
+    puzzle = Puzzle(generator.kind, [answer], generator.match, generator.fuzzy)
+    # A wrong answer of the same length, too different to pass as a typo
+    wrong = str(answer + 1) if isinstance(answer, int) else "q" * len(answer)
+    return puzzle, str(answer), wrong
+
+
+def time_checks(puzzle, guesses, repeats=2000):
+    """
+    Average time of puzzle.check for each guess, in microseconds
+    """
+
+    times = []
+    for guess in guesses:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            puzzle.check(guess)
+        times.append((time.perf_counter() - start) / repeats * 1e6)
+    return times
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    print(f"{'Generator':<16} {'generate/sec':>13} {'bulk JSON/sec':>14} {'unique answers':>15} "
+          f"{'check right us':>15} {'check wrong us':>15}")
+    for name, generator_class in PUZZLE_GENERATORS.items():
+        generator = generator_class(random.Random(1))
+        generate_rate = time_generate(generator, count)
+        bulk_rate = time_bulk(generator, count)
+
+        # How varied the puzzles are: the same answer always has the same hash
+        hashes = {generated.puzzle.hashes for generated in generator.stream(10_000)}
+
+        # Verify every instance works, and time a right and a wrong answer on one of them
+        puzzle, answer, wrong = sample_puzzle(generator_class(random.Random(2)))
+        if not puzzle.check(answer) or puzzle.check(wrong):
+            raise SystemExit(f"{name}: the sample puzzle does not check its answers properly")
+        right_time, wrong_time = time_checks(puzzle, [answer, wrong])
+
+        print(f"{name:<16} {generate_rate:>13.0f} {bulk_rate:>14.0f} {len(hashes):>15} "
+              f"{right_time:>15.2f} {wrong_time:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
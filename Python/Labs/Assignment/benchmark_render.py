@@ -0,0 +1,108 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Compares writing the game's output one line at a time (how the game used to print) against the Renderer,
+# which sends one write per screen
+# Runs the scripted playthrough from benchmark_playthrough.py with the output going into a real socket,
+# counts the write system calls and bytes sent, and measures playthroughs per second for both
+#
+# Usage: python benchmark_render.py [number of playthroughs]
+
+import sys
+import time
+import socket
+import asyncio
+import tempfile
+import threading
+from pathlib import Path
+
+from OOP_Assignment import Game, GameIO, Renderer
+from benchmark_playthrough import PLAYTHROUGH_SCRIPT, solve_from_text
+from save_storage import JsonSaveBackend
+
+
+class SocketIO(GameIO):
+    def __init__(self, sock, inputs, flush_policy):
+        """
+        Plays the scripted answers and sends the game's output into a socket through a Renderer
+        """
+
+        super().__init__()
+        self.sock = sock
+        self._inputs = iter(inputs)
+        self.renderer = Renderer(self.send, flush_policy)
+        self.bytes_sent = 0
+        self.transcript = []  # What was sent, to work out the generated puzzles from
+
+    def send(self, text):
+        data = text.encode("utf-8")
+        self.sock.sendall(data)  # One write system call for a message this small
+        self.bytes_sent += len(data)
+        self.transcript.append(text)
+
+    async def read(self, prompt=""):
+        self.renderer.flush(prompt)
+        if prompt.startswith("Detective |"):
+            return "attack"
+        try:
+            return solve_from_text(next(self._inputs), "".join(self.transcript))
+        except StopIteration:
+            raise EOFError("The scripted input has run out") from None
+
+    def write(self, text=""):
+        self.renderer.write(text)
+
+    def flush(self):
+        self.renderer.flush()
+
+
+def drain(sock):
+    """
+    Read and throw away everything the game sends, like a player's terminal would
+    """
+
+    while sock.recv(1 << 16):
+        pass
+
+
+async def run(flush_policy, playthroughs, sock, save_path):
+    """
+    Run the playthroughs, returns (writes, bytes sent, elapsed seconds)
+    """
+
+    writes = sent = 0
+    start = time.perf_counter()
+    for seed in range(playthroughs):
+        save_path.unlink(missing_ok=True)
+        io = SocketIO(sock, PLAYTHROUGH_SCRIPT, flush_policy)
+        await Game(io=io, save_backend=JsonSaveBackend(save_path), seed=seed).start()
+        writes += io.renderer.writes
+        sent += io.bytes_sent
+    return writes, sent, time.perf_counter() - start
+
+
+def main():
+    playthroughs = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    print(f"{'Flush policy':<14} {'writes/playthrough':>19} {'bytes/write':>12} {'playthroughs/sec':>17}")
+    with tempfile.TemporaryDirectory() as folder:
+        save_path = Path(folder) / "save_game.json"
+
+        for flush_policy in ("line", "screen"):
+            game_end, player_end = socket.socketpair()
+            reader = threading.Thread(target=drain, args=(player_end,))
+            reader.start()
+
+            writes, sent, elapsed = asyncio.run(run(flush_policy, playthroughs, game_end, save_path))
+
+            game_end.close()
+            reader.join()
+            player_end.close()
+            print(f"{flush_policy:<14} {writes / playthroughs:>19.1f} {sent / writes:>12.1f} {playthroughs / elapsed:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
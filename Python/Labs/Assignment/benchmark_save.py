@@ -0,0 +1,94 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Benchmark comparing the save journal in save_storage.py against rewriting the whole JSON file on every save
+# For each size the witness statements and suspect motives are grown to that many entries, then a run of saves is
+# timed where every save adds one more statement, the same way the game saves after each solved level
+#
+# Usage: python benchmark_save.py [saves per size]
+
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+
+from save_storage import SaveJournal
+
+
+SIZES = [10, 100, 1000, 5000]
+
+
+def make_state(entries):
+    """
+    Build a game state with the given number of witness statements and suspect motives
+    """
+
+    return {
+        "player_name": "Benchmark",
+        "current_level": 3,
+        "witness_statements": [f"Witness {i}'s statement: I saw someone near the staircase at {i} o'clock." for i in range(entries)],
+        "suspect_motives": [f"Suspect {i}'s motive: The victim had recently threatened to reveal a scandal." for i in range(entries)],
+        "inventory": ["Broken Key Part 1", "Broken Key Part 2", "Broken Key Part 3"],
+    }
+
+
+def rewrite_save(path, state):
+    """
+    The original Game.save_game, rewriting the whole file every time, returns the bytes written
+    """
+
+    with open(path, "w") as file:
+        json.dump(state, file, indent=4)
+    return path.stat().st_size
+
+
+def run(entries, saves, folder):
+    """
+    Time both ways of saving for one size, returns (rewrite seconds, rewrite bytes, journal seconds, journal bytes)
+    """
+
+    # The original full rewrite
+    state = make_state(entries)
+    path = Path(folder) / f"rewrite_{entries}.json"
+    rewrite_bytes = 0
+    start = time.perf_counter()
+    for i in range(saves):
+        state["witness_statements"].append(f"New statement {i}")
+        rewrite_bytes += rewrite_save(path, state)
+    rewrite_time = time.perf_counter() - start
+
+    # The journal, the first save writes the snapshot so it is done before timing
+    state = make_state(entries)
+    journal = SaveJournal(Path(folder) / f"journal_{entries}.json")
+    journal.save(state)
+    journal.bytes_written = 0
+    start = time.perf_counter()
+    for i in range(saves):
+        state["witness_statements"].append(f"New statement {i}")
+        journal.save(state)
+    journal_time = time.perf_counter() - start
+
+    return rewrite_time, rewrite_bytes, journal_time, journal.bytes_written
+
+
+def main():
+    saves = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    print(f"{saves} saves per size, each adding one witness statement")
+    print(f"{'Entries':>8} | {'Rewrite ms/save':>16} {'Rewrite KB':>12} | {'Journal ms/save':>16} {'Journal KB':>12}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        for entries in SIZES:
+            rewrite_time, rewrite_bytes, journal_time, journal_bytes = run(entries, saves, folder)
+            print(f"{entries:>8} | {rewrite_time / saves * 1000:>16.3f} {rewrite_bytes / 1024:>12.1f} | "
+                  f"{journal_time / saves * 1000:>16.3f} {journal_bytes / 1024:>12.1f}")
+
+    print("The journal fsyncs every save and the rewrite does not, so the journal is also the only crash-safe one")
+
+
+if __name__ == "__main__":
+    main()
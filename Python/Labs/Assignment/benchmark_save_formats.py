@@ -0,0 +1,124 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Compares the binary save format against the JSON save file
+# Compares file size, full load time and the time to read only the player name and level,
+# with and without compression, and times checking a folder of thousands of saves against their checksums
+# That a binary save decodes back to exactly the state that was saved is checked in tests/test_save_storage.py
+#
+# Usage: python benchmark_save_formats.py [number of loads] [number of saves to check]
+
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+
+from OOP_Assignment import static_text
+from save_storage import BinarySaveBackend
+
+
+def make_states():
+    """
+    Game states to compare: a finished game, and a long game where players have added their own notes
+    """
+
+    text = static_text()
+    statements = [line for line in text if "statement" in line]
+    motives = [line for line in text if "motive" in line]
+    keys = [line for line in text if line.startswith("Broken Key Part")]
+
+    finished = {
+        "player_name": "Detective Ryan",
+        "current_level": 6,
+        "witness_statements": statements,
+        "suspect_motives": motives,
+        "inventory": keys,
+    }
+    long_game = {
+        "player_name": "Détective Zoë",  # Make sure names outside ASCII survive
+        "current_level": 3,
+        "witness_statements": statements * 200 + [f"Note {i}: something odd about the {i}th step." for i in range(500)],
+        "suspect_motives": motives * 200,
+        "inventory": keys + ["Lantern", "Magnifying Glass"],
+        "settings": {"hints": True},  # Fields the format does not know about are kept too
+    }
+    return {"finished game": finished, "long game": long_game}
+
+
+def time_it(function, repeats):
+    """
+    Average time of a call in microseconds
+    """
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def scan_saves(folder, state, count):
+    """
+    Write `count` compressed saves and time checking all of them, returns (seconds, bytes on disk)
+    """
+
+    backend = BinarySaveBackend(folder, static_text(), compress=True)
+    for number in range(count):
+        backend.save(dict(state, player_name=f"Player {number}"))
+
+    start = time.perf_counter()
+    for _ in backend.verify():
+        pass
+    elapsed = time.perf_counter() - start
+    return elapsed, sum(path.stat().st_size for path in folder.iterdir())
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    saves = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    with tempfile.TemporaryDirectory() as folder:
+        folder = Path(folder)
+
+        for name, state in make_states().items():
+            backend = BinarySaveBackend(folder / name, static_text())
+            backend.save(state)
+            compressed = BinarySaveBackend(folder / f"{name} compressed", static_text(), compress=True)
+            compressed.save(state)
+
+            json_path = folder / f"{name}.json"
+            with open(json_path, "w") as file:
+                json.dump(state, file, indent=4)  # The same way the game writes save_game.json
+            binary_path = backend.path_for(state["player_name"])
+
+            def load_json():
+                with open(json_path, "r") as file:
+                    return json.load(file)
+
+            def load_binary():
+                return dict(backend.load(state["player_name"]))
+
+            def load_binary_header():
+                loaded = backend.load(state["player_name"])
+                return loaded["player_name"], loaded["current_level"]
+
+            def load_compressed():
+                return dict(compressed.load(state["player_name"]))
+
+            print(f"{name}:")
+            print(f"  size:           JSON {json_path.stat().st_size:>9} bytes   binary {binary_path.stat().st_size:>9} bytes"
+                  f"   compressed {compressed.path_for(state['player_name']).stat().st_size:>9} bytes")
+            print(f"  full load:      JSON {time_it(load_json, repeats):>9.1f} us      binary {time_it(load_binary, repeats):>9.1f} us"
+                  f"      compressed {time_it(load_compressed, repeats):>9.1f} us")
+            print(f"  name and level: JSON {time_it(load_json, repeats):>9.1f} us      binary {time_it(load_binary_header, repeats):>9.1f} us")
+
+        elapsed, size = scan_saves(folder / "scan", make_states()["long game"], saves)
+        print(f"Checked {saves} compressed long game saves ({size / 1e6:.1f} MB) in {elapsed:.3f} s "
+              f"({saves / elapsed:.0f} saves/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Load generator for mystery_server.py
+# Starts the server in its own process with a fresh save database, connects N simulated players at once,
+# and has each of them play the whole game over TCP with the same script as benchmark_playthrough.py
+# (--batch sends each level's commands as one line, e.g. "1 librarian;3;4")
+# Reports the latency of every command (from sending an answer until the next prompt arrives),
+# and how many sessions the server finished per second of its CPU time, which is sessions per core
+# as the server runs on a single event loop
+#
+# Usage: python benchmark_server.py [number of players] [--connect HOST:PORT] [--batch]
+#        --connect uses a server that is already running instead of starting one
+
+import sys
+import time
+import signal
+import asyncio
+import argparse
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+from benchmark_playthrough import PLAYTHROUGH_SCRIPT, STUDY_ANSWER, KITCHEN_ANSWER, solve_from_text, percentile
+from mystery_server import raise_open_file_limit
+
+
+PROMPT_END = b": "  # Every prompt in the game ends like this, and every other line ends with a newline
+
+# The same playthrough with each level sent as one line of commands, used with --batch
+PLAYTHROUGH_BATCHES = [
+    "1 groundskeeper;2;3;2;4 legacy",
+    "1 librarian;3;4", STUDY_ANSWER,  # Generated puzzles are answered once the player has seen them
+    "1 head chef;3;4", KITCHEN_ANSWER,
+    "1 yes;3;4",  # The fight's moves are still answered one at a time
+    "1 herbologist;3;4 nightshade",
+    "3;4 ursa major",
+    "5;6;7;3;4",
+]
+
+
+async def play(host, port, number, latencies, batch=False):
+    """
+    Play one game over the network, returns True if the player reached the end of the game
+    """
+
+    reader, writer = await asyncio.open_connection(host, port)
+    # The name is answered below, so each player has their own save
+    script = iter(PLAYTHROUGH_BATCHES if batch else PLAYTHROUGH_SCRIPT[1:])
+    received = b""
+    transcript = []  # Everything the server has sent, to work out the generated puzzles from
+    sent_at = None
+    finished = False
+
+    while True:
+        chunk = await reader.read(65536)
+        if not chunk:
+            break  # The server closed the connection, the game is over
+        received += chunk
+        if b"Congratulations" in received:
+            finished = True
+        if not received.endswith(PROMPT_END):
+            continue  # Wait for the rest of the screen
+
+        if sent_at is not None:
+            latencies.append(time.perf_counter() - sent_at)
+        prompt = received.rsplit(b"\n", 1)[-1]
+        transcript.append(received)
+        received = b""
+
+        if prompt.startswith(b"Save game found"):
+            answer = "no"
+        elif prompt.startswith(b"Please enter your name"):
+            answer = f"Player {number}"
+        elif prompt.startswith(b"Detective |"):
+            answer = "attack"
+        else:
+            answer = next(script, None)
+            if answer is None:
+                break  # The script ran out, e.g. after losing the Cellar fight
+            if answer in (STUDY_ANSWER, KITCHEN_ANSWER):
+                answer = solve_from_text(answer, b"".join(transcript).decode("utf-8"))
+
+        sent_at = time.perf_counter()
+        writer.write(f"{answer}\n".encode("utf-8"))
+        await writer.drain()
+
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except ConnectionError:
+        pass
+    return finished
+
+
+async def run_players(host, port, players, batch=False):
+    """
+    Connect every player at once and wait for all of their games to finish
+    """
+
+    latencies = []
+    start = time.perf_counter()
+    results = await asyncio.gather(*(play(host, port, number, latencies, batch) for number in range(players)),
+                                   return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    finished = sum(result is True for result in results)
+    errors = [result for result in results if isinstance(result, Exception)]
+    return finished, errors, latencies, elapsed
+
+
+def start_server(database):
+    """
+    Start mystery_server.py on a free port, returns the process and the port it is listening on
+    """
+
+    server = subprocess.Popen(
+        [sys.executable, str(Path(__file__).parent / "mystery_server.py"), "--port", "0", "--sqlite", str(database),
+         "--pace", "0"],  # No story pauses, they would only add fixed waiting time
+        stdout=subprocess.PIPE, text=True)
+    line = server.stdout.readline()  # "Serving the mystery game on host:port"
+    if not line:
+        raise RuntimeError("The server did not start")
+    return server, int(line.rsplit(":", 1)[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the mystery game server")
+    parser.add_argument("players", nargs="?", type=int, default=1000, help="number of simulated players (default 1000)")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="use a server that is already running")
+    parser.add_argument("--batch", action="store_true", help="send each level's commands as one line")
+    args = parser.parse_args()
+
+    raise_open_file_limit()
+
+    with tempfile.TemporaryDirectory() as folder:
+        server = None
+        if args.connect:
+            host, port = args.connect.rsplit(":", 1)
+            port = int(port)
+        else:
+            host = "127.0.0.1"
+            server, port = start_server(Path(folder) / "saves.db")
+
+        try:
+            finished, errors, latencies, elapsed = asyncio.run(run_players(host, port, args.players, args.batch))
+        finally:
+            if server is not None:
+                server.send_signal(signal.SIGINT)
+                server.wait()
+
+    print(f"Players:           {args.players} at once ({finished} finished the game, {len(errors)} connection errors)")
+    if errors:
+        print(f"First error:       {errors[0]!r}")
+    print(f"Total time:        {elapsed:.3f} s")
+    print(f"Sessions/sec:      {finished / elapsed:.1f}")
+    print(f"Round trips:       {len(latencies)} ({len(latencies) / max(args.players, 1):.1f} per player)")
+    print(f"Command latency:   p50 {percentile(latencies, 0.5) * 1e3:.2f} ms, p99 {percentile(latencies, 0.99) * 1e3:.2f} ms")
+
+    if server is not None:
+        # The server has exited, so its CPU time is counted in this process's children
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu = usage.ru_utime + usage.ru_stime
+        print(f"Server CPU time:   {cpu:.3f} s")
+        print(f"Sessions per core: {finished / cpu:.1f} per CPU second")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Benchmark for game snapshots (Game.snapshot and Game.restore)
+# Times taking a snapshot of a finished game and of a game that has been through a generated mansion,
+# against deep copying the same state, to show snapshots cost the same however much the player has collected
+# Also measures the memory the undo history (see history.py) adds to a game that has been through the mansion
+#
+# Usage: python benchmark_snapshots.py [number of mansion rooms]
+
+import sys
+import copy
+import time
+import asyncio
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from OOP_Assignment import Game
+from benchmark_playthrough import PlaythroughIO, PLAYTHROUGH_SCRIPT
+from benchmark_mansion import play
+from save_storage import JsonSaveBackend
+
+
+def time_call(function, repeats):
+    """
+    Average seconds per call
+    """
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+
+def deep_copied_state(game):
+    """
+    The same state as a snapshot, copied the simple way
+    """
+
+    return copy.deepcopy({
+        "inventory": game.inventory.to_list(),
+        "witness_statements": game.witness_statements.to_list(),
+        "suspect_motives": game.suspect_motives.to_list(),
+        "levels": {index: {name: getattr(level, name) for name in level.state_fields}
+                   for index, level in game.levels._levels.items()},
+    })
+
+
+def report(name, game, repeats):
+    snapshot = game.snapshot()
+    taken = time_call(game.snapshot, repeats)
+    restored = time_call(lambda: game.restore(snapshot), max(repeats // 100, 10))
+    copied = time_call(lambda: deep_copied_state(game), max(repeats // 100, 10))
+    print(f"{name:<26} {len(game.witness_statements):>6} statements   snapshot {taken * 1e6:7.2f} us   "
+          f"restore {restored * 1e6:9.1f} us   deepcopy {copied * 1e6:9.1f} us")
+
+
+async def finished_game(folder):
+    game = Game(io=PlaythroughIO(PLAYTHROUGH_SCRIPT), save_backend=JsonSaveBackend(folder / "game.json"), seed=1)
+    await game.start()
+    return game
+
+
+def session_memory(rooms, folder, history_limit):
+    """
+    Traced bytes held by a game after playing the mansion, with its checkpoints
+    """
+
+    tracemalloc.start()
+    game, io, _ = asyncio.run(play(rooms, 1, JsonSaveBackend(folder / f"history-{history_limit}.json"), rooms,
+                                   history_limit))
+    io.recent.clear()  # Only the game itself is counted
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return memory, len(game.history)
+
+
+def main():
+    rooms = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    with tempfile.TemporaryDirectory() as folder:
+        folder = Path(folder)
+        game = asyncio.run(finished_game(folder))
+        report("Finished game (7 levels)", game, 100000)
+
+        mansion, _, _ = asyncio.run(play(rooms, 1, JsonSaveBackend(folder / "mansion.json"), rooms))
+        report(f"Mansion ({rooms} rooms)", mansion, 100000)
+
+        session, _ = session_memory(rooms, folder, 0)
+        with_history, checkpoints = session_memory(rooms, folder, 1000)
+        print(f"Mansion session memory     {session / 1e6:.2f} MB without history, {with_history / 1e6:.2f} MB "
+              f"with {checkpoints} checkpoints ({(with_history - session) / max(checkpoints, 1):.0f} bytes each)")
+
+
+if __name__ == "__main__":
+    main()
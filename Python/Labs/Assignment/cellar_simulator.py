@@ -0,0 +1,196 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Monte Carlo simulator for the skeleton fight in the Cellar level
+# Uses the same damage, charge and defend rules as CellarLevel.attack/charge/defend but plays millions of fights at once
+# Every fight is one lane of a NumPy array holding (health, charge) for the Detective and the Skeleton
+# The Skeleton's self.rng.choice(movelist) is drawn as a matrix of random moves, one row per turn
+#
+# Usage: python cellar_simulator.py [number of fights] [seed]
+
+import sys
+import time
+
+import numpy as np
+
+from OOP_Assignment import CellarLevel
+
+
+# Moves are stored as small integers inside the arrays
+ATTACK = 0
+DEFEND = 1
+CHARGE = 2
+
+DEFEND_FACTOR = 0.25  # A defended attack only deals int(damage * 0.25), see CellarLevel.attack
+
+
+class CellarRules:
+    def __init__(self, detective, skeleton):
+        """
+        Store the starting stats of both fighters, taken from the dictionaries used by CellarLevel
+        """
+
+        self.detective_health = detective["health"]
+        self.detective_damage = detective["damage"]
+        self.skeleton_health = skeleton["health"]
+        self.skeleton_damage = skeleton["damage"]
+
+    @classmethod
+    def from_level(cls, level=None):
+        """
+        Read the rules from a CellarLevel, so the simulation always matches the game
+        """
+
+        level = level if level is not None else CellarLevel()
+        return cls(level.Detective, level.Skeleton)
+
+
+# Player strategies, each one picks a move for every lane at once
+# They receive the current state arrays and return an array of moves
+
+def always_attack(det_health, det_charge, sk_health, sk_charge, rng):
+    """
+    Attack every turn
+    """
+
+    return np.full(det_health.shape, ATTACK, dtype=np.int8)
+
+
+def charge_then_attack(det_health, det_charge, sk_health, sk_charge, rng):
+    """
+    Charge when uncharged, attack when charged
+    """
+
+    return np.where(det_charge, ATTACK, CHARGE).astype(np.int8)
+
+
+def defend_when_threatened(det_health, det_charge, sk_health, sk_charge, rng):
+    """
+    Defend when the Skeleton has charged its attack, otherwise attack
+    """
+
+    return np.where(sk_charge, DEFEND, ATTACK).astype(np.int8)
+
+
+def random_moves(det_health, det_charge, sk_health, sk_charge, rng):
+    """
+    Pick a move at random, the same way the Skeleton does
+    """
+
+    return rng.integers(0, 3, size=det_health.shape, dtype=np.int8)
+
+
+STRATEGIES = {
+    "always attack": always_attack,
+    "charge then attack": charge_then_attack,
+    "defend when threatened": defend_when_threatened,
+    "random": random_moves,
+}
+
+
+def resolve(move, other_move, charge, damage, other_health):
+    """
+    Apply one side's move to every lane, the vectorised version of CellarLevel.move
+    Returns the new charge flags and the other side's new health
+    """
+
+    attacking = move == ATTACK
+    hit = np.where(charge, damage * 2, damage)
+    # A defended attack deals int(damage * 0.25), the same truncation as the game
+    hit = np.where(other_move == DEFEND, (hit * DEFEND_FACTOR).astype(hit.dtype), hit)
+    other_health = other_health - np.where(attacking, hit, 0)
+
+    # Attacking uses up the charge, charging toggles it
+    charge = np.where(attacking, False, charge)
+    charge = np.where(move == CHARGE, ~charge, charge)
+    return charge, other_health
+
+
+def simulate(strategy, fights, rules, rng, max_turns=200, batch_size=1_000_000, block_turns=16):
+    """
+    Simulate the given number of fights with one strategy
+    Returns a dictionary with the number of wins, losses, double knockouts and unfinished fights
+    """
+
+    totals = {"win": 0, "lose": 0, "double ko": 0, "unfinished": 0}
+
+    for start in range(0, fights, batch_size):
+        lanes = min(batch_size, fights - start)
+
+        det_health = np.full(lanes, rules.detective_health, dtype=np.int16)
+        sk_health = np.full(lanes, rules.skeleton_health, dtype=np.int16)
+        det_charge = np.zeros(lanes, dtype=bool)
+        sk_charge = np.zeros(lanes, dtype=bool)
+
+        # Final health of every lane, filled in as fights finish
+        final_det = det_health.copy()
+        final_sk = sk_health.copy()
+        active = np.arange(lanes)
+
+        turn = 0
+        while active.size and turn < max_turns:
+            # Draw the Skeleton's moves for the next few turns in one go
+            skeleton_moves = rng.integers(0, 3, size=(block_turns, active.size), dtype=np.int8)
+
+            for row in range(block_turns):
+                if not active.size or turn >= max_turns:
+                    break
+
+                det_move = strategy(det_health, det_charge, sk_health, sk_charge, rng)
+                sk_move = skeleton_moves[row, :active.size]
+
+                # Both moves are worked out from the state at the start of the turn, as in CellarLevel.solve_puzzle
+                det_charge, new_sk_health = resolve(det_move, sk_move, det_charge, rules.detective_damage, sk_health)
+                sk_charge, new_det_health = resolve(sk_move, det_move, sk_charge, rules.skeleton_damage, det_health)
+                det_health, sk_health = new_det_health, new_sk_health
+                turn += 1
+
+                # Record finished fights and drop them from the arrays
+                finished = (det_health <= 0) | (sk_health <= 0)
+                if finished.any():
+                    final_det[active[finished]] = det_health[finished]
+                    final_sk[active[finished]] = sk_health[finished]
+                    keep = ~finished
+                    active = active[keep]
+                    det_health, sk_health = det_health[keep], sk_health[keep]
+                    det_charge, sk_charge = det_charge[keep], sk_charge[keep]
+                    skeleton_moves = skeleton_moves[:, keep]
+
+        det_dead = final_det <= 0
+        sk_dead = final_sk <= 0
+        totals["win"] += int(np.count_nonzero(sk_dead & ~det_dead))
+        totals["lose"] += int(np.count_nonzero(det_dead & ~sk_dead))
+        totals["double ko"] += int(np.count_nonzero(det_dead & sk_dead))
+        totals["unfinished"] += int(active.size)
+
+    return totals
+
+
+def main():
+    fights = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    rules = CellarRules.from_level()
+    rng = np.random.default_rng(seed)
+
+    print(f"Simulating {fights} Cellar fights per strategy (seed {seed})")
+    print(f"{'Strategy':<24}{'Win':>10}{'Lose':>10}{'Double KO':>12}{'Unfinished':>12}{'Fights/sec':>14}")
+
+    for name, strategy in STRATEGIES.items():
+        start = time.perf_counter()
+        totals = simulate(strategy, fights, rules, rng)
+        elapsed = time.perf_counter() - start
+
+        print(f"{name:<24}"
+              f"{totals['win'] / fights:>10.4f}"
+              f"{totals['lose'] / fights:>10.4f}"
+              f"{totals['double ko'] / fights:>12.4f}"
+              f"{totals['unfinished'] / fights:>12.4f}"
+              f"{fights / elapsed:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
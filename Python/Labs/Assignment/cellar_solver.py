@@ -0,0 +1,208 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Exact solver for the skeleton fight in the Cellar level
+# A fight is described by the Detective's health, the Skeleton's health and both charge flags, so there are only a few
+# thousand possible states. Value iteration works out the exact chance of winning from every state and the best move
+# for the Detective against a Skeleton that picks its moves uniformly at random.
+# The finished table is cached to disk, so the game only has to load it when a player asks for a hint.
+#
+# Usage: python cellar_solver.py [detective health] [skeleton health]
+
+import sys
+import json
+from pathlib import Path
+
+
+MOVES = ("attack", "defend", "charge")
+DEFEND_FACTOR = 0.25  # A defended attack only deals int(damage * 0.25), see CellarLevel.attack
+CACHE_VERSION = 1
+
+# Default cache file, next to this file
+CACHE_PATH = Path(__file__).parent / "cellar_policy.json"
+
+
+def apply_move(move, other_move, charge, damage, other_health):
+    """
+    Apply one fighter's move, returning their new charge flag and the other fighter's new health
+    Mirrors CellarLevel.attack, CellarLevel.defend and CellarLevel.charge
+    """
+
+    if move == "attack":
+        hit = damage * 2 if charge else damage
+        if other_move == "defend":
+            hit = int(hit * DEFEND_FACTOR)
+        return False, other_health - hit
+    if move == "charge":
+        return not charge, other_health
+    return charge, other_health
+
+
+class CellarPolicy:
+    def __init__(self, detective_health, detective_damage, skeleton_health, skeleton_damage, table):
+        """
+        Store the rules the table was solved for and the table itself
+        The table maps (detective health, skeleton health, detective charge, skeleton charge) to (best move, win chance)
+        """
+
+        self.detective_health = detective_health
+        self.detective_damage = detective_damage
+        self.skeleton_health = skeleton_health
+        self.skeleton_damage = skeleton_damage
+        self.table = table
+
+    def lookup(self, detective, skeleton):
+        """
+        Return (best move, win chance) for the current fight, using the same dictionaries as CellarLevel
+        Once either fighter is down the fight is over, the move is None and the chance is 1.0 if the Detective won
+        """
+
+        if detective["health"] <= 0 or skeleton["health"] <= 0:
+            return None, 1.0 if skeleton["health"] <= 0 < detective["health"] else 0.0
+        return self.table[(detective["health"], skeleton["health"], detective["charge"], skeleton["charge"])]
+
+    def covers(self, detective_health, detective_damage, skeleton_health, skeleton_damage):
+        """
+        Check if this table can answer questions about a fight with the given stats
+        """
+
+        return (self.detective_damage == detective_damage and self.skeleton_damage == skeleton_damage
+                and self.detective_health >= detective_health and self.skeleton_health >= skeleton_health)
+
+    @classmethod
+    def solve(cls, detective_health, detective_damage, skeleton_health, skeleton_damage, tolerance=1e-12):
+        """
+        Work out the exact win chance and best move for every state using value iteration
+        The Detective only wins if the Skeleton falls while the Detective is still standing, a double knockout is a loss
+        """
+
+        states = [
+            (det, sk, det_charge, sk_charge)
+            for det in range(1, detective_health + 1)
+            for sk in range(1, skeleton_health + 1)
+            for det_charge in (False, True)
+            for sk_charge in (False, True)
+        ]
+
+        # Work out every transition once, each entry is the next state or the final result of the fight
+        transitions = {}
+        for state in states:
+            det, sk, det_charge, sk_charge = state
+            outcomes = []
+            for det_move in MOVES:
+                results = []
+                for sk_move in MOVES:
+                    new_det_charge, new_sk = apply_move(det_move, sk_move, det_charge, detective_damage, sk)
+                    new_sk_charge, new_det = apply_move(sk_move, det_move, sk_charge, skeleton_damage, det)
+                    if new_det <= 0 or new_sk <= 0:
+                        results.append(1.0 if new_sk <= 0 < new_det else 0.0)
+                    else:
+                        results.append((new_det, new_sk, new_det_charge, new_sk_charge))
+                outcomes.append(results)
+            transitions[state] = outcomes
+
+        values = dict.fromkeys(states, 0.0)
+        while True:
+            change = 0.0
+            for state in states:
+                best = max(
+                    sum(result if isinstance(result, float) else values[result] for result in results) / len(MOVES)
+                    for results in transitions[state]
+                )
+                change = max(change, abs(best - values[state]))
+                values[state] = best
+            if change < tolerance:
+                break
+
+        # Pick the best move for each state, ties go to the first move in MOVES
+        table = {}
+        for state in states:
+            chances = [
+                sum(result if isinstance(result, float) else values[result] for result in results) / len(MOVES)
+                for results in transitions[state]
+            ]
+            best = max(range(len(MOVES)), key=lambda index: chances[index])
+            table[state] = (MOVES[best], chances[best])
+
+        return cls(detective_health, detective_damage, skeleton_health, skeleton_damage, table)
+
+    def save(self, path=CACHE_PATH):
+        """
+        Write the table to a JSON file so it does not have to be solved again
+        """
+
+        data = {
+            "version": CACHE_VERSION,
+            "detective": [self.detective_health, self.detective_damage],
+            "skeleton": [self.skeleton_health, self.skeleton_damage],
+            "table": [[det, sk, int(det_charge), int(sk_charge), move, chance]
+                      for (det, sk, det_charge, sk_charge), (move, chance) in self.table.items()],
+        }
+
+        # Write to a temporary file first so a half written cache is never left behind
+        temp_path = Path(path).with_suffix(".tmp")
+        with open(temp_path, "w") as file:
+            json.dump(data, file)
+        temp_path.replace(path)
+
+    @classmethod
+    def load(cls, path=CACHE_PATH):
+        """
+        Read a table from a JSON file, returns None if the file is missing or from an older version
+        """
+
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if data.get("version") != CACHE_VERSION:
+            return None
+
+        table = {(det, sk, bool(det_charge), bool(sk_charge)): (move, chance)
+                 for det, sk, det_charge, sk_charge, move, chance in data["table"]}
+        return cls(*data["detective"], *data["skeleton"], table)
+
+    @classmethod
+    def for_fighters(cls, detective, skeleton, path=CACHE_PATH):
+        """
+        Return a table for a fight between the two fighters, loading it from the cache or solving and caching it
+        """
+
+        stats = (detective["health"], detective["damage"], skeleton["health"], skeleton["damage"])
+
+        policy = cls.load(path)
+        if policy is None or not policy.covers(*stats):
+            policy = cls.solve(*stats)
+            try:
+                policy.save(path)
+            except OSError:
+                pass  # The table still works without the cache, it will just be solved again next time
+        return policy
+
+
+def main():
+    # Only needed when run on its own, the game imports this file rather than the other way around
+    from OOP_Assignment import CellarLevel
+
+    level = CellarLevel()
+    detective_health = int(sys.argv[1]) if len(sys.argv) > 1 else level.Detective["health"]
+    skeleton_health = int(sys.argv[2]) if len(sys.argv) > 2 else level.Skeleton["health"]
+
+    policy = CellarPolicy.solve(detective_health, level.Detective["damage"], skeleton_health, level.Skeleton["damage"])
+    policy.save()
+
+    for det_charge in (False, True):
+        for sk_charge in (False, True):
+            move, chance = policy.table[(detective_health, skeleton_health, det_charge, sk_charge)]
+            print(f"Detective charged: {det_charge!s:<5} Skeleton charged: {sk_charge!s:<5} "
+                  f"best move: {move:<6} win chance: {chance:.6f}")
+    print(f"Solved {len(policy.table)} states, cached to {CACHE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Content packs for the mystery adventure game
+# The text, NPCs, clues and puzzles for every level live in content/levels.json instead of in the Level classes.
+# Puzzle answers are only kept as a random salt and the salted hashes of the answers ("answer_hashes", see
+# puzzles.Puzzle.to_content). A new level can be written with a plain "answer", it is hashed when the pack is compiled
+# so it never reaches the compiled file or a running game, and `hash-answers` replaces it in the JSON file as well.
+# The JSON is checked once and compiled into a binary file (content/levels.pack) next to it.
+# Later runs memory-map the compiled file instead of parsing the JSON again, and the text of a level is only decoded
+# when that level is first created. The compiled file is rebuilt whenever the JSON file changes.
+#
+# Compiled file layout:
+#   header: magic b"NPCP", format version, JSON file modification time and size, index length, string count
+#   index: the level order, the kind of each level and the level data as a marshal'd structure, where every piece of text inside a level is replaced
+#          by its number in the string table and numbers/booleans are wrapped in 1-tuples so they are not mistaken for text
+#   string table: (string count + 1) offsets, followed by all of the UTF-8 text
+#
+# Usage: python content_pack.py [levels.json]   - checks and compiles a content pack
+#        python content_pack.py hash-answers [levels.json]   - replaces the plain puzzle answers with their hashes
+
+import sys
+import mmap
+import json
+import struct
+import marshal
+import string
+from pathlib import Path
+
+from save_storage import atomic_write
+from puzzles import Puzzle, MATCH_MODES, PUZZLE_GENERATORS
+
+
+CONTENT_FOLDER = Path(__file__).parent / "content"
+DEFAULT_SOURCE = CONTENT_FOLDER / "levels.json"
+
+MAGIC = b"NPCP"
+FORMAT_VERSION = 2  # 2: puzzle answers are only stored as hashes
+HEADER = struct.Struct("<4sHHqqII")
+
+LEVEL_KINDS = ("room", "combat", "finale")
+NORMALIZE_MODES = ("none", "lower", "strip_lower")
+PLACEHOLDERS = ("name", "clue", "witness", "statement", "motive")
+
+
+class ContentError(ValueError):
+    """
+    Raised when a content pack is missing something or has the wrong type of value somewhere
+    """
+    pass
+
+
+# Checking a content pack
+
+def check(condition, where, message):
+    """
+    Raise a ContentError saying where the problem is if the condition is not met
+    """
+
+    if not condition:
+        raise ContentError(f"{where}: {message}")
+
+
+def check_text(value, where):
+    """
+    Check that a value is a string, and that any {placeholders} in it are ones the game knows
+    """
+
+    check(isinstance(value, str), where, "expected text")
+    for _, field, _, _ in string.Formatter().parse(value):
+        check(field is None or field in PLACEHOLDERS, where, f"unknown placeholder {{{field}}}")
+
+
+def check_steps(steps, where, level):
+    """
+    Check a list of steps, each step is a line of text or one of {"record": ...}, {"interact": ...} or {"pause": ...}
+    """
+
+    check(isinstance(steps, list), where, "expected a list of steps")
+    roles = {role for role, _ in level.get("npcs", [])}
+
+    for number, step in enumerate(steps):
+        step_where = f"{where}[{number}]"
+        if isinstance(step, str):
+            check_text(step, step_where)
+            continue
+
+        check(isinstance(step, dict) and len(step) == 1, step_where, "expected text or a single-key step")
+        action, value = next(iter(step.items()))
+        if action == "record":
+            check(value in ("statement", "motive"), step_where, "can only record a statement or a motive")
+            owner = "witness" if value == "statement" else "suspect"
+            check(owner in level, step_where, f"records a {value} but the level has no {owner}")
+        elif action == "interact":
+            check(value in roles, step_where, f"no NPC with the role {value!r}")
+        elif action == "pause":
+            check(isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0,
+                  step_where, "pause must be a number of seconds")
+        else:
+            raise ContentError(f"{step_where}: unknown step {action!r}")
+
+
+def check_keys(section, where, required, optional=()):
+    """
+    Check that a section is a dictionary with the required keys and nothing unexpected
+    """
+
+    check(isinstance(section, dict), where, "expected an object")
+    for key in required:
+        check(key in section, where, f"missing {key!r}")
+    for key in section:
+        check(key in required or key in optional, where, f"unexpected key {key!r}")
+
+
+def validate_level(level, where):
+    """
+    Check a single level
+    """
+
+    kind = level.get("kind", "room") if isinstance(level, dict) else None
+    check(kind in LEVEL_KINDS, where, f"kind must be one of {LEVEL_KINDS}")
+
+    required = {
+        "room": ("id", "name", "npcs", "clue", "start", "talk", "search", "puzzle"),
+        "combat": ("id", "name", "npcs", "clue", "start", "talk", "search", "puzzle", "fighters"),
+        "finale": ("id", "name", "clue", "start", "chamber", "search", "puzzle"),
+    }[kind]
+    check_keys(level, where, required, ("kind", "npcs", "witness", "suspect"))
+
+    check(isinstance(level["id"], str) and level["id"], f"{where}.id", "expected a non-empty id")
+    check_text(level["name"], f"{where}.name")
+    check_text(level["clue"], f"{where}.clue")
+
+    for number, npc in enumerate(level.get("npcs", [])):
+        npc_where = f"{where}.npcs[{number}]"
+        check(isinstance(npc, list) and len(npc) == 2, npc_where, "expected [role, dialogue]")
+        check_text(npc[0], npc_where)
+        check_text(npc[1], npc_where)
+
+    if "witness" in level:
+        check_keys(level["witness"], f"{where}.witness", ("name", "statement"))
+        check_text(level["witness"]["name"], f"{where}.witness.name")
+        check_text(level["witness"]["statement"], f"{where}.witness.statement")
+    if "suspect" in level:
+        check_keys(level["suspect"], f"{where}.suspect", ("name", "motive"))
+        check_text(level["suspect"]["name"], f"{where}.suspect.name")
+        check_text(level["suspect"]["motive"], f"{where}.suspect.motive")
+
+    check_steps(level["start"], f"{where}.start", level)
+
+    if kind in ("room", "combat"):
+        talk = level["talk"]
+        check_keys(talk, f"{where}.talk", ("heading", "prompt"),
+                   ("after_list", "normalize", "options", "match_roles", "not_found"))
+        check_text(talk["heading"], f"{where}.talk.heading")
+        check_text(talk["prompt"], f"{where}.talk.prompt")
+        check(talk.get("normalize", "lower") in NORMALIZE_MODES, f"{where}.talk.normalize",
+              f"must be one of {NORMALIZE_MODES}")
+        check(isinstance(talk.get("match_roles", False), bool), f"{where}.talk.match_roles", "expected true or false")
+        check_steps(talk.get("after_list", []), f"{where}.talk.after_list", level)
+        check_steps(talk.get("not_found", []), f"{where}.talk.not_found", level)
+        check(isinstance(talk.get("options", {}), dict), f"{where}.talk.options", "expected an object")
+        for choice, steps in talk.get("options", {}).items():
+            check_steps(steps, f"{where}.talk.options.{choice}", level)
+
+        check_keys(level["search"], f"{where}.search", ("already", "steps"))
+        check_steps(level["search"]["already"], f"{where}.search.already", level)
+        check_steps(level["search"]["steps"], f"{where}.search.steps", level)
+
+    if kind == "room":
+        puzzle = level["puzzle"]
+        # A puzzle with a generator gets its answer from the generator, a fixed answer is then only a fallback
+        check_keys(puzzle, f"{where}.puzzle", ("lines", "prompt", "correct", "incorrect"),
+                   ("answer", "answer_hashes", "match", "fuzzy", "generator"))
+        check("generator" in puzzle or "answer" in puzzle or "answer_hashes" in puzzle, f"{where}.puzzle",
+              "missing 'answer_hashes'")
+        check(not ("answer" in puzzle and "answer_hashes" in puzzle), f"{where}.puzzle",
+              "has both an answer and answer hashes")
+        check_text(puzzle["prompt"], f"{where}.puzzle.prompt")
+        check(puzzle.get("match", "text") in MATCH_MODES, f"{where}.puzzle.match", f"must be one of {MATCH_MODES}")
+        check(isinstance(puzzle.get("fuzzy", False), bool), f"{where}.puzzle.fuzzy", "expected true or false")
+        check(puzzle.get("generator", next(iter(PUZZLE_GENERATORS))) in PUZZLE_GENERATORS, f"{where}.puzzle.generator",
+              f"must be one of {sorted(PUZZLE_GENERATORS)}")
+        if "answer" in puzzle:
+            answers = puzzle["answer"] if isinstance(puzzle["answer"], list) else [puzzle["answer"]]
+            for answer in answers:
+                check(isinstance(answer, (str, int, float)) and not isinstance(answer, bool),
+                      f"{where}.puzzle.answer", "expected text or a number")
+            try:
+                Puzzle.from_content(level["id"], puzzle)
+            except ValueError as error:
+                raise ContentError(f"{where}.puzzle.answer: {error}") from None
+        if "answer_hashes" in puzzle:
+            stored = puzzle["answer_hashes"]
+            check_keys(stored, f"{where}.puzzle.answer_hashes", ("salt", "hashes"), ("typo_hashes",))
+            check(not puzzle.get("fuzzy", False) or "typo_hashes" in stored, f"{where}.puzzle.answer_hashes",
+                  "a fuzzy puzzle needs 'typo_hashes'")
+            for key in ("hashes", "typo_hashes"):
+                hashes = stored.get(key, [])
+                check(isinstance(hashes, list) and all(isinstance(answer_hash, str) and len(answer_hash) == 64
+                                                       for answer_hash in hashes),
+                      f"{where}.puzzle.answer_hashes.{key}", "expected a list of SHA-256 hashes in hex")
+            check(isinstance(stored["salt"], str), f"{where}.puzzle.answer_hashes.salt", "expected hex text")
+            try:
+                Puzzle.from_content(level["id"], puzzle)
+            except ValueError as error:
+                raise ContentError(f"{where}.puzzle.answer_hashes: {error}") from None
+        for key in ("lines", "correct", "incorrect"):
+            check_steps(puzzle[key], f"{where}.puzzle.{key}", level)
+
+    elif kind == "combat":
+        fighters = level["fighters"]
+        check_keys(fighters, f"{where}.fighters", ("detective", "skeleton"))
+        for name, stats in fighters.items():
+            check_keys(stats, f"{where}.fighters.{name}", ("health", "damage"))
+            for key, value in stats.items():
+                check(isinstance(value, int) and not isinstance(value, bool) and value > 0,
+                      f"{where}.fighters.{name}.{key}", "expected a positive whole number")
+        puzzle = level["puzzle"]
+        check_keys(puzzle, f"{where}.puzzle", ("locked", "lines", "double_ko", "lose", "win"))
+        for key in puzzle:
+            check_steps(puzzle[key], f"{where}.puzzle.{key}", level)
+
+    else:
+        check_keys(level["chamber"], f"{where}.chamber", ("not_entered", "already", "reveal"))
+        for key in level["chamber"]:
+            check_steps(level["chamber"][key], f"{where}.chamber.{key}", level)
+        check_keys(level["search"], f"{where}.search", ("already",))
+        check_steps(level["search"]["already"], f"{where}.search.already", level)
+        check_keys(level["puzzle"], f"{where}.puzzle", ("lines",))
+        check_steps(level["puzzle"]["lines"], f"{where}.puzzle.lines", level)
+
+
+def validate(data, where="content"):
+    """
+    Check a whole content pack, raising a ContentError on the first problem found
+    """
+
+    check_keys(data, where, ("version", "levels"))
+    check(data["version"] == 1, f"{where}.version", "only version 1 content packs are supported")
+    check(isinstance(data["levels"], list) and data["levels"], f"{where}.levels", "expected a list of levels")
+
+    seen = set()
+    for number, level in enumerate(data["levels"]):
+        validate_level(level, f"{where}.levels[{number}]")
+        check(level["id"] not in seen, f"{where}.levels[{number}].id", f"duplicate id {level['id']!r}")
+        seen.add(level["id"])
+
+
+# Compiling a content pack
+
+def hash_answers(data):
+    """
+    Replace every plain puzzle answer in checked content with its salt and hashes, returns how many were replaced
+    """
+
+    replaced = 0
+    for level in data["levels"]:
+        puzzle = level.get("puzzle", {})
+        if "answer" in puzzle:
+            hashes = Puzzle.hash_content(level["id"], puzzle)
+            # Keep the key where the answer was, so a rewritten JSON file reads the same way
+            level["puzzle"] = {("answer_hashes" if key == "answer" else key): (hashes if key == "answer" else value)
+                               for key, value in puzzle.items()}
+            replaced += 1
+    return replaced
+
+
+def compile_pack(data, source_mtime=0, source_size=0):
+    """
+    Turn checked content into the binary form described at the top of this file
+    """
+
+    strings = []
+    string_ids = {}
+
+    def encode(value):
+        if isinstance(value, str):
+            if value not in string_ids:
+                string_ids[value] = len(strings)
+                strings.append(value)
+            return string_ids[value]
+        if isinstance(value, (bool, int, float)):
+            return (value,)
+        if isinstance(value, list):
+            return [encode(item) for item in value]
+        return {key: encode(item) for key, item in value.items()}
+
+    index = {
+        "order": [level["id"] for level in data["levels"]],
+        "kinds": {level["id"]: level.get("kind", "room") for level in data["levels"]},
+        "levels": {level["id"]: encode(level) for level in data["levels"]},
+    }
+    index = marshal.dumps(index)
+
+    encoded = [text.encode("utf-8") for text in strings]
+    offsets = [0]
+    for text in encoded:
+        offsets.append(offsets[-1] + len(text))
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, source_mtime, source_size, len(index), len(strings))
+    return header + index + struct.pack(f"<{len(offsets)}I", *offsets) + b"".join(encoded)
+
+
+class ContentPack:
+    def __init__(self, buffer):
+        """
+        Read a compiled content pack from a buffer, usually a memory-mapped file
+        Only the header and index are read here, text is decoded as levels ask for it
+        """
+
+        self._buffer = buffer
+        magic, version, _, self.source_mtime, self.source_size, index_length, string_count = \
+            HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ContentError("Not a compiled content pack, or compiled by a different version")
+
+        index_start = HEADER.size
+        index = marshal.loads(buffer[index_start:index_start + index_length])
+        self._order = index["order"]
+        self._kinds = index["kinds"]
+        self._encoded_levels = index["levels"]
+        self._levels = {}  # Levels decoded so far
+
+        offsets_start = index_start + index_length
+        self._offsets = struct.unpack_from(f"<{string_count + 1}I", buffer, offsets_start)
+        self._strings_start = offsets_start + 4 * (string_count + 1)
+
+    def text(self, number):
+        """
+        Decode one string from the string table
+        """
+
+        start = self._strings_start + self._offsets[number]
+        end = self._strings_start + self._offsets[number + 1]
+        return bytes(self._buffer[start:end]).decode("utf-8")
+
+    def _decode(self, value):
+        if isinstance(value, int):
+            return self.text(value)
+        if isinstance(value, tuple):
+            return value[0]
+        if isinstance(value, list):
+            return [self._decode(item) for item in value]
+        return {key: self._decode(item) for key, item in value.items()}
+
+    def level_ids(self):
+        """
+        The ids of the levels in the order they are played
+        """
+
+        return list(self._order)
+
+    def kind(self, level_id):
+        """
+        The kind of a level (room, combat or finale), without decoding the rest of it
+        """
+
+        return self._kinds[level_id]
+
+    def level(self, level_id):
+        """
+        The content of one level, decoded the first time it is asked for
+        """
+
+        if level_id not in self._levels:
+            if level_id not in self._encoded_levels:
+                raise KeyError(f"No level {level_id!r} in the content pack")
+            self._levels[level_id] = self._decode(self._encoded_levels[level_id])
+        return self._levels[level_id]
+
+
+def load_content_pack(source=DEFAULT_SOURCE):
+    """
+    Load a content pack, using the compiled file next to it if it is up to date
+    Otherwise the JSON is checked and compiled again, and the compiled file is rewritten for next time
+    """
+
+    source = Path(source)
+    compiled_path = source.with_suffix(".pack")
+    stat = source.stat()
+
+    try:
+        with open(compiled_path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        pack = ContentPack(buffer)
+        if pack.source_mtime == stat.st_mtime_ns and pack.source_size == stat.st_size:
+            return pack
+    except (OSError, ValueError, struct.error):
+        pass  # Missing, unreadable or out of date, compile it again below
+
+    with open(source, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    validate(data, source.name)
+    hash_answers(data)  # Plain answers in the JSON never reach the compiled file
+    compiled = compile_pack(data, stat.st_mtime_ns, stat.st_size)
+
+    # Write the compiled file atomically, the game still works if the folder is read-only
+    try:
+        atomic_write(compiled_path, compiled)
+    except OSError:
+        pass
+
+    return ContentPack(compiled)
+
+
+def rewrite_answers(source):
+    """
+    Replace the plain puzzle answers in a content pack's JSON file with their hashes
+    """
+
+    with open(source, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    validate(data, source.name)
+    replaced = hash_answers(data)
+    if replaced:
+        atomic_write(source, (json.dumps(data, indent=4, ensure_ascii=False) + "\n").encode("utf-8"))
+    print(f"{source.name}: {replaced} puzzle answers replaced with their hashes")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "hash-answers":
+        try:
+            rewrite_answers(Path(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_SOURCE)
+        except ContentError as error:
+            print(f"Content pack is not valid: {error}")
+            sys.exit(1)
+        return
+
+    source = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SOURCE
+
+    try:
+        pack = load_content_pack(source)
+    except ContentError as error:
+        print(f"Content pack is not valid: {error}")
+        sys.exit(1)
+
+    print(f"{source.name}: {len(pack.level_ids())} levels, compiled to {source.with_suffix('.pack').name}")
+    for level_id in pack.level_ids():
+        print(f"- {level_id}: {pack.level(level_id)['name']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Game events for the mystery adventure game
+# Levels do not change the game's lists themselves, they publish what happened (a statement was found, an item
+# was awarded, a level was solved) on their game's EventBus, and whoever cares subscribes to it:
+# the Game keeps its state up to date and autosaves, and SessionStats and EventLogger keep count and log
+# Every Game has its own bus, so any number of sessions can run in one process
+# Subscribers that are not needed to keep playing get their events in batches, see EventBus.subscribe
+
+import inspect
+import logging
+
+
+class Event:
+    """
+    Base class for everything that can happen in a game, subscribing to Event receives every event
+    """
+
+    __slots__ = ()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class StatementFound(Event):
+    __slots__ = ("statement",)
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+class MotiveFound(Event):
+    __slots__ = ("motive",)
+
+    def __init__(self, motive):
+        self.motive = motive
+
+
+class ItemAwarded(Event):
+    __slots__ = ("item",)
+
+    def __init__(self, item):
+        self.item = item
+
+
+class LevelSolved(Event):
+    __slots__ = ("level", "name")
+
+    def __init__(self, level, name):
+        self.level = level  # The number of the level that was solved, counting from 0
+        self.name = name
+
+
+class EventBus:
+    def __init__(self, batch_size=64):
+        """
+        Delivers one game's events to its subscribers
+        Batched subscribers are sent their events once `batch_size` have built up, or when flush() is called
+        """
+
+        self.batch_size = batch_size
+        self._handlers = {}  # Event type -> handlers called straight away
+        self._batch_handlers = []  # (event types, handler) for handlers given a list of events
+        self._pending = []  # Events waiting for the batched handlers
+
+    def subscribe(self, event_type, handler, batched=False):
+        """
+        Call handler(event) for every event of this type (or a subclass of it), in the order handlers subscribed
+        The handler may be a coroutine function, publishing waits for it
+        With batched=True the handler is called with a list of events instead, some time after they happen
+        event_type can also be a tuple of types
+        """
+
+        event_types = event_type if isinstance(event_type, tuple) else (event_type,)
+        if batched:
+            self._batch_handlers.append((event_types, handler))
+        else:
+            for event_type in event_types:
+                self._handlers.setdefault(event_type, []).append(handler)
+
+    async def publish(self, event):
+        """
+        Send an event to its handlers, the batched ones get it on the next flush
+        """
+
+        for event_type in type(event).__mro__:
+            for handler in self._handlers.get(event_type, ()):
+                result = handler(event)
+                if inspect.isawaitable(result):
+                    await result
+
+        if self._batch_handlers:
+            self._pending.append(event)
+            if len(self._pending) >= self.batch_size:
+                await self.flush()
+
+    async def flush(self):
+        """
+        Send the events built up so far to the batched handlers
+        """
+
+        if not self._pending:
+            return
+        events, self._pending = self._pending, []
+        for event_types, handler in self._batch_handlers:
+            batch = [event for event in events if isinstance(event, event_types)]
+            if batch:
+                result = handler(batch)
+                if inspect.isawaitable(result):
+                    await result
+
+
+class SessionStats:
+    """
+    Counts the events of one session by type, e.g. {"StatementFound": 5, "LevelSolved": 6}
+    """
+
+    def __init__(self):
+        self.counts = {}
+
+    def __call__(self, events):
+        for event in events:
+            name = type(event).__name__
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+
+class EventLogger:
+    """
+    Logs a session's events, costs next to nothing while the logger is not enabled
+    """
+
+    def __init__(self, logger=None, session=None):
+        self.logger = logger if logger is not None else logging.getLogger("mystery.events")
+        self.session = session  # Shown with every event, e.g. the player's name
+
+    def __call__(self, events):
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        for event in events:
+            self.logger.info("%s %r", self.session() if callable(self.session) else self.session, event)
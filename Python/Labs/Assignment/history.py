@@ -0,0 +1,115 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Rewind history for the mystery adventure game
+# After every menu command the game records a checkpoint (a Game.snapshot()), and the player can take commands back
+# with "undo N", step forward again with "redo N", list the checkpoints with "history" and jump to any of them with
+# "rewind N", e.g. to try the Cellar fight again from before it went wrong
+# Snapshots share everything that did not change with the one before them (the collected items, the archive of old
+# levels and the state of every level the command did not touch), so each checkpoint only costs the fields the
+# command changed, and commands that change nothing (viewing the inventory, asking for help) are not recorded at all
+# Rewinding does not give back puzzle attempts, the attempt limit is there to stop answers being guessed
+#
+# Usage: game.history.record("search"), game.history.undo(2), game.history.jump(5)
+
+from collections import deque
+
+
+class Checkpoint:
+    __slots__ = ("number", "label", "level", "snapshot")
+
+    def __init__(self, number, label, level, snapshot):
+        self.number = number  # Shown to the player, "rewind N" jumps back to it
+        self.label = label  # The command that led here, e.g. "search"
+        self.level = level  # The level the player was on, counting from 1
+        self.snapshot = snapshot
+
+    def __repr__(self):
+        return f"Checkpoint({self.number}, {self.label!r}, level={self.level})"
+
+
+class History:
+    def __init__(self, game, limit=1000):
+        """
+        The checkpoints of one game, oldest first, only the last `limit` are kept
+        A limit of 0 turns the history off
+        """
+
+        self.game = game
+        self.limit = limit
+        self._checkpoints = deque(maxlen=limit)
+        self._position = -1  # The checkpoint the game is at, later ones can be redone
+
+    def __len__(self):
+        return len(self._checkpoints)
+
+    def __iter__(self):
+        return iter(self._checkpoints)
+
+    @property
+    def current(self):
+        """
+        The checkpoint the game is at, or None before the first one
+        """
+
+        return self._checkpoints[self._position] if self._position >= 0 else None
+
+    def record(self, label):
+        """
+        Record the game as it is now, after the command `label`
+        Anything that could have been redone is dropped, as in a text editor
+        Returns the new Checkpoint, or None if nothing has changed since the last one
+        """
+
+        if not self.limit:
+            return None
+        snapshot = self.game.snapshot()
+        current = self.current
+        if current is not None and current.snapshot == snapshot:
+            return None
+
+        while len(self._checkpoints) > self._position + 1:
+            self._checkpoints.pop()
+        number = current.number + 1 if current is not None else 1
+        self._checkpoints.append(Checkpoint(number, label, snapshot.current_level + 1, snapshot))
+        self._position = len(self._checkpoints) - 1
+        return self._checkpoints[-1]
+
+    def undo(self, steps=1):
+        """
+        Go back `steps` checkpoints (as far as the oldest one kept), returns the checkpoint now at or None
+        """
+
+        if self._position <= 0:
+            return None
+        return self._move_to(max(self._position - steps, 0))
+
+    def redo(self, steps=1):
+        """
+        Go forward again after undoing, returns the checkpoint now at or None
+        """
+
+        if self._position >= len(self._checkpoints) - 1:
+            return None
+        return self._move_to(min(self._position + steps, len(self._checkpoints) - 1))
+
+    def jump(self, number):
+        """
+        Go to the checkpoint with this number, returns it or None if it is not kept any more
+        """
+
+        if not self._checkpoints:
+            return None
+        return self._move_to(number - self._checkpoints[0].number)
+
+    def _move_to(self, position):
+        if not 0 <= position < len(self._checkpoints):
+            return None
+        self._position = position
+        checkpoint = self._checkpoints[position]
+        self.game.restore(checkpoint.snapshot)
+        return checkpoint
+
@@ -0,0 +1,175 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Procedural mansions for the mystery adventure game
+# Builds the content of as many rooms as needed from templates: a room name and description, a set of NPCs,
+# a witness and a suspect, a clue and a generated puzzle (see PUZZLE_GENERATORS in puzzles.py)
+# Each room is written in the same form as a level in content/levels.json, so it is played by ContentLevel like
+# any other room. Room N is always built from the mansion's seed and N alone, so rooms can be made one at a time
+# in any order and a 10,000 room mansion never has to be held in memory, see GeneratedMansion in OOP_Assignment.py
+#
+# Usage: python mansion_generator.py ROOMS [--seed SEED] [--check]   - generates a mansion and reports its size
+
+import json
+import time
+import random
+import argparse
+
+from content_pack import validate_level
+from puzzles import PUZZLE_GENERATORS
+
+
+# Room templates
+ROOM_NAMES = ("Library", "Gallery", "Conservatory", "Billiard Room", "Ballroom", "Chapel", "Armoury", "Nursery",
+              "Music Room", "Wine Cellar", "Attic", "Greenhouse", "Trophy Room", "Map Room", "Smoking Room",
+              "Drawing Room", "Laundry", "Boot Room", "Clock Tower", "Portrait Hall")
+ROOM_ADJECTIVES = ("Dusty", "Silent", "Candlelit", "Forgotten", "Locked", "Crooked", "Velvet", "Flooded",
+                   "Draughty", "Shuttered", "Gilded", "Cold")
+ROOM_DESCRIPTIONS = (
+    "Sheets cover most of the furniture, and the air smells of old wood and smoke.",
+    "The floorboards creak with every step, and a cold draught moves the curtains.",
+    "A fire has burned down to embers, and every clock in the room has stopped.",
+    "Paintings of the family line the walls, their eyes seeming to follow you.",
+    "Broken glass glitters on the rug, as if something was knocked over in a hurry.",
+    "Rain hammers on the tall windows, and the only light comes from a single lamp.",
+)
+
+# (role, dialogue) for the NPCs, each room has two or three of them
+STAFF = (
+    ("Butler", "I keep the keys to every room, and yet this one was locked when I arrived."),
+    ("Maid", "I dusted in here this morning. Someone has moved things since then."),
+    ("Footman", "I heard raised voices from this room late last night."),
+    ("Valet", "The master's coat was here, but his gloves have gone missing."),
+    ("Housekeeper", "Nothing happens in this house without me hearing of it, sooner or later."),
+    ("Chauffeur", "The car was taken out and brought back before dawn, the engine was still warm."),
+    ("Governess", "The children say they saw a light moving in the corridor after midnight."),
+    ("Archivist", "Some of the family papers have been taken from the shelves."),
+    ("Night Watchman", "I made my rounds as usual, but one door was open that should not have been."),
+    ("Portrait Painter", "I was painting by candlelight, and someone hurried past the doorway."),
+)
+
+WITNESS_SURNAMES = ("Finch", "Marlow", "Crane", "Ashdown", "Pembrook", "Harrow", "Vale", "Thorne", "Wren", "Kemp")
+
+# The suspects are the same people throughout the mansion, so their motives build up as the player explores
+SUSPECTS = ("Miss Ivy", "Professor Alabaster", "Lady Rosalind", "Mr. Blackthorn", "Colonel Hawthorne",
+            "Dr. Victor Steele")
+STATEMENTS = (
+    "I saw {suspect} leave the {room} just before midnight.",
+    "{suspect} asked me where the key to the {room} was kept.",
+    "I heard {suspect} arguing with the victim outside the {room}.",
+    "{suspect} was in the {room} alone for almost an hour.",
+    "There was mud on {suspect}'s shoes when they came out of the {room}.",
+)
+MOTIVES = (
+    "{suspect} owed the victim a great deal of money, a letter hidden in the {room} demands it be repaid.",
+    "{suspect} had been written out of the victim's will, a torn page of it was found in the {room}.",
+    "The victim knew a secret about {suspect}, and a diary in the {room} threatens to reveal it.",
+    "{suspect} and the victim were rivals, a bitter note between them was found in the {room}.",
+)
+SEARCHES = (
+    "\nYou search the {room} carefully, looking under the furniture and behind the curtains.",
+    "\nYou work your way around the {room}, checking every drawer and shelf.",
+    "\nYou search the {room} by the light of your lamp, and something catches your eye.",
+)
+
+
+class MansionGenerator:
+    """
+    Generates the rooms of a mansion with `rooms` levels, the last of which is the content pack's final level
+    The same seed always gives the same mansion
+    """
+
+    def __init__(self, rooms, seed=None):
+        if rooms < 2:
+            raise ValueError("A mansion needs at least one room before the final level")
+        self.rooms = rooms
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+
+    def __len__(self):
+        return self.rooms
+
+    def room(self, index):
+        """
+        The content of room `index` (counting from 0), in the same form as a level in content/levels.json
+        """
+
+        if not 0 <= index < self.rooms - 1:
+            raise IndexError("room index out of range")
+
+        # Every room has its own random number generator, so room N does not depend on the rooms before it
+        rng = random.Random(f"{self.seed}:{index}")
+        room = rng.choice(ROOM_NAMES)
+        name = f"The {rng.choice(ROOM_ADJECTIVES)} {room}"
+        npcs = rng.sample(STAFF, rng.randint(2, 3))
+        roles = [role for role, _ in npcs]
+        witness_role = rng.choice(roles)
+        suspect = rng.choice(SUSPECTS)
+        where = f"{room.lower()} (room {index + 1})"  # Keeps the statements of different rooms apart
+
+        return {
+            "id": f"room-{index + 1}",
+            "kind": "room",
+            "name": name,
+            "npcs": [list(npc) for npc in npcs],
+            "witness": {"name": f"{witness_role} {rng.choice(WITNESS_SURNAMES)}",
+                        "statement": rng.choice(STATEMENTS).format(suspect=suspect, room=where)},
+            "suspect": {"name": suspect, "motive": rng.choice(MOTIVES).format(suspect=suspect, room=where)},
+            "clue": "The lock on the far door hides a puzzle.",  # Replaced by the generated puzzle's clue
+            "start": ["\nWelcome to {name}!", rng.choice(ROOM_DESCRIPTIONS)],
+            "talk": {
+                "heading": "\nIn {name}, you see the following NPCs:",
+                "prompt": f"\nWho would you like to speak to? ({' / '.join(roles)}): ",
+                "normalize": "strip_lower",
+                "options": {witness_role.lower(): [{"interact": witness_role}, "{statement}", {"record": "statement"}]},
+                "match_roles": True,
+                "not_found": ["\nThere is no one here by that name."],
+            },
+            "search": {
+                "already": ["\nYou have already searched the room in this level."],
+                "steps": [rng.choice(SEARCHES).format(room=room.lower()), "You find a note:", "{clue}"],
+            },
+            "puzzle": {
+                "lines": [],  # The generated puzzle's lines are used
+                "prompt": "Enter your answer: ",
+                "generator": rng.choice(tuple(PUZZLE_GENERATORS)),
+                "correct": ["\nThe lock clicks open, and behind the door you find a letter.", "{motive}",
+                            {"record": "motive"}],
+                "incorrect": ["\nThe lock does not move. That is not the answer."],
+            },
+        }
+
+    def stream(self):
+        """
+        Yield the content of every room in order, one at a time
+        """
+
+        for index in range(self.rooms - 1):
+            yield self.room(index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a procedural mansion and report its size")
+    parser.add_argument("rooms", type=int, help="number of levels, including the final level")
+    parser.add_argument("--seed", type=int, help="make the same mansion every time")
+    parser.add_argument("--check", action="store_true", help="check every room like a content pack level")
+    args = parser.parse_args()
+
+    generator = MansionGenerator(args.rooms, args.seed)
+    size = 0
+    start = time.perf_counter()
+    for content in generator.stream():
+        if args.check:
+            validate_level(content, content["id"])
+        size += len(json.dumps(content, ensure_ascii=False))
+    elapsed = time.perf_counter() - start
+
+    print(f"Mansion {generator.seed}: {args.rooms} levels, {args.rooms - 1} generated rooms"
+          f"{' (all checked)' if args.check else ''}")
+    print(f"Generated in {elapsed:.3f} s ({(args.rooms - 1) / elapsed:.0f} rooms/sec), {size / 1e6:.1f} MB as JSON")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Timing instrumentation for the mystery adventure game
+# Records how long things take into histograms with fixed buckets, so recording a time is a bisect and two additions
+# and the memory used does not grow with the number of times recorded
+# A Game with metrics times every menu command, the menu itself, moving to a new level, every Level method, saving
+# and loading, and how long the player spends thinking (waiting at a prompt) separately from the game's own time
+# When metrics are turned off nothing is wrapped or timed at all
+#
+# The histograms can be written out as a Prometheus text file (for node_exporter's textfile collector or any
+# Prometheus compatible tool) and as a JSON summary with counts, means and percentiles
+#
+# Usage: python metrics.py FILE.json   - prints a JSON summary as a table
+
+import sys
+import json
+import math
+import time
+import inspect
+from bisect import bisect_left
+
+from save_storage import atomic_write
+
+
+# Upper bounds of the histogram buckets in seconds, from 10 microseconds for the engine to minutes for the player
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, math.inf)
+
+# What the metrics recorded by the game measure, written into the Prometheus file
+DESCRIPTIONS = {
+    "command": "Time the game spends running a menu command, not counting the player's thinking",
+    "command_think": "Time the player spends answering the prompts inside a menu command",
+    "menu": "Time taken to show the menu",
+    "level": "Time spent in each Level method, not counting the player's thinking",
+    "level_think": "Time the player spends answering inside each Level method, e.g. working out a puzzle",
+    "level_transition": "Time taken to create a level and play its introduction",
+    "storage": "Time taken to save or load a game",
+    "save_lag": "Time from a save being asked for until the autosaver has written it",
+}
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "total", "count", "largest")
+
+    def __init__(self, buckets):
+        """
+        How many times fell into each bucket, with their total and the largest seen
+        """
+
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+        self.largest = 0.0
+
+    def add(self, seconds):
+        """
+        Record one time
+        """
+
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        if seconds > self.largest:
+            self.largest = seconds
+
+    def quantile(self, fraction):
+        """
+        Estimate a percentile as the upper bound of the bucket it falls in (the largest time for the last bucket)
+        """
+
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.largest)
+        return self.largest
+
+
+class Metrics:
+    def __init__(self, enabled=True, buckets=DEFAULT_BUCKETS, prefix="mystery"):
+        """
+        A set of timing histograms, one per metric name and set of labels
+        One Metrics can be shared by every session in a process
+        """
+
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self.started = time.time()
+        self._help = dict(DESCRIPTIONS)  # Metric name -> description
+        self._histograms = {}  # (metric name, sorted labels) -> Histogram
+
+    def describe(self, name, help_text):
+        """
+        Set the description written with a metric in the Prometheus file
+        """
+
+        self._help[name] = help_text
+
+    def histogram(self, name, **labels):
+        """
+        The histogram for a metric with these labels, created the first time it is asked for
+        """
+
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(self.buckets)
+        return histogram
+
+    def observe(self, name, seconds, **labels):
+        """
+        Record one time for a metric
+        """
+
+        self.histogram(name, **labels).add(seconds)
+
+    def record(self, name, start, think=0.0, **labels):
+        """
+        Record the time since `start` (from time.perf_counter()), leaving out `think` seconds spent waiting for
+        the player, which are recorded as <name>_think
+        """
+
+        self.observe(name, time.perf_counter() - start - think, **labels)
+        if think:
+            self.observe(f"{name}_think", think, **labels)
+
+    def instrument(self, obj, methods, name, waited=None, **labels):
+        """
+        Replace the methods of one object with versions that record how long each call takes,
+        labelled with the method name and `labels`
+        waited is a function returning the total seconds spent waiting for the player so far, that time is
+        recorded separately as <name>_think and left out of the method's own time
+        Does nothing if metrics are turned off, or for methods that are already timed (a level the player went
+        back to with undo is started again)
+        """
+
+        if not self.enabled:
+            return
+        for method_name in methods:
+            if hasattr(getattr(obj, method_name), "__wrapped__"):
+                continue
+            setattr(obj, method_name, self._timed(getattr(obj, method_name), name, waited,
+                                                  dict(labels, method=method_name)))
+
+    def _timed(self, method, name, waited, labels):
+        """
+        Wrap one bound method, async methods are timed until they finish
+        """
+
+        histogram = self.histogram(name, **labels)  # Looked up once, not on every call
+
+        def record(start, waited_before):
+            think = waited() - waited_before if waited is not None else 0.0
+            histogram.add(time.perf_counter() - start - think)
+            if think:
+                self.observe(f"{name}_think", think, **labels)
+
+        if inspect.iscoroutinefunction(method):
+            async def timed(*args, **kwargs):
+                waited_before = waited() if waited is not None else 0.0
+                start = time.perf_counter()
+                try:
+                    return await method(*args, **kwargs)
+                finally:
+                    record(start, waited_before)
+        else:
+            def timed(*args, **kwargs):
+                waited_before = waited() if waited is not None else 0.0
+                start = time.perf_counter()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    record(start, waited_before)
+        timed.__wrapped__ = method
+        return timed
+
+    def to_prometheus(self):
+        """
+        The histograms in the Prometheus text exposition format
+        """
+
+        lines = []
+        described = set()
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            if not histogram.count:
+                continue  # Created for a method that was never called
+            metric = f"{self.prefix}_{name}_seconds"
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {metric} {self._help.get(name, name.replace('_', ' '))}")
+                lines.append(f"# TYPE {metric} histogram")
+
+            label_text = "".join(f'{key}="{escape_label(value)}",' for key, value in labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram.counts):
+                cumulative += count
+                bound = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(f'{metric}_bucket{{{label_text}le="{bound}"}} {cumulative}')
+            label_text = "{" + label_text.rstrip(",") + "}" if labels else ""
+            lines.append(f"{metric}_sum{label_text} {histogram.total!r}")
+            lines.append(f"{metric}_count{label_text} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        A JSON friendly summary of every histogram: count, total, mean, p50, p90, p99 and max in seconds
+        """
+
+        series = []
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            if not histogram.count:
+                continue
+            series.append({
+                "metric": name,
+                "labels": dict(labels),
+                "count": histogram.count,
+                "total": histogram.total,
+                "mean": histogram.total / histogram.count,
+                "p50": histogram.quantile(0.5),
+                "p90": histogram.quantile(0.9),
+                "p99": histogram.quantile(0.99),
+                "max": histogram.largest,
+            })
+        return {"started": self.started, "exported": time.time(), "series": series}
+
+    def export(self, path_prefix):
+        """
+        Write PREFIX.prom and PREFIX.json atomically, so a collector never reads half a file
+        """
+
+        atomic_write(f"{path_prefix}.prom", self.to_prometheus().encode("utf-8"))
+        atomic_write(f"{path_prefix}.json", json.dumps(self.summary(), indent=1).encode("utf-8"))
+
+
+def escape_label(value):
+    """
+    Escape a label value for the Prometheus text format
+    """
+
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Used by games that are not given any metrics, nothing is recorded
+NO_METRICS = Metrics(enabled=False)
+
+
+def main():
+    with open(sys.argv[1], "r", encoding="utf-8") as file:
+        summary = json.load(file)
+
+    print(f"{'metric':<28} {'labels':<44} {'count':>7} {'mean':>10} {'p50':>10} {'p99':>10} {'max':>10}")
+    for series in summary["series"]:
+        labels = ", ".join(f"{key}={value}" for key, value in series["labels"].items())
+        times = " ".join(f"{series[key] * 1e3:>8.3f}ms" for key in ("mean", "p50", "p99", "max"))
+        print(f"{series['metric']:<28} {labels[:44]:<44} {series['count']:>7} {times}")
+
+
+if __name__ == "__main__":
+    main()
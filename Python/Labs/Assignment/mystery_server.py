@@ -0,0 +1,280 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Network server for the mystery adventure game
+# Hosts many games at once on a single asyncio event loop, one Game per connection, using a plain line-based TCP protocol
+# so any telnet or netcat client can play: the server sends the game's text, and each line the player sends back
+# answers the current prompt
+# Each connection has its own Game with its own level, inventory, statements and motives, and while one player
+# is thinking the others keep playing because every game awaits its input instead of blocking on input()
+# Saves go to one SQLite database (or a folder of binary saves) shared by every player, one save per player name,
+# written in the background by one Autosaver for every session (see autosave.py)
+#
+# The pauses in the story are awaited per player, and a player can press Enter during them to skip ahead
+#
+# With --metrics PREFIX every session is timed, and PREFIX.prom and PREFIX.json are rewritten every few seconds
+# With --record FOLDER every session is recorded into the folder, to be replayed with recording.py
+# Every game has its own seeded random numbers, so sessions replay the same way however many were playing at once
+#
+# Usage: python mystery_server.py [--host 127.0.0.1] [--port 4000] [--sqlite server_saves.db | --binary FOLDER] [--pace SPEED]
+#                                 [--compress] [--metrics PREFIX] [--record FOLDER]
+# Then play with: telnet 127.0.0.1 4000   or   nc 127.0.0.1 4000
+
+import sys
+import time
+import asyncio
+import argparse
+import resource
+from pathlib import Path
+
+from OOP_Assignment import Game, GameIO, Pacer, Renderer, static_text
+from save_storage import SQLiteSaveBackend, BinarySaveBackend, CorruptSaveError
+from metrics import Metrics
+from autosave import Autosaver
+from recording import SessionRecorder, SUFFIX
+
+
+DEFAULT_PORT = 4000
+DEFAULT_DATABASE = Path(__file__).parent / "server_saves.db"
+METRICS_INTERVAL = 15  # Seconds between writing out the metrics
+
+
+class StreamIO(GameIO):
+    def __init__(self, reader, writer, pacer=None, renderer=None):
+        """
+        The io channel for one network player, reading and writing lines over their connection
+        Each player has their own pacer, so skipping the story only affects them
+        Output is collected into one socket write per screen
+        """
+
+        super().__init__(pacer if pacer is not None else Pacer())
+        self.reader = reader
+        self.writer = writer
+        self.renderer = renderer if renderer is not None else Renderer(self.send)
+        self._early_line = None  # A line the player sent during a pause, kept for the next prompt
+
+    async def _readline(self):
+        """
+        Wait for the player's next line, raising EOFError like input() if the player disconnects
+        """
+
+        try:
+            line = await self.reader.readline()
+        except ValueError:
+            raise EOFError("The player sent a line that is too long") from None
+        if not line:
+            raise EOFError("The player disconnected")
+        return line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+    async def read(self, prompt=""):
+        """
+        Send the prompt and wait for the player's next line, without holding up the other players
+        """
+
+        self.renderer.flush(prompt)  # The prompt goes out in the same write as the rest of the screen
+        await self.writer.drain()  # Stop sending to a player who is not reading
+        self.pacer.prompt_shown()
+
+        # The player may have answered already while the story was playing
+        if self._early_line is not None:
+            early_line, self._early_line = self._early_line, None
+            return await early_line
+        return await self._readline()
+
+    def send(self, text):
+        """
+        Send a whole screen to the player
+        """
+
+        self.writer.write(text.encode("utf-8"))
+
+    def write(self, text=""):
+        """
+        Add a line of text to the player's screen
+        """
+
+        self.renderer.write(text)
+
+    def flush(self):
+        """
+        Send whatever is left of the player's screen
+        """
+
+        self.renderer.flush()
+
+    async def pause(self, seconds):
+        """
+        Keep the dramatic pauses, only this player waits for them
+        While waiting, an empty line or "skip" skips the rest of the story up to the next prompt,
+        "fast" plays the story twice as fast from now on, and anything else skips and is kept as the next answer
+        """
+
+        delay = self.pacer.delay(seconds)
+        if delay <= 0:
+            return
+        self.flush()
+        await self.writer.drain()  # Show the story so far before waiting
+
+        if self._early_line is None:
+            self._early_line = asyncio.ensure_future(self._readline())
+        done, _ = await asyncio.wait({self._early_line}, timeout=delay)
+        if not done:
+            return
+
+        command = self._early_line.result().strip().lower()
+        if command in ("", "skip"):
+            self._early_line = None
+            self.pacer.skip()
+        elif command == "fast":
+            self._early_line = None
+            self.pacer.fast_forward()
+        else:
+            self.pacer.skip()
+
+    def close(self):
+        """
+        Stop waiting for a line from a player who has left
+        """
+
+        if self._early_line is not None:
+            self._early_line.cancel()
+            self._early_line = None
+
+
+class MysteryServer:
+    def __init__(self, save_backend, host="127.0.0.1", port=DEFAULT_PORT, pace=1.0, metrics=None,
+                 metrics_prefix=None, record_folder=None):
+        """
+        Set up the server, every session shares the one save backend
+        pace is the starting speed of each player's story pauses, 0 turns them off
+        Every session records into the same metrics, written out to metrics_prefix if one is given
+        With a record_folder every session is recorded into it, see recording.py
+        """
+
+        self.save_backend = save_backend
+        self.autosaver = Autosaver(save_backend, metrics)  # Saves from many players at once go in one write
+        self.pace = pace
+        self.metrics = metrics
+        self.metrics_prefix = metrics_prefix
+        self.host = host
+        self.port = port
+        self.record_folder = Path(record_folder) if record_folder else None
+        if self.record_folder is not None:
+            self.record_folder.mkdir(parents=True, exist_ok=True)
+        self.active_sessions = 0
+        self.finished_sessions = 0
+        self.started_sessions = 0
+
+    async def handle_player(self, reader, writer):
+        """
+        Play one game for one connection, from the welcome message until the player quits or disconnects
+        """
+
+        io = StreamIO(reader, writer, Pacer(speed=self.pace, enabled=self.pace > 0))
+        self.started_sessions += 1
+        if self.record_folder is not None:
+            path = self.record_folder / f"session-{int(time.time())}-{self.started_sessions}{SUFFIX}"
+            recorder = SessionRecorder(path, io, self.save_backend)
+            game = Game(io=recorder.io, save_backend=recorder.save_backend, metrics=self.metrics,
+                        autosaver=self.autosaver)
+            playing = recorder.play(game)
+        else:
+            game = Game(io=io, save_backend=self.save_backend, metrics=self.metrics, autosaver=self.autosaver)
+            playing = game.start()
+        self.active_sessions += 1
+        try:
+            await playing
+            io.flush()
+            await writer.drain()
+        except (EOFError, ConnectionError):
+            pass  # The player left, their progress up to the last completed level is saved
+        except CorruptSaveError as error:
+            # The game has told the player why, the save is left alone rather than written over by a new game
+            print(f"A damaged save stopped a session: {error}", file=sys.stderr, flush=True)
+            io.write("\nThe game has stopped so your save is not written over. Please ask the host to look at it.")
+            io.flush()
+        finally:
+            io.close()
+            self.active_sessions -= 1
+            self.finished_sessions += 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self):
+        """
+        Accept players until the server is stopped
+        """
+
+        server = await asyncio.start_server(self.handle_player, self.host, self.port, backlog=4096)
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"Serving the mystery game on {host}:{port}", flush=True)
+
+        if self.metrics is not None and self.metrics_prefix:
+            self._export_task = asyncio.create_task(self.export_metrics())  # Kept so the task is not garbage collected
+
+        async with server:
+            await server.serve_forever()
+
+    async def export_metrics(self):
+        """
+        Write the metrics out every METRICS_INTERVAL seconds, in a worker thread so players are not held up
+        """
+
+        while True:
+            await asyncio.sleep(METRICS_INTERVAL)
+            await asyncio.to_thread(self.metrics.export, self.metrics_prefix)
+
+
+def raise_open_file_limit():
+    """
+    Every player needs a socket, so allow as many open files as the system lets this process have
+    """
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host the Null Pointer mystery game for many players over TCP")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port to listen on, 0 picks a free one (default {DEFAULT_PORT})")
+    parser.add_argument("--sqlite", metavar="DATABASE", default=str(DEFAULT_DATABASE), help="SQLite database for the saves")
+    parser.add_argument("--binary", metavar="FOLDER", help="keep one compact binary save per player in a folder instead")
+    parser.add_argument("--compress", action="store_true", help="compress the binary saves with zlib")
+    parser.add_argument("--pace", metavar="SPEED", type=float, default=1.0,
+                        help="starting speed of the pauses in the story, 0 turns them off (default 1)")
+    parser.add_argument("--metrics", metavar="PREFIX", help="time every session and write PREFIX.prom and PREFIX.json")
+    parser.add_argument("--record", metavar="FOLDER", help="record every session into FOLDER")
+    args = parser.parse_args()
+
+    raise_open_file_limit()
+    if args.binary:
+        save_backend = BinarySaveBackend(args.binary, static_text(), compress=args.compress)
+    else:
+        save_backend = SQLiteSaveBackend(args.sqlite)
+
+    metrics = Metrics() if args.metrics else None
+    server = MysteryServer(save_backend, args.host, args.port, args.pace, metrics, args.metrics, args.record)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        print(f"Server stopped after {server.finished_sessions} sessions", file=sys.stderr)
+    finally:
+        server.autosaver.flush()
+        stats = server.autosaver.stats()
+        print(f"Autosave: {stats['writes']} writes, {stats['dropped']} dropped, {stats['failed']} failed, "
+              f"longest lag {stats['max_lag'] * 1e3:.1f} ms", file=sys.stderr)
+        save_backend.close()
+        if metrics is not None:
+            metrics.export(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Puzzle checking for the mystery adventure game
+# Every level checks the player's answer the same way: the answer goes through one normalization pipeline
+# and is compared against salted hashes of the accepted answers
+# The content pack only holds each puzzle's salt and answer hashes (see content_pack.py), and generated puzzles are
+# hashed as soon as they are made, so the accepted answers are never kept as plain text in a running game
+# Puzzles can also accept numbers written differently ("500", "500g", "500.0") and answers with a small typo,
+# and each game session can only try a puzzle so often, so answers cannot be brute forced over the network
+# The Study and Kitchen puzzles are also generated fresh for each game, see PUZZLE_GENERATORS
+#
+# Usage: python puzzles.py modular_inverse|recipe_ratio|riddle COUNT [--seed SEED]   - pre-generates puzzles as JSON lines
+
+import re
+import sys
+import hmac
+import secrets
+import json
+import math
+import time
+import random
+import argparse
+import hashlib
+import unicodedata
+from decimal import Decimal, InvalidOperation
+
+
+MATCH_MODES = ("text", "number")
+
+# A number, optionally followed by a unit, e.g. "500", "500 grams", "-3.5"
+NUMBER_ANSWER = re.compile(r"([+-]?(?:\d+(?:\.\d*)?|\.\d+))\s*[^\W\d_]*")
+
+# Answers shorter than this never match with a typo, otherwise almost anything would be "close" to them
+FUZZY_MIN_LENGTH = 5
+
+
+def normalize_answer(text):
+    """
+    The one normalization pipeline used for every answer:
+    unicode forms are unified (e.g. full width letters), case is ignored, whitespace is collapsed
+    and surrounding quotes and full stops are dropped
+    """
+
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = " ".join(text.split())
+    return text.strip(" '\".!?")
+
+
+def canonical_number(text):
+    """
+    Returns the number in an answer written one standard way ("0500.0 g" -> "500"), or None if it is not a number
+    """
+
+    match = NUMBER_ANSWER.fullmatch(normalize_answer(text))
+    if match is None:
+        return None
+    try:
+        value = Decimal(match.group(1)).normalize()
+    except InvalidOperation:
+        return None
+    return format(value, "f")
+
+
+def deletions(text):
+    """
+    Every way of removing one character from the text
+    Two answers are at most one typo apart if they are equal, or one is a deletion of the other, or they share a deletion
+    """
+
+    return {text[:index] + text[index + 1:] for index in range(len(text))}
+
+
+def default_salt(puzzle_id):
+    """
+    The salt of puzzles that are not given their own, e.g. generated ones
+    """
+
+    return f"null-pointer:{puzzle_id}:".encode("utf-8")
+
+
+class Puzzle:
+    def __init__(self, puzzle_id, answers, match="text", fuzzy=False, salt=None):
+        """
+        A puzzle with one or more accepted answers, only the salted hashes of the answers are kept
+        match="number" accepts the same number written in any way, fuzzy=True accepts a text answer with one typo
+        salt is bytes, puzzles in the content pack each have a random one
+        """
+
+        if match not in MATCH_MODES:
+            raise ValueError(f"match must be one of {MATCH_MODES}")
+
+        self.puzzle_id = puzzle_id
+        self.match = match
+        self.fuzzy = fuzzy and match == "text"
+        self._salt = salt if salt is not None else default_salt(puzzle_id)
+
+        canonical = [self.canonical(str(answer)) for answer in answers]
+        self._hashes = tuple(self.hash(answer) for answer in canonical if answer is not None)
+        if not self._hashes:
+            raise ValueError(f"Puzzle {puzzle_id!r} has no valid answers")
+
+        # For typos, the hashes of every answer with one character removed
+        self._fuzzy_hashes = set()
+        if self.fuzzy:
+            for answer in canonical:
+                if len(answer) >= FUZZY_MIN_LENGTH:
+                    self._fuzzy_hashes.add(self.hash(answer))
+                    self._fuzzy_hashes.update(self.hash(deleted) for deleted in deletions(answer))
+
+    @classmethod
+    def from_content(cls, puzzle_id, content):
+        """
+        Create the puzzle for a level from its "puzzle" section in the content pack, from the "answer_hashes"
+        written by to_content(), or from a plain "answer" in a content pack source that has not been hashed yet
+        """
+
+        match = content.get("match", "text")
+        if "answer_hashes" in content:
+            stored = content["answer_hashes"]
+            return cls.from_hashes(puzzle_id, [bytes.fromhex(answer_hash) for answer_hash in stored["hashes"]], match,
+                                   bytes.fromhex(stored["salt"]),
+                                   [bytes.fromhex(answer_hash) for answer_hash in stored.get("typo_hashes", [])])
+
+        answers = content["answer"] if isinstance(content["answer"], list) else [content["answer"]]
+        return cls(puzzle_id, answers, match, content.get("fuzzy", False))
+
+    @classmethod
+    def hash_content(cls, puzzle_id, content):
+        """
+        The "answer_hashes" for a puzzle section with a plain "answer", with a new random salt
+        """
+
+        answers = content["answer"] if isinstance(content["answer"], list) else [content["answer"]]
+        return cls(puzzle_id, answers, content.get("match", "text"), content.get("fuzzy", False),
+                   secrets.token_bytes(16)).to_content()
+
+    @classmethod
+    def from_hashes(cls, puzzle_id, hashes, match="text", salt=None, typo_hashes=()):
+        """
+        Create a puzzle from answer hashes worked out earlier, e.g. by a pre-generated puzzle or the content pack
+        typo_hashes are the hashes a fuzzy puzzle accepts a typo against, none for an exact puzzle
+        """
+
+        puzzle = cls.__new__(cls)
+        puzzle.puzzle_id = puzzle_id
+        puzzle.match = match
+        puzzle._salt = salt if salt is not None else default_salt(puzzle_id)
+        puzzle._hashes = tuple(hashes)
+        puzzle._fuzzy_hashes = set(typo_hashes) if match == "text" else set()
+        puzzle.fuzzy = bool(puzzle._fuzzy_hashes)
+        if not puzzle._hashes:
+            raise ValueError(f"Puzzle {puzzle_id!r} has no valid answers")
+        return puzzle
+
+    def to_content(self):
+        """
+        The salt and answer hashes as stored in the content pack, instead of the answers themselves
+        """
+
+        stored = {"salt": self._salt.hex(), "hashes": [answer_hash.hex() for answer_hash in self._hashes]}
+        if self._fuzzy_hashes:
+            stored["typo_hashes"] = sorted(answer_hash.hex() for answer_hash in self._fuzzy_hashes)
+        return stored
+
+    @property
+    def hashes(self):
+        return self._hashes
+
+    def canonical(self, answer):
+        """
+        Put an answer into the form that is hashed, None if it can never be right (e.g. text for a number puzzle)
+        """
+
+        if self.match == "number":
+            return canonical_number(answer)
+        return normalize_answer(answer)
+
+    def hash(self, answer):
+        return hashlib.sha256(self._salt + answer.encode("utf-8")).digest()
+
+    def check(self, guess):
+        """
+        Returns True if the guess is one of the answers
+        """
+
+        guess = self.canonical(guess)
+        if guess is None:
+            return False
+
+        guess_hash = self.hash(guess)
+        # Compare against every answer so the time taken does not depend on which one matched
+        correct = False
+        for answer_hash in self._hashes:
+            correct |= hmac.compare_digest(guess_hash, answer_hash)
+        if correct or not self._fuzzy_hashes or len(guess) < FUZZY_MIN_LENGTH - 1:
+            return correct
+
+        # One typo: a missing, extra, wrong or swapped character
+        return guess_hash in self._fuzzy_hashes or any(
+            self.hash(deleted) in self._fuzzy_hashes for deleted in deletions(guess))
+
+
+class AttemptLimiter:
+    """
+    Limits how often one game session can try each puzzle
+    Each puzzle allows `burst` attempts straight away, then one more every `interval` seconds
+    """
+
+    def __init__(self, burst=5, interval=2.0, clock=time.monotonic):
+        self.burst = burst
+        self.interval = interval
+        self.clock = clock
+        self._buckets = {}  # puzzle id -> (attempts available, time they were counted)
+
+    def _available(self, key, now):
+        tokens, counted_at = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - counted_at) / self.interval)
+
+    def allow(self, key):
+        """
+        Use up one attempt at a puzzle, returns False if the session has to wait first
+        """
+
+        now = self.clock()
+        tokens = self._available(key, now)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return False
+        self._buckets[key] = (tokens - 1, now)
+        return True
+
+    def wait_time(self, key):
+        """
+        Seconds until the next attempt at a puzzle is allowed
+        """
+
+        return max(0.0, (1 - self._available(key, self.clock())) * self.interval)
+
+
+# Procedural puzzles
+# Generators make fresh puzzles for levels whose puzzle names a "generator" in the content pack,
+# so a player who plays again does not already know the answers
+
+class GeneratedPuzzle:
+    __slots__ = ("kind", "clue", "lines", "puzzle")
+
+    def __init__(self, kind, clue, lines, puzzle):
+        """
+        One generated puzzle: the clue and puzzle text the player sees, and the Puzzle that checks the answer
+        """
+
+        self.kind = kind
+        self.clue = clue
+        self.lines = lines
+        self.puzzle = puzzle
+
+    def to_record(self):
+        """
+        A JSON friendly record of the puzzle for storing pre-generated puzzles, with only the salt and answer hashes
+        (and the typo hashes of a fuzzy puzzle), the same way the content pack stores them
+        """
+
+        return dict({"kind": self.kind, "clue": self.clue, "lines": self.lines, "match": self.puzzle.match},
+                    **self.puzzle.to_content())
+
+    @classmethod
+    def from_record(cls, record):
+        """
+        The puzzle from to_record(), records written before the salt was stored use the kind's default salt
+        """
+
+        salt = bytes.fromhex(record["salt"]) if "salt" in record else None
+        puzzle = Puzzle.from_hashes(record["kind"], [bytes.fromhex(answer_hash) for answer_hash in record["hashes"]],
+                                    record["match"], salt,
+                                    [bytes.fromhex(answer_hash) for answer_hash in record.get("typo_hashes", [])])
+        return cls(record["kind"], record["clue"], record["lines"], puzzle)
+
+
+class PuzzleGenerator:
+    """
+    Base class for puzzle generators, each instance has its own random number generator
+    """
+
+    kind = None  # The puzzle id the answers are hashed with
+    match = "number"  # How the answers are compared, see Puzzle
+    fuzzy = False
+
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else random.Random()
+
+    def make(self):
+        """
+        Returns (clue, lines, answer, values) for a new puzzle, values are every number shown to the player
+        """
+        raise NotImplementedError
+
+    def is_valid(self, answer, values):
+        """
+        A puzzle is only used if the answer is not simply one of the numbers the player can see
+        """
+
+        return answer not in values
+
+    def generate(self):
+        """
+        Make a new puzzle, trying again until one passes is_valid
+        """
+
+        while True:
+            clue, lines, answer, values = self.make()
+            if self.is_valid(answer, values):
+                return GeneratedPuzzle(self.kind, clue, lines, Puzzle(self.kind, [answer], self.match, self.fuzzy))
+
+    def stream(self, count=None):
+        """
+        Yield `count` valid puzzles one at a time (forever if count is None), e.g. to pre-generate them in bulk
+        """
+
+        made = 0
+        while count is None or made < count:
+            yield self.generate()
+            made += 1
+
+
+class ModularInversePuzzles(PuzzleGenerator):
+    """
+    The Study's chalkboard puzzle: solve ax ≡ 1 (mod m), the answer is the inverse of a modulo m
+    """
+
+    kind = "study"
+    MODULI = range(5, 30)  # Small enough to work out by hand
+
+    def make(self):
+        modulus = self.rng.choice(self.MODULI)
+        value = self.rng.randrange(2, modulus)
+        if math.gcd(value, modulus) != 1:
+            return None, None, None, None  # No inverse, is_valid rejects it
+        inverse = pow(value, -1, modulus)
+
+        clue = f"X is found by finding the inverse of {value} mod {modulus}, modular equations are key."
+        lines = [f"\nThe puzzle is still on the chalkboard: {value}x ≡ 1 (mod {modulus}).",
+                 "Enter the correct value of x to proceed."]
+        return clue, lines, inverse, (value, modulus)
+
+    def is_valid(self, answer, values):
+        if answer is None:
+            return False
+        value, modulus = values
+        return (value * answer) % modulus == 1 and 0 < answer < modulus and answer != value
+
+
+class RecipeRatioPuzzles(PuzzleGenerator):
+    """
+    The Kitchen's scale puzzle: the flour weight is a multiple of the sugar weight on a faded recipe
+    """
+
+    kind = "kitchen"
+    SUGAR = (20, 25, 30, 40, 50, 60, 75, 80)
+    MILK = (200, 250, 300, 400, 500)
+    YEAST = (7, 10, 15, 20, 30)
+
+    def make(self):
+        eggs = self.rng.randint(1, 4)
+        milk = self.rng.choice(self.MILK)
+        sugar = self.rng.choice(self.SUGAR)
+        yeast = self.rng.choice(self.YEAST)
+        ratio = self.rng.randint(4, 12)
+
+        clue = (f"A old tattered recipe, with some words faded, it says 'Bread: {eggs} Eggs, {milk}ml Milk, "
+                f"{sugar} Grams Sugar, {yeast} Grams Yeast, ...\nIt has poorly written handwriting at the bottom "
+                f"that says 'The flour weight is {ratio} times the sugar")
+        lines = ["\nYou see a scale attached to the door.",
+                 "You need to balance the scale to unlock the door.",
+                 "The scale is currently unbalanced.",
+                 "You need to add the correct weight to the scale to balance it.",
+                 "It appears as though there is a white powder on the table."]
+        return clue, lines, sugar * ratio, (eggs, milk, sugar, yeast, ratio)
+
+
+class RiddlePuzzles(PuzzleGenerator):
+    """
+    A riddle picked from a fixed list, answered in words and allowing one typo
+    """
+
+    kind = "riddle"
+    match = "text"
+    fuzzy = True
+    # (the riddle, the answer, the clue that hints at it)
+    RIDDLES = (
+        ("I have keys but open no locks, and I make music when I am played.", "piano",
+         "A tune is hummed under the breath: 'black and white, eighty-eight in a row'"),
+        ("The more of me you take, the more you leave behind.", "footsteps",
+         "Muddy marks lead across the floor and out of the door"),
+        ("I have a face and two hands, but no arms or legs.", "clock",
+         "Something on the mantelpiece has been ticking all evening"),
+        ("I go up and down the stairs without moving.", "carpet",
+         "A runner of red cloth has been pulled loose on the stairs"),
+        ("I am full of holes but I still hold water.", "sponge",
+         "A damp smell comes from the washstand"),
+        ("I am always in front of you but can never be seen.", "future",
+         "A fortune teller's card reads 'What is yet to come'"),
+        ("I have cities but no houses, forests but no trees, and water but no fish.", "map",
+         "A folded sheet of paper with faded coastlines is tucked in a drawer"),
+        ("I get wetter the more I dry.", "towel",
+         "A damp cloth hangs over the back of a chair"),
+        ("I speak without a mouth and hear without ears, and I answer when you call.", "echo",
+         "Every word said in this room is repeated from the far wall"),
+        ("I am lit to light the room, and I grow shorter the longer I stand.", "candle",
+         "Drops of wax have hardened on the table"),
+    )
+
+    def make(self):
+        riddle, answer, clue = self.rng.choice(self.RIDDLES)
+        lines = ["\nA riddle is carved into the lock of the door:", f"'{riddle}'"]
+        return clue, lines, answer, ()
+
+
+PUZZLE_GENERATORS = {
+    "modular_inverse": ModularInversePuzzles,
+    "recipe_ratio": RecipeRatioPuzzles,
+    "riddle": RiddlePuzzles,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate puzzles as JSON lines, with only the answer hashes")
+    parser.add_argument("generator", choices=sorted(PUZZLE_GENERATORS))
+    parser.add_argument("count", type=int)
+    parser.add_argument("--seed", type=int, help="make the same puzzles every time")
+    args = parser.parse_args()
+
+    generator = PUZZLE_GENERATORS[args.generator](random.Random(args.seed))
+    for generated in generator.stream(args.count):
+        sys.stdout.write(json.dumps(generated.to_record(), ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
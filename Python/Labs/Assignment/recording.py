@@ -0,0 +1,396 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Recording and replaying game sessions
+# A SessionRecorder sits between a Game and its io channel and save backend, and writes a small gzipped file of
+# JSON lines: a header with the game's seed (and the mansion's, for a generated mansion), then one line for every
+# answer the player typed with the time it was typed, and one for every save the game read
+# Each answer line also keeps a CRC32 of everything the game wrote before asking for it, so a replay can check the
+# game still says exactly the same things, and the last line keeps the CRC32 of what was written after the last answer
+# A replay plays the answers back into a new Game with no terminal, no pauses and no save files at full speed, and the
+# puzzle attempt limit uses the recorded times instead of the real clock, so a session of many minutes replays in
+# milliseconds and gives the same game every time. A folder of recordings of real sessions becomes a regression suite
+# Saves written during a replay are thrown away
+#
+# Usage: python recording.py replay FILE_OR_FOLDER... [--no-verify]   - exits with 1 if any replay differs
+# Record with: python OOP_Assignment.py --record FILE   or   python mystery_server.py --record FOLDER
+
+import sys
+import gzip
+import json
+import time
+import zlib
+import asyncio
+import argparse
+from pathlib import Path
+from collections import deque
+
+from save_storage import CorruptSaveError
+
+
+FORMAT = "mystery-recording"
+VERSION = 1
+SUFFIX = ".jsonl.gz"
+
+
+class ReplayMismatch(Exception):
+    """
+    Raised when a replayed game does not write what the recorded one did, with the last lines it wrote
+    """
+
+    def __init__(self, message, output=()):
+        super().__init__(message)
+        self.output = list(output)
+
+
+class RecordingIO:
+    def __init__(self, io, recorder):
+        """
+        Passes everything on to the real io channel, recording the answers and a checksum of the output
+        """
+
+        self.io = io
+        self.recorder = recorder
+        self.checksum = 0  # CRC32 of everything written since the last answer
+        self.now = 0.0  # Seconds from the start of the session to the last answer
+
+    @property
+    def pacer(self):
+        return self.io.pacer
+
+    def clock(self):
+        """
+        The time of the last answer, used by the puzzle attempt limit so a replay sees the same times
+        """
+
+        return self.now
+
+    async def read(self, prompt=""):
+        self.checksum = output_checksum(prompt, self.checksum)
+        answer = await self.io.read(prompt)
+        milliseconds = self.recorder.elapsed()
+        self.now = milliseconds / 1000
+        self.recorder.event("read", milliseconds, answer, self.checksum)
+        self.checksum = 0
+        return answer
+
+    def write(self, text=""):
+        self.checksum = output_checksum(text, self.checksum)
+        self.io.write(text)
+
+    def flush(self):
+        self.io.flush()
+
+    async def pause(self, seconds):
+        await self.io.pause(seconds)
+
+
+class RecordingSaveBackend:
+    def __init__(self, save_backend, recorder):
+        """
+        Passes everything on to the real save backend, recording what the game reads so a replay needs no save files
+        """
+
+        self.save_backend = save_backend
+        self.recorder = recorder
+        self.single_save = save_backend.single_save
+
+    def save(self, state):
+        self.save_backend.save(state)
+
+    def load(self, player_name):
+        try:
+            state = self.save_backend.load(player_name)
+        except CorruptSaveError as error:
+            self.recorder.event("load", player_name, None, str(error))
+            raise
+        self.recorder.event("load", player_name, dict(state) if state is not None else None)
+        return state
+
+    def players(self, limit=None):
+        players = self.save_backend.players(limit=limit)
+        self.recorder.event("players", players)
+        return players
+
+    def players_on_level(self, current_level):
+        players = self.save_backend.players_on_level(current_level)
+        self.recorder.event("players", players)
+        return players
+
+    def close(self):
+        self.save_backend.close()
+
+
+class SessionRecorder:
+    def __init__(self, path, io, save_backend):
+        """
+        Records one session to `path`, give the game recorder.io and recorder.save_backend,
+        then play it with recorder.play(game)
+        """
+
+        self.path = Path(path)
+        self.io = RecordingIO(io, self)
+        self.save_backend = RecordingSaveBackend(save_backend, self)
+        self._file = None
+        self._started = None
+
+    def elapsed(self):
+        """
+        Whole milliseconds since the session started
+        """
+
+        return round((time.monotonic() - self._started) * 1000)
+
+    def event(self, *fields):
+        """
+        Write one line, straight away so the session is kept even if the game is killed
+        """
+
+        self._file.write(json.dumps(fields, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    async def play(self, game, registry=None):
+        """
+        Play the game, recording it from the start until it ends however it ends
+        registry is the GeneratedMansion the game was made with, if it was
+        """
+
+        game.attempts.clock = self.io.clock
+        header = {"format": FORMAT, "version": VERSION, "seed": game.seed, "history_limit": game.history.limit,
+                  "single_save": game.save_backend.single_save, "started": time.time()}
+        if registry is not None:
+            header["rooms"] = len(registry)
+            header["mansion_seed"] = registry.generator.seed
+
+        self._file = gzip.open(self.path, "wt", encoding="utf-8")
+        self._started = time.monotonic()
+        self._file.write(json.dumps(header) + "\n")
+        ending = "quit"
+        try:
+            await game.start()
+        except BaseException as error:
+            ending = type(error).__name__  # EOFError when the player leaves, ConnectionError, KeyboardInterrupt...
+            raise
+        finally:
+            self.event("end", self.elapsed(), self.io.checksum, ending)
+            self._file.close()
+
+
+class Recording:
+    def __init__(self, header, events, path=None):
+        """
+        A recorded session: its header and its lines in order
+        """
+
+        self.header = header
+        self.events = events
+        self.path = path
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a recording, one cut off part way (the game was killed) is read as far as it goes
+        """
+
+        lines = []
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            try:
+                for line in file:
+                    lines.append(line)
+            except EOFError:
+                pass  # Cut off in the middle, the last line may be half written
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            raise ValueError(f"{path} is not a recording") from None
+        if header.get("format") != FORMAT or header.get("version") != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} recording")
+
+        events = []
+        for line in lines[1:]:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                break
+        return cls(header, events, path)
+
+    @property
+    def answers(self):
+        return sum(1 for event in self.events if event[0] == "read")
+
+    @property
+    def end(self):
+        """
+        The "end" line, or None if the recording was cut off
+        """
+
+        return self.events[-1] if self.events and self.events[-1][0] == "end" else None
+
+
+class ReplayIO:
+    pacer = None  # Nothing is paused in a replay
+
+    def __init__(self, recording, verify=True):
+        """
+        Plays back the recorded answers, checking the game writes the same output before each one if verify is set
+        """
+
+        self.answers = iter([event for event in recording.events if event[0] == "read"])
+        self.verify = verify
+        self.checksum = 0
+        self.now = 0.0
+        self.count = 0  # Answers given so far
+        self.output = deque(maxlen=20)  # The last lines written, to show with a mismatch
+
+    def clock(self):
+        return self.now
+
+    async def read(self, prompt=""):
+        self.checksum = output_checksum(prompt, self.checksum)
+        self.output.append(prompt)
+        try:
+            _, milliseconds, answer, checksum = next(self.answers)
+        except StopIteration:
+            raise EOFError("The recording has run out") from None
+
+        self.count += 1
+        if self.verify and checksum != self.checksum:
+            raise ReplayMismatch(f"The game wrote something different before answer {self.count} "
+                                 f"(at prompt {prompt!r})", self.output)
+        self.checksum = 0
+        self.now = milliseconds / 1000
+        return answer
+
+    def write(self, text=""):
+        self.checksum = output_checksum(text, self.checksum)
+        self.output.append(text)
+
+    def flush(self):
+        pass
+
+    async def pause(self, seconds):
+        pass
+
+
+class ReplaySaveBackend:
+    def __init__(self, recording):
+        """
+        Gives the game the saves it read when it was recorded, saves are counted and thrown away
+        """
+
+        self._reads = deque(event for event in recording.events if event[0] in ("players", "load"))
+        self.saves = 0
+        # Older recordings do not say, the game then loaded a lone save without asking whose it was
+        self.single_save = recording.header.get("single_save", True)
+
+    def _next(self, kind):
+        if not self._reads or self._reads[0][0] != kind:
+            raise ReplayMismatch(f"The game read its saves differently ({kind} was not recorded here)")
+        return self._reads.popleft()
+
+    def save(self, state):
+        self.saves += 1
+
+    def load(self, player_name):
+        _, recorded_name, state, *error = self._next("load")
+        if recorded_name != player_name:
+            raise ReplayMismatch(f"The game loaded {player_name!r} instead of {recorded_name!r}")
+        if error:
+            raise CorruptSaveError(error[0])
+        return state
+
+    def players(self, limit=None):
+        return self._next("players")[1]
+
+    def players_on_level(self, current_level):
+        return self._next("players")[1]
+
+    def close(self):
+        pass
+
+
+def output_checksum(text, checksum):
+    """
+    Add one piece of output to a running CRC32, each piece counts as a line
+    """
+
+    return zlib.crc32(f"{text}\n".encode("utf-8"), checksum)
+
+
+async def replay(recording, verify=True):
+    """
+    Play a recording through a new Game, returns the ReplayIO (its count is the answers used)
+    Raises ReplayMismatch if verify is set and the game wrote anything different, or did not use every answer
+    """
+
+    # Imported here, the game imports this module
+    from OOP_Assignment import Game, GeneratedMansion
+
+    header = recording.header
+    registry = GeneratedMansion(header["rooms"], header["mansion_seed"]) if "rooms" in header else None
+    io = ReplayIO(recording, verify)
+    game = Game(io=io, save_backend=ReplaySaveBackend(recording), registry=registry, seed=header["seed"],
+                history_limit=header["history_limit"])
+    game.attempts.clock = io.clock
+
+    try:
+        await game.start()
+    except (EOFError, CorruptSaveError):
+        pass  # The recorded game ended the same way, checked below
+    await game.autosaver.wait()
+
+    end = recording.end
+    if verify and end is not None:
+        if io.count < recording.answers:
+            raise ReplayMismatch(f"The game ended after answer {io.count} of {recording.answers}", io.output)
+        if io.checksum != end[2]:
+            raise ReplayMismatch("The game wrote something different after the last answer", io.output)
+    return io
+
+
+def recordings_in(paths):
+    """
+    The recording files named, with folders replaced by the recordings in them
+    """
+
+    for path in map(Path, paths):
+        if path.is_dir():
+            yield from sorted(path.glob(f"*{SUFFIX}"))
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded game sessions and check they play the same")
+    parser.add_argument("command", choices=["replay"])
+    parser.add_argument("paths", nargs="+", metavar="FILE_OR_FOLDER", help=f"recordings ({SUFFIX} files)")
+    parser.add_argument("--no-verify", action="store_true", help="only play the answers, do not check the output")
+    args = parser.parse_args()
+
+    played = failed = 0
+    start = time.perf_counter()
+    for path in recordings_in(args.paths):
+        played += 1
+        try:
+            recording = Recording.load(path)
+            replay_start = time.perf_counter()
+            io = asyncio.run(replay(recording, verify=not args.no_verify))
+        except (ValueError, OSError, ReplayMismatch) as error:
+            failed += 1
+            print(f"FAILED {path}: {error}")
+            if isinstance(error, ReplayMismatch) and error.output:
+                print("  Last lines written:", *(f"    {line}" for line in error.output), sep="\n")
+            continue
+        elapsed = time.perf_counter() - replay_start
+        played_for = f"{recording.end[1] / 1000:.1f} s" if recording.end else "cut off"
+        print(f"ok     {path}: {io.count} answers, played for {played_for}, replayed in {elapsed * 1e3:.1f} ms")
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {played} recordings in {elapsed:.3f} s, {failed} failed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
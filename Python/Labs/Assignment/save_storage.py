@@ -0,0 +1,942 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Crash-safe storage for the mystery adventure game's save files
+#
+# A save is made of two files:
+# - a JSON snapshot (save_game.json) holding the full game state at some point
+# - an append-only journal (save_game.journal) holding one JSON line per save with only what changed since the last one
+#
+# Loading reads the snapshot and replays the journal on top of it.
+# Every so often the journal is compacted: the current state is written as a new snapshot and the journal is emptied.
+# Snapshots are written atomically (temporary file, fsync, rename), so a crash never leaves a half written save behind.
+# Every journal entry has a sequence number and the snapshot records the last one it includes, so entries are never
+# applied twice if the game crashes in the middle of a compaction.
+#
+# The game talks to its saves through a SaveBackend, so where the saves live can be swapped:
+# - JsonSaveBackend keeps a single save in save_game.json using the journal above
+# - SQLiteSaveBackend keeps one save per player in an SQLite database, for many players sharing one install
+# - BinarySaveBackend keeps one compact binary file per player, see BinarySaveFormat below, optionally compressed
+#   and always checksummed, so thousands of saves can be checked quickly with BinarySaveBackend.verify()
+# The game always asks a player their name before loading from a backend that holds several players' saves
+# A save that is damaged raises CorruptSaveError when it is loaded rather than being quietly filled in with defaults,
+# for a binary save the payload is only checked when its fields are first read
+#
+# Usage: python save_storage.py verify FOLDER   - checks every binary save in a folder
+
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import sqlite3
+import argparse
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+
+class CorruptSaveError(ValueError):
+    """
+    Raised when a save file is damaged: cut short, changed by hand or written by something else
+    """
+    pass
+
+
+# The fields of a game state besides the player name and current level
+STATE_FIELDS = ("witness_statements", "suspect_motives", "inventory", "levels")
+
+
+def check_header(state):
+    """
+    Make sure a loaded game state has a player name and a valid current level, and return it
+    Only these two fields are looked at, so a binary save's payload is not decoded
+    Raises CorruptSaveError rather than letting a damaged save quietly fall back to defaults
+    """
+
+    if not isinstance(state.get("player_name"), str):
+        raise CorruptSaveError("Save has no player name")
+    current_level = state.get("current_level")
+    if not isinstance(current_level, int) or isinstance(current_level, bool) or current_level < 0:
+        raise CorruptSaveError(f"Save has an invalid current level: {current_level!r}")
+    return state
+
+
+def state_field(state, field):
+    """
+    Read one of the other fields of a loaded game state, checking it has the right type
+    Raises CorruptSaveError if it is missing or damaged
+    """
+
+    if field == "levels":
+        levels = state.get("levels", {})  # Saves from before level states were saved do not have it
+        if not isinstance(levels, dict) or not all(isinstance(index, str) and index.isdecimal()
+                                                   and isinstance(value, list) for index, value in levels.items()):
+            raise CorruptSaveError("Save has invalid level states")
+        return levels
+
+    items = state.get(field)
+    if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+        raise CorruptSaveError(f"Save has an invalid {field} list")
+    return items
+
+
+def has_type(value, kind):
+    """
+    True if a value read from a save has the given type, `kind` can also be a dictionary of {key: type}
+    for a dictionary that must have exactly those keys, True and False do not count as numbers
+    """
+
+    if isinstance(kind, dict):
+        return (isinstance(value, dict) and value.keys() == kind.keys()
+                and all(has_type(value[key], key_kind) for key, key_kind in kind.items()))
+    return type(value) is kind
+
+
+def check_state(state):
+    """
+    Make sure a loaded game state has every field the game needs, with the right types, and return it
+    Raises CorruptSaveError rather than letting a damaged save quietly fall back to defaults
+    """
+
+    check_header(state)
+    for field in STATE_FIELDS:
+        state_field(state, field)
+    return state
+
+
+def atomic_write(path, data):
+    """
+    Write bytes to a file so that the file either keeps its old contents or has all of the new ones
+    """
+
+    path = Path(path)
+    temp_path = path.with_name(path.name + ".tmp")
+
+    with open(temp_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+    # Make sure the rename itself reaches the disk, not every platform lets us open a folder
+    try:
+        folder = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(folder)
+    except OSError:
+        pass
+    finally:
+        os.close(folder)
+
+
+def copy_state(state):
+    """
+    Copy a game state, the lists are copied but the strings inside them are shared as they cannot change
+    """
+
+    return {key: list(value) if isinstance(value, list) else value for key, value in state.items()}
+
+
+def state_delta(old_state, new_state):
+    """
+    Work out what changed between two game states
+    Lists that only had items added on the end are stored as just the new items
+    """
+
+    changes = {}
+    additions = {}
+
+    for key, value in new_state.items():
+        old_value = old_state.get(key)
+        if value == old_value:
+            continue
+        if isinstance(value, list) and isinstance(old_value, list) and value[:len(old_value)] == old_value:
+            additions[key] = value[len(old_value):]
+        else:
+            changes[key] = value
+
+    delta = {}
+    if changes:
+        delta["set"] = changes
+    if additions:
+        delta["extend"] = additions
+    return delta
+
+
+def apply_delta(state, delta):
+    """
+    Apply a journal entry to a game state
+    """
+
+    state.update(delta.get("set", {}))
+    for key, items in delta.get("extend", {}).items():
+        state[key] = list(state.get(key, [])) + items
+
+
+class SaveJournal:
+    def __init__(self, snapshot_path, compact_every=50):
+        """
+        Set up the journal for a save, the journal file sits next to the snapshot
+        `compact_every` is how many journal entries are written before the journal is folded into a new snapshot
+        """
+
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = self.snapshot_path.with_suffix(".journal")
+        self.compact_every = compact_every
+
+        self._state = None  # The last state that was saved or loaded
+        self._sequence = 0  # Sequence number of the last journal entry
+        self._entries = 0  # Journal entries written since the last snapshot
+        self.bytes_written = 0  # Total bytes written, used by the save benchmark
+
+    def exists(self):
+        """
+        Check if there is a save to load
+        """
+
+        return self.snapshot_path.exists()
+
+    def save(self, state):
+        """
+        Save the game state, appending only the changes to the journal
+        """
+
+        state = copy_state(state)  # Keep a private copy so later changes to the game are seen as changes
+
+        # A new game, or a save we have not loaded, starts with a fresh snapshot
+        if self._state is None or self._entries >= self.compact_every:
+            self._state = state
+            self.compact()
+            return
+
+        delta = state_delta(self._state, state)
+        if not delta:
+            return
+
+        self._sequence += 1
+        delta["seq"] = self._sequence
+        line = (json.dumps(delta, separators=(",", ":")) + "\n").encode("utf-8")
+
+        with open(self.journal_path, "ab") as file:
+            file.write(line)
+            file.flush()
+            os.fsync(file.fileno())
+
+        self.bytes_written += len(line)
+        self._entries += 1
+        self._state = state
+
+    def compact(self):
+        """
+        Write the current state as a new snapshot and empty the journal
+        """
+
+        snapshot = dict(self._state)
+        snapshot["journal_seq"] = self._sequence
+        data = json.dumps(snapshot, indent=4).encode("utf-8")
+
+        atomic_write(self.snapshot_path, data)
+        # If we crash here the old journal entries are skipped on load, as the snapshot already includes them
+        atomic_write(self.journal_path, b"")
+
+        self.bytes_written += len(data)
+        self._entries = 0
+
+    def load(self):
+        """
+        Read the snapshot and replay the journal on top of it, returns the game state or None if there is no save
+        """
+
+        if not self.exists():
+            return None
+
+        try:
+            with open(self.snapshot_path, "r") as file:
+                state = json.load(file)
+        except ValueError as error:
+            raise CorruptSaveError(f"{self.snapshot_path}: Save snapshot is not valid JSON: {error}") from None
+        if not isinstance(state, dict):
+            raise CorruptSaveError(f"{self.snapshot_path}: Save snapshot is not a game state")
+        self._sequence = state.pop("journal_seq", 0)
+        self._entries = 0
+
+        if self.journal_path.exists():
+            with open(self.journal_path, "r+b") as file:
+                good_end = 0  # Where the last complete entry ends
+                for line in file:
+                    try:
+                        delta = json.loads(line)
+                    except ValueError:
+                        # A torn write from a crash, everything before it is still good
+                        # Cut it off so the next entries are not written after it
+                        file.truncate(good_end)
+                        break
+                    good_end += len(line)
+                    if delta.get("seq", 0) <= self._sequence:
+                        continue  # Already part of the snapshot
+                    apply_delta(state, delta)
+                    self._sequence = delta["seq"]
+                    self._entries += 1
+
+        self._state = state
+        return copy_state(state)
+
+
+# Base class for the places saves can be stored
+# A game state is a dictionary that always has a "player_name" and "current_level"
+class SaveBackend(ABC):
+    single_save = False  # True if the backend only ever holds one save, so the game need not ask whose it is
+
+    @abstractmethod
+    def save(self, state):
+        """
+        Store the game state for the player named in it, replacing their old save
+        """
+        pass
+
+    @abstractmethod
+    def load(self, player_name):
+        """
+        Return the saved game state for the player, or None if they have no save
+        """
+        pass
+
+    @abstractmethod
+    def players(self, limit=None):
+        """
+        Return the names of players with a save, at most `limit` of them
+        """
+        pass
+
+    @abstractmethod
+    def players_on_level(self, current_level):
+        """
+        Return the names of every player whose save is on the given level
+        """
+        pass
+
+    def close(self):
+        """
+        Release anything the backend has open
+        """
+        pass
+
+
+class JsonSaveBackend(SaveBackend):
+    single_save = True
+
+    def __init__(self, save_path):
+        """
+        Keep a single save in a JSON snapshot and journal, the way the game has always saved
+        Saving as a different player replaces the save
+        """
+
+        self.save_path = Path(save_path)
+        self.journal = SaveJournal(self.save_path)
+
+    def save(self, state):
+        """
+        Save the game state through the journal
+        """
+
+        self.journal.save(state)
+
+    def load(self, player_name=None):
+        """
+        Load the save, if a player name is given the save must belong to them
+        """
+
+        state = self.journal.load()
+        if state is None or (player_name is not None and state.get("player_name") != player_name):
+            return None
+        return state
+
+    def players(self, limit=None):
+        """
+        Return the name of the player in the save file, if there is one
+        """
+
+        state = self.journal.load()
+        return [] if state is None or limit == 0 else [state.get("player_name")]
+
+    def players_on_level(self, current_level):
+        """
+        Return the player in the save file if they are on the given level
+        """
+
+        state = self.journal.load()
+        return [state.get("player_name")] if state is not None and state.get("current_level") == current_level else []
+
+
+class SQLiteSaveBackend(SaveBackend):
+    def __init__(self, database_path):
+        """
+        Open (or create) an SQLite database of saves, one row per player
+        The player name is the primary key so loading a player is an index lookup,
+        and there is a second index on current_level for listing everyone on a level.
+        WAL mode and a busy timeout let several game processes write to the same database.
+        """
+
+        self.database_path = Path(database_path)
+        self._lock = threading.Lock()  # One connection is shared by every thread in this process
+        self._connection = sqlite3.connect(self.database_path, timeout=30, check_same_thread=False)
+
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS saves ("
+                "player_name TEXT PRIMARY KEY, "
+                "current_level INTEGER NOT NULL, "
+                "state TEXT NOT NULL, "
+                "updated_at REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS saves_by_level ON saves (current_level)")
+
+    def save(self, state):
+        """
+        Insert or replace the player's save in a single transaction
+        """
+
+        data = json.dumps(state, separators=(",", ":"))
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO saves (player_name, current_level, state, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (player_name) DO UPDATE SET "
+                "current_level = excluded.current_level, state = excluded.state, updated_at = excluded.updated_at",
+                (state["player_name"], state["current_level"], data, time.time()),
+            )
+
+    def save_many(self, states):
+        """
+        Insert or replace many saves in one transaction, much faster than saving them one at a time
+        """
+
+        rows = [(state["player_name"], state["current_level"], json.dumps(state, separators=(",", ":")), time.time())
+                for state in states]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO saves (player_name, current_level, state, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (player_name) DO UPDATE SET "
+                "current_level = excluded.current_level, state = excluded.state, updated_at = excluded.updated_at",
+                rows,
+            )
+
+    def load(self, player_name):
+        """
+        Look up the player's save by name
+        """
+
+        with self._lock:
+            row = self._connection.execute("SELECT state FROM saves WHERE player_name = ?", (player_name,)).fetchone()
+        if row is None:
+            return None
+        try:
+            state = json.loads(row[0])
+        except (TypeError, ValueError) as error:
+            raise CorruptSaveError(f"Save for {player_name!r} is not valid JSON: {error}") from None
+        if not isinstance(state, dict):
+            raise CorruptSaveError(f"Save for {player_name!r} is not a game state")
+        return state
+
+    def players(self, limit=None):
+        """
+        Return player names in name order
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT player_name FROM saves ORDER BY player_name LIMIT ?", (-1 if limit is None else limit,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def players_on_level(self, current_level):
+        """
+        Return every player on the given level, using the current_level index
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT player_name FROM saves WHERE current_level = ? ORDER BY player_name", (current_level,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        """
+        Close the database connection
+        """
+
+        with self._lock:
+            self._connection.close()
+
+
+def write_varint(buffer, number):
+    """
+    Append a non-negative number to the buffer using 7 bits per byte
+    """
+
+    while number >= 0x80:
+        buffer.append((number & 0x7F) | 0x80)
+        number >>= 7
+    buffer.append(number)
+
+
+def read_varint(data, position):
+    """
+    Read a number written by write_varint, returns (number, new position)
+    """
+
+    number = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        number |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return number, position
+        shift += 7
+
+
+class PayloadReader:
+    """
+    Reads the payload of a binary save a chunk at a time, checking its checksum and decompressing it as it goes,
+    so a save with a long history of statements never has to be held in memory twice
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, file, length, compressed, checksum):
+        self.file = file
+        self.remaining = length  # Stored bytes not read from the file yet
+        self.checksum = checksum  # None for version 1 saves, which have no checksum
+        self.crc = 0
+        self.decompressor = zlib.decompressobj() if compressed else None
+        self.buffer = b""
+        self.position = 0
+
+    def _fill(self):
+        """
+        Add at least one more byte to the buffer, returns False at the end of the payload
+        """
+
+        if self.decompressor is not None and self.decompressor.unconsumed_tail:
+            data = self.decompressor.decompress(self.decompressor.unconsumed_tail, self.CHUNK_SIZE)
+        else:
+            if not self.remaining:
+                return False
+            chunk = self.file.read(min(self.CHUNK_SIZE, self.remaining))
+            if not chunk:
+                raise CorruptSaveError("Save file is cut short")
+            self.remaining -= len(chunk)
+            self.crc = zlib.crc32(chunk, self.crc)
+            try:
+                data = self.decompressor.decompress(chunk, self.CHUNK_SIZE) if self.decompressor else chunk
+            except zlib.error as error:
+                raise CorruptSaveError(f"Save payload cannot be decompressed: {error}") from None
+        self.buffer = self.buffer[self.position:] + data
+        self.position = 0
+        return True
+
+    def read(self, size):
+        """
+        The next `size` bytes of the (decompressed) payload
+        """
+
+        while len(self.buffer) - self.position < size:
+            if not self._fill():
+                raise CorruptSaveError("Save payload ends in the middle of an item")
+        data = self.buffer[self.position:self.position + size]
+        self.position += size
+        return data
+
+    def read_varint(self):
+        """
+        The next number written by write_varint
+        """
+
+        number = 0
+        shift = 0
+        buffer, position = self.buffer, self.position  # Read straight from the buffer, this is called for every item
+        while True:
+            if position == len(buffer):
+                self.position = position
+                if not self._fill():
+                    raise CorruptSaveError("Save payload ends in the middle of a number")
+                buffer, position = self.buffer, self.position
+            byte = buffer[position]
+            position += 1
+            number |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                self.position = position
+                return number
+            shift += 7
+
+    def verify(self):
+        """
+        Read whatever is left of the payload and check the checksum, raising CorruptSaveError if it is wrong
+        """
+
+        while self.remaining:
+            chunk = self.file.read(min(self.CHUNK_SIZE, self.remaining))
+            if not chunk:
+                raise CorruptSaveError("Save file is cut short")
+            self.remaining -= len(chunk)
+            self.crc = zlib.crc32(chunk, self.crc)
+        if self.checksum is not None and self.crc != self.checksum:
+            raise CorruptSaveError("Save payload does not match its checksum")
+
+    def finish(self):
+        """
+        Check the whole payload was used: the checksum matches and nothing is left over
+        """
+
+        self.verify()
+        leftover = len(self.buffer) - self.position
+        if self.decompressor is not None:
+            leftover += len(self.decompressor.unconsumed_tail) + len(self.decompressor.flush())
+            if not self.decompressor.eof:
+                raise CorruptSaveError("Compressed save payload is cut short")
+        if leftover:
+            raise CorruptSaveError("Save payload has data after the end")
+
+
+class BinarySaveFormat:
+    """
+    Compact binary save format
+
+    Header (read on its own, without touching the rest of the file):
+        magic b"NPSV", version (1 byte), flags (1 byte), text table checksum (4 bytes),
+        current level (4 bytes), player name length (2 bytes), player name (UTF-8), payload length (4 bytes),
+        then from version 2: CRC-32 of the payload as stored (4 bytes) and CRC-32 of the header before it (4 bytes)
+    Payload, compressed with zlib if the COMPRESSED flag is set:
+        for each of LIST_FIELDS: item count, then each item as a varint tag
+            tag = id * 2 for text found in the game's static text table
+            tag = length * 2 + 1 followed by the UTF-8 text for anything else
+        then the length of a JSON object holding any other fields, and the JSON itself
+    Version 1 saves (no checksums, never compressed) can still be read
+    """
+
+    MAGIC = b"NPSV"
+    VERSION = 2
+    READABLE_VERSIONS = (1, 2)
+    COMPRESSED = 0x01  # Flag bit
+    HEADER = struct.Struct("<4sBBIIH")
+    CHECKSUMS = struct.Struct("<II")
+    LIST_FIELDS = ("witness_statements", "suspect_motives", "inventory")
+
+    def __init__(self, strings, compress=False, level=6):
+        """
+        Build the string table, `strings` is the fixed text from the Level classes
+        With compress=True new saves are compressed with zlib at `level`, saves are read either way
+        """
+
+        self.strings = list(strings)
+        self.ids = {text: number for number, text in enumerate(self.strings)}
+        # Saves can only be decoded with the same table, so a checksum of it goes in the header
+        self.checksum = zlib.crc32("\0".join(self.strings).encode("utf-8"))
+        self.compress = compress
+        self.level = level
+
+    def encode(self, state):
+        """
+        Turn a game state into bytes
+        """
+
+        payload = bytearray()
+        for field in self.LIST_FIELDS:
+            items = state.get(field, [])
+            write_varint(payload, len(items))
+            for item in items:
+                number = self.ids.get(item)
+                if number is not None:
+                    write_varint(payload, number * 2)
+                else:
+                    text = item.encode("utf-8")
+                    write_varint(payload, len(text) * 2 + 1)
+                    payload += text
+
+        extra = {key: value for key, value in state.items()
+                 if key not in self.LIST_FIELDS and key not in ("player_name", "current_level")}
+        extra = json.dumps(extra, separators=(",", ":")).encode("utf-8") if extra else b""
+        write_varint(payload, len(extra))
+        payload += extra
+
+        flags = 0
+        payload = bytes(payload)
+        if self.compress:
+            flags |= self.COMPRESSED
+            payload = zlib.compress(payload, self.level)
+
+        name = state["player_name"].encode("utf-8")
+        header = (self.HEADER.pack(self.MAGIC, self.VERSION, flags, self.checksum, state["current_level"], len(name))
+                  + name + struct.pack("<II", len(payload), zlib.crc32(payload)))
+        return header + struct.pack("<I", zlib.crc32(header)) + payload
+
+    def read_header(self, file):
+        """
+        Read just the header from an open file,
+        returns (player name, current level, payload length, flags, payload checksum or None for version 1)
+        Raises CorruptSaveError if the header is damaged
+        """
+
+        header = file.read(self.HEADER.size)
+        if len(header) < self.HEADER.size:
+            raise CorruptSaveError("Save file is too short")
+
+        magic, version, flags, checksum, current_level, name_length = self.HEADER.unpack(header)
+        if magic != self.MAGIC:
+            raise CorruptSaveError("Not a binary save file")
+        if version not in self.READABLE_VERSIONS:
+            raise CorruptSaveError(f"Unsupported save version {version}")
+
+        name = file.read(name_length)
+        rest = file.read(4 if version == 1 else 8)
+        if len(name) < name_length or len(rest) < (4 if version == 1 else 8):
+            raise CorruptSaveError("Save file header is cut short")
+        header += name + rest
+
+        payload_checksum = None
+        if version == 1:
+            payload_length, = struct.unpack("<I", rest)
+        else:
+            payload_length, payload_checksum = self.CHECKSUMS.unpack(rest)
+            header_checksum = file.read(4)
+            if len(header_checksum) < 4 or struct.unpack("<I", header_checksum)[0] != zlib.crc32(header):
+                raise CorruptSaveError("Save file header does not match its checksum")
+
+        if checksum != self.checksum:
+            # Checked after the header checksum, so a damaged header is not reported as different game text
+            raise CorruptSaveError("Save file was written with different game text")
+        try:
+            player_name = name.decode("utf-8")
+        except UnicodeDecodeError:
+            raise CorruptSaveError("Save file player name is not valid text") from None
+        return player_name, current_level, payload_length, flags, payload_checksum
+
+    def read_payload(self, file, length, flags, checksum):
+        """
+        Read and decode the payload that follows the header, checking it as it is read
+        Returns the list fields and any other fields, raises CorruptSaveError if the payload is damaged
+        """
+
+        reader = PayloadReader(file, length, flags & self.COMPRESSED, checksum)
+        try:
+            fields = self.decode(reader)
+            reader.finish()
+        except CorruptSaveError:
+            reader.verify()  # A checksum that does not match explains everything else
+            raise
+        except (IndexError, UnicodeDecodeError, ValueError) as error:
+            reader.verify()
+            raise CorruptSaveError(f"Save payload cannot be decoded: {error}") from None
+        return fields
+
+    def decode(self, reader):
+        """
+        Turn the payload back into the list fields and any other fields
+        """
+
+        fields = {}
+        for field in self.LIST_FIELDS:
+            count = reader.read_varint()
+            items = []
+            for _ in range(count):
+                tag = reader.read_varint()
+                if tag % 2 == 0:
+                    items.append(self.strings[tag // 2])
+                else:
+                    items.append(reader.read(tag // 2).decode("utf-8"))
+            fields[field] = items
+
+        length = reader.read_varint()
+        if length:
+            try:
+                extra = json.loads(reader.read(length))
+            except ValueError as error:
+                raise CorruptSaveError(f"Save payload extra fields are not valid JSON: {error}") from None
+            if not isinstance(extra, dict):
+                raise CorruptSaveError("Save payload extra fields are not an object")
+            fields.update(extra)
+        return fields
+
+    def verify(self, file):
+        """
+        Check a whole save file without decoding it: the header and the payload checksum
+        Returns the player name, raises CorruptSaveError if the file is damaged
+        Version 1 saves have no checksum, so they are decoded instead
+        """
+
+        player_name, _, length, flags, checksum = self.read_header(file)
+        if checksum is None:
+            self.read_payload(file, length, flags, checksum)
+        else:
+            PayloadReader(file, length, False, checksum).verify()  # The checksum is of the stored bytes
+        if file.read(1):
+            raise CorruptSaveError("Save file has data after the end")
+        return player_name
+
+
+class LazySaveState(Mapping):
+    def __init__(self, save_format, path, header, payload_offset):
+        """
+        A loaded binary save where only the header has been read
+        The rest of the file is read, checked and decoded the first time any other field is looked at
+        """
+
+        self._format = save_format
+        self._path = path
+        self._offset = payload_offset
+        player_name, current_level, self._length, self._flags, self._checksum = header
+        self._fields = {"player_name": player_name, "current_level": current_level}
+        self._decoded = False
+
+    def _decode(self):
+        """
+        Read and decode the payload
+        """
+
+        with open(self._path, "rb") as file:
+            file.seek(self._offset)
+            try:
+                fields = self._format.read_payload(file, self._length, self._flags, self._checksum)
+                if file.read(1):
+                    raise CorruptSaveError("Save file has data after the end")
+            except CorruptSaveError as error:
+                raise CorruptSaveError(f"{self._path}: {error}") from None
+        self._fields.update(fields)
+        self._decoded = True
+
+    def __getitem__(self, key):
+        if key not in self._fields and not self._decoded:
+            self._decode()
+        return self._fields[key]
+
+    def __iter__(self):
+        if not self._decoded:
+            self._decode()
+        return iter(self._fields)
+
+    def __len__(self):
+        if not self._decoded:
+            self._decode()
+        return len(self._fields)
+
+
+class BinarySaveBackend(SaveBackend):
+    def __init__(self, folder, strings, compress=False):
+        """
+        Keep one binary save file per player in a folder
+        `strings` is the game's fixed text, stored in saves as small ids
+        With compress=True saves are written compressed, both kinds are read
+        """
+
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.format = BinarySaveFormat(strings, compress)
+
+    def path_for(self, player_name):
+        """
+        The save file for a player, the name is escaped so any name is a valid file name
+        """
+
+        return self.folder / (quote(player_name, safe="") + ".sav")
+
+    def save(self, state):
+        """
+        Write the player's save atomically
+        """
+
+        atomic_write(self.path_for(state["player_name"]), self.format.encode(state))
+
+    def load(self, player_name):
+        """
+        Read the header of the player's save, the rest is checked and decoded when it is first used
+        Raises CorruptSaveError if the save is damaged
+        """
+
+        path = self.path_for(player_name)
+        try:
+            with open(path, "rb") as file:
+                header = self.format.read_header(file)
+                payload_offset = file.tell()
+        except FileNotFoundError:
+            return None
+        except CorruptSaveError as error:
+            raise CorruptSaveError(f"{path}: {error}") from None
+        if header[0] != player_name:
+            raise CorruptSaveError(f"{path}: Save file belongs to {header[0]!r}")
+        return LazySaveState(self.format, path, header, payload_offset)
+
+    def players(self, limit=None):
+        """
+        Return player names from the save file names
+        """
+
+        names = sorted(unquote(path.stem) for path in self.folder.glob("*.sav"))
+        return names if limit is None else names[:limit]
+
+    def players_on_level(self, current_level):
+        """
+        Return every player on the given level, reading only the header of each save
+        """
+
+        players = []
+        for path in sorted(self.folder.glob("*.sav")):
+            with open(path, "rb") as file:
+                name, level, _, _, _ = self.format.read_header(file)
+            if level == current_level:
+                players.append(name)
+        return players
+
+    def verify(self):
+        """
+        Check every save in the folder against its checksums without decoding them
+        Yields (path, None) for a good save and (path, CorruptSaveError) for a damaged one
+        """
+
+        for path in sorted(self.folder.glob("*.sav")):
+            try:
+                with open(path, "rb") as file:
+                    player_name = self.format.verify(file)
+                if player_name != unquote(path.stem):
+                    raise CorruptSaveError(f"Save file belongs to {player_name!r}")
+            except CorruptSaveError as error:
+                yield path, error
+            else:
+                yield path, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the binary saves in a folder against their checksums")
+    parser.add_argument("command", choices=["verify"])
+    parser.add_argument("folder", help="folder of binary saves (.sav files)")
+    args = parser.parse_args()
+
+    # Imported here, the game imports this module
+    from OOP_Assignment import static_text
+
+    backend = BinarySaveBackend(args.folder, static_text())
+    checked = damaged = 0
+    start = time.perf_counter()
+    for path, error in backend.verify():
+        checked += 1
+        if error is not None:
+            damaged += 1
+            print(f"DAMAGED {path}: {error}")
+    elapsed = time.perf_counter() - start
+    print(f"Checked {checked} saves in {elapsed:.3f} s, {damaged} damaged")
+    sys.exit(1 if damaged else 0)
+
+
+if __name__ == "__main__":
+    main()
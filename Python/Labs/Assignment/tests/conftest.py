@@ -0,0 +1,40 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Shared setup for the tests of the mystery adventure game
+# The game's modules sit in the folder above this one and are imported by name, the same way the game imports them
+#
+# Usage: python -m pytest tests
+
+import sys
+import asyncio
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from OOP_Assignment import Game, ScriptedIO
+from save_storage import JsonSaveBackend
+
+
+@pytest.fixture
+def play(tmp_path):
+    """
+    Play a new game with a list of answers until they run out, returns the game and everything it wrote
+    """
+
+    def play(answers, seed=1):
+        io = ScriptedIO(answers)
+        game = Game(io=io, save_backend=JsonSaveBackend(tmp_path / "save_game.json"), seed=seed)
+        try:
+            asyncio.run(game.start())
+        except EOFError:
+            pass  # The answers ran out
+        game.autosaver.flush()
+        return game, "\n".join(io.output)
+
+    return play
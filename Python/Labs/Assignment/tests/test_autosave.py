@@ -0,0 +1,103 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for background autosaving: saves are written by a worker thread, bursts are coalesced and errors are raised
+#
+# Usage: python -m pytest tests/test_autosave.py
+
+import threading
+
+import pytest
+
+from autosave import Autosaver
+from metrics import Metrics
+
+
+class Snapshot:
+    def __init__(self, player_name, current_level):
+        self.player_name = player_name
+        self.current_level = current_level
+
+    def to_state(self):
+        return {"player_name": self.player_name, "current_level": self.current_level}
+
+
+class SlowBackend:
+    """
+    Keeps the saves written, the first write waits until `gate` is set
+    """
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.writing = threading.Event()
+        self.saved = []
+        self.batches = []
+
+    def save(self, state):
+        self.writing.set()
+        self.gate.wait(5)
+        self.saved.append(state)
+
+
+class BatchBackend(SlowBackend):
+    def save_many(self, states):
+        self.batches.append(states)
+        self.saved.extend(states)
+
+
+class BrokenBackend:
+    def save(self, state):
+        raise OSError("disk full")
+
+
+def test_saves_are_written_in_the_background():
+    backend = SlowBackend()
+    autosaver = Autosaver(backend, Metrics())
+    autosaver.save(Snapshot("Tester", 1))
+    assert backend.writing.wait(5) and not backend.saved  # save() returned before the write finished
+
+    backend.gate.set()
+    autosaver.flush()
+    assert backend.saved == [{"player_name": "Tester", "current_level": 1}]
+    assert autosaver.stats()["writes"] == 1 and autosaver.pending == 0
+    assert autosaver.metrics.histogram("save_lag").count == 1
+
+
+def test_a_burst_of_saves_is_written_once():
+    backend = SlowBackend()
+    autosaver = Autosaver(backend)
+    autosaver.save(Snapshot("Tester", 1))
+    backend.writing.wait(5)
+    for level in range(2, 6):
+        autosaver.save(Snapshot("Tester", level))  # Waiting while the first save is written
+
+    backend.gate.set()
+    autosaver.flush()
+    assert [state["current_level"] for state in backend.saved] == [1, 5]
+    assert autosaver.writes == 2 and autosaver.dropped == 3
+
+
+def test_waiting_saves_share_one_transaction():
+    backend = BatchBackend()
+    autosaver = Autosaver(backend)
+    autosaver.save(Snapshot("Alice", 1))
+    backend.writing.wait(5)
+    autosaver.save(Snapshot("Bob", 2))
+    autosaver.save(Snapshot("Carol", 3))
+
+    backend.gate.set()
+    autosaver.flush()
+    assert [[state["player_name"] for state in batch] for batch in backend.batches] == [["Bob", "Carol"]]
+    assert autosaver.writes == 3
+
+
+def test_a_failed_save_is_raised_by_flush():
+    autosaver = Autosaver(BrokenBackend())
+    autosaver.save(Snapshot("Tester", 1))
+    with pytest.raises(OSError, match="disk full"):
+        autosaver.flush()
+    assert autosaver.failed == 1 and autosaver.writes == 0
+    autosaver.flush()  # The error is only raised once
@@ -0,0 +1,51 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for the Monte Carlo simulator of the Cellar fight
+#
+# Usage: python -m pytest tests/test_cellar_simulator.py
+
+import numpy as np
+
+from cellar_simulator import (ATTACK, DEFEND, CHARGE, STRATEGIES, CellarRules, always_attack, resolve, simulate)
+
+
+def test_rules_come_from_the_level():
+    rules = CellarRules.from_level()
+    assert rules.detective_health > 0 and rules.skeleton_health > 0
+    assert rules.detective_damage > 0 and rules.skeleton_damage > 0
+
+
+def test_resolve_follows_the_game_rules():
+    moves = np.array([ATTACK, ATTACK, ATTACK, CHARGE, CHARGE], dtype=np.int8)
+    other_moves = np.array([ATTACK, DEFEND, DEFEND, ATTACK, ATTACK], dtype=np.int8)
+    charge = np.array([False, False, True, False, True])
+    health = np.full(5, 100, dtype=np.int16)
+
+    charge, health = resolve(moves, other_moves, charge, 10, health)
+    # A plain hit, a defended hit (int(10 * 0.25)), a defended charged hit, then two charges
+    assert health.tolist() == [90, 98, 95, 100, 100]
+    # Attacking uses up the charge and charging toggles it
+    assert charge.tolist() == [False, False, False, True, False]
+
+
+def test_every_fight_is_counted():
+    rules = CellarRules.from_level()
+    for strategy in STRATEGIES.values():
+        totals = simulate(strategy, 2000, rules, np.random.default_rng(1), batch_size=700)
+        assert sum(totals.values()) == 2000
+
+
+def test_the_same_seed_gives_the_same_results():
+    rules = CellarRules.from_level()
+    first = simulate(STRATEGIES["random"], 1000, rules, np.random.default_rng(5))
+    assert simulate(STRATEGIES["random"], 1000, rules, np.random.default_rng(5)) == first
+
+
+def test_a_one_hit_fight_is_always_won():
+    rules = CellarRules({"health": 100, "damage": 50}, {"health": 10, "damage": 5})
+    totals = simulate(always_attack, 500, rules, np.random.default_rng(2))
+    assert totals == {"win": 500, "lose": 0, "double ko": 0, "unfinished": 0}
@@ -0,0 +1,78 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for the Cellar fight solver and the hint command
+#
+# Usage: python -m pytest tests/test_cellar_solver.py
+
+import pytest
+
+from OOP_Assignment import CellarLevel, ScriptedIO
+from cellar_solver import CellarPolicy
+
+
+def fighter(health, charge=False):
+    return {"health": health, "charge": charge}
+
+
+@pytest.fixture(scope="module")
+def policy():
+    return CellarPolicy.solve(6, 2, 5, 2)
+
+
+@pytest.mark.parametrize("detective, skeleton", [(1, 1), (1, 5), (6, 1), (6, 5)])
+def test_lookup_inside_the_table(policy, detective, skeleton):
+    for charges in [(False, False), (True, False), (False, True), (True, True)]:
+        move, chance = policy.lookup(fighter(detective, charges[0]), fighter(skeleton, charges[1]))
+        assert move in ("attack", "defend", "charge")
+        assert 0.0 <= chance <= 1.0
+
+
+@pytest.mark.parametrize("detective, skeleton, chance", [(0, 5, 0.0), (-3, 5, 0.0), (3, 0, 1.0), (3, -2, 1.0),
+                                                         (0, 0, 0.0), (-1, -1, 0.0)])
+def test_lookup_after_the_fight(policy, detective, skeleton, chance):
+    assert policy.lookup(fighter(detective), fighter(skeleton)) == (None, chance)
+
+
+def test_a_certain_win_is_found():
+    # Even a defended attack deals int(8 * 0.25) = 2, and the Skeleton can deal at most 4
+    policy = CellarPolicy.solve(6, 8, 2, 2)
+    assert policy.lookup(fighter(6), fighter(2)) == ("attack", 1.0)
+
+
+def test_the_table_is_cached(tmp_path):
+    path = tmp_path / "cellar_policy.json"
+    policy = CellarPolicy.for_fighters({"health": 4, "damage": 2}, {"health": 3, "damage": 1}, path)
+    assert path.exists()
+    loaded = CellarPolicy.load(path)
+    assert loaded.table == policy.table
+    assert loaded.covers(4, 2, 3, 1) and loaded.covers(2, 2, 1, 1)
+    assert not loaded.covers(5, 2, 3, 1) and not loaded.covers(4, 3, 3, 1)
+
+
+def test_a_damaged_cache_is_ignored(tmp_path):
+    path = tmp_path / "cellar_policy.json"
+    path.write_text("{")
+    assert CellarPolicy.load(path) is None
+    assert CellarPolicy.for_fighters({"health": 2, "damage": 1}, {"health": 2, "damage": 1}, path).covers(2, 1, 2, 1)
+
+
+def test_hint_after_a_lost_fight():
+    level = CellarLevel()
+    level.io = ScriptedIO([])
+    level.Detective["health"] = 0
+    level.hint()
+    assert "the fight is over" in level.io.output[-1]
+
+
+def test_hint_during_a_fight(monkeypatch):
+    level = CellarLevel()
+    level.io = ScriptedIO([])
+    level.Detective["health"], level.Skeleton["health"] = 3, 4
+    small = CellarPolicy.solve(5, level.Detective["damage"], 5, level.Skeleton["damage"])
+    monkeypatch.setattr(CellarLevel, "policy", small)
+    level.hint()
+    assert "your best move is to" in level.io.output[-1]
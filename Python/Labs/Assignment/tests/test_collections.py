@@ -0,0 +1,28 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for the OrderedSet used for the inventory, witness statements and suspect motives
+#
+# Usage: python -m pytest tests/test_collections.py
+
+from OOP_Assignment import OrderedSet
+
+
+def test_items_keep_the_order_they_were_added_in():
+    items = OrderedSet(["b", "a"])
+    assert items.add("c") and not items.add("a")
+    assert list(items) == ["b", "a", "c"] and items.to_list() == ["b", "a", "c"]
+    assert len(items) == 3 and "a" in items and "d" not in items
+
+
+def test_equality_depends_on_order():
+    assert OrderedSet(["a", "b"]) == OrderedSet(["a", "b", "a"])
+    assert OrderedSet(["a", "b"]) != OrderedSet(["b", "a"])
+
+
+def test_talking_twice_does_not_repeat_a_statement(play):
+    game, _ = play(["Tester", "1", "groundskeeper", "1", "groundskeeper"])
+    assert len(game.witness_statements) == 1
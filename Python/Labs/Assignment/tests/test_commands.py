@@ -0,0 +1,125 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for the menu commands: aliases, levels' own commands, and several commands on one line separated by ";"
+#
+# Usage: python -m pytest tests/test_commands.py
+
+import asyncio
+
+import pytest
+
+from OOP_Assignment import Command, CommandTable, InputQueue, ScriptedIO, CellarLevel, game_commands
+
+
+def test_parse_splits_parts_and_arguments():
+    assert game_commands.parse("3;4 legacy;undo 2") == [["3"], ["4", "legacy"], ["undo", "2"]]
+    assert game_commands.parse("u;3") == [["u"], ["3"]]
+    assert game_commands.parse("  ") == [["  "]]
+
+
+def test_commands_are_found_by_any_alias():
+    assert game_commands.find("3").name == "search"
+    assert game_commands.find(" Search ").name == "search"
+    assert game_commands.find("s").name == "search"
+    assert game_commands.find("dance") is None
+    assert game_commands.find("hint", CellarLevel()).name == "hint"  # Only the Cellar has a hint command
+    assert game_commands.find("hint") is None
+
+
+def test_an_alias_cannot_be_used_twice():
+    table = CommandTable()
+    table.register(Command("search", ("3", "search"), "Look for clues", lambda game, level: False))
+    with pytest.raises(ValueError):
+        table.register(Command("seek", ("seek", "search"), "Look again", lambda game, level: False))
+
+
+def test_queued_answers_are_used_first():
+    io = ScriptedIO(["typed"])
+    queue = InputQueue(io)
+    queue.queue([["ahead"]])
+    assert asyncio.run(queue.read("Answer: ")) == "ahead"
+    assert asyncio.run(queue.read("Answer: ")) == "typed"
+    assert "Answer: ahead" in io.output
+
+
+def test_argument_only_comes_from_the_same_part():
+    queue = InputQueue(ScriptedIO([]))
+    queue.queue([["2"], ["3"]])
+    assert queue.argument("1") == "2"
+    assert queue.argument("1") == "1"  # "3" is the next command, not an argument
+    assert len(queue.pending) == 1
+
+
+def test_a_batch_line_plays_several_commands(play):
+    game, output = play(["Tester", "3;4 legacy"])
+    assert "You search the mansion foyer for clues." in output
+    assert game._current_level == 1
+
+
+def test_undo_takes_back_a_command(play):
+    game, output = play(["Tester", "3", "undo"])
+    assert "Back to checkpoint 1" in output
+    assert not game.levels[0].searched
+
+
+def test_undo_with_a_step_count(play):
+    game, output = play(["Tester", "3", "1", "groundskeeper", "undo 2"])
+    assert "Back to checkpoint 1" in output
+    assert not game.levels[0].searched and not game.witness_statements
+
+
+def test_undo_then_next_command(play):
+    game, output = play(["Tester", "3", "u;3"])
+    assert "Back to checkpoint 1" in output
+    assert game.history.current.label == "search"  # The "3" after the ";" was run, not used as the step count
+    assert game.levels[0].searched
+
+
+def test_undo_then_command_word(play):
+    game, output = play(["Tester", "3", "undo;search"])
+    assert "Please give a number" not in output
+    assert "Back to checkpoint 1" in output
+    assert game.history.current.label == "search"
+
+
+def test_rewind_without_a_number_shows_history(play):
+    game, output = play(["Tester", "3", "rewind;2"])
+    assert "Checkpoints (type 'rewind N'" in output
+    assert game.history.current.label == "search"  # Viewing clues (2) does not add a checkpoint
+
+
+def test_redo_after_undo(play):
+    game, output = play(["Tester", "3", "undo", "redo"])
+    assert "Back to checkpoint 2, after 'search' on level 1." in output
+    assert game.levels[0].searched
+
+
+def test_rewind_to_a_checkpoint(play):
+    game, output = play(["Tester", "3", "1", "groundskeeper", "history", "rewind 2", "rewind 9"])
+    assert "Checkpoints (type 'rewind N' to go back to one):" in output
+    assert "3. after 'interact' on level 1   <- you are here" in output
+    assert "Back to checkpoint 2, after 'search' on level 1." in output
+    assert "There is no checkpoint 9" in output
+    assert game.levels[0].searched and not game.witness_statements
+
+
+def test_undo_needs_a_number(play):
+    _, output = play(["Tester", "undo two"])
+    assert "Please give a number, e.g. 'undo 2'." in output
+
+
+@pytest.mark.parametrize("command", ["undo", "redo", "rewind"])
+def test_digits_that_are_not_numbers_are_refused(play, command):
+    game, output = play(["Tester", "3", f"{command} ²"])  # "²".isdigit() is True but int("²") fails
+    assert f"Please give a number, e.g. '{command} 2'." in output
+    assert game.levels[0].searched
+
+
+def test_undo_back_to_an_earlier_level(play):
+    game, output = play(["Tester", "3;4 legacy", "undo"])
+    assert game._current_level == 0
+    assert "Back to checkpoint" in output
@@ -0,0 +1,104 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for the content pack: the compiled file holds exactly the checked JSON and is rebuilt when the JSON changes
+#
+# Usage: python -m pytest tests/test_content_pack.py
+
+import os
+import copy
+import json
+
+import pytest
+
+from content_pack import DEFAULT_SOURCE, ContentError, ContentPack, compile_pack, load_content_pack, validate
+from puzzles import Puzzle
+
+
+@pytest.fixture
+def data():
+    with open(DEFAULT_SOURCE, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def test_compiled_pack_holds_the_same_levels(data):
+    validate(data)
+    pack = ContentPack(compile_pack(data))
+    assert pack.level_ids() == [level["id"] for level in data["levels"]]
+    for level in data["levels"]:
+        assert pack.kind(level["id"]) == level.get("kind", "room")
+        assert pack.level(level["id"]) == level
+    with pytest.raises(KeyError):
+        pack.level("attic")
+
+
+def test_compiled_file_is_reused_until_the_json_changes(data, tmp_path):
+    source = tmp_path / "levels.json"
+    source.write_text(json.dumps(data), encoding="utf-8")
+    load_content_pack(source)
+    compiled = source.with_suffix(".pack")
+    written = compiled.stat().st_mtime_ns
+
+    assert load_content_pack(source).level("mansion")["name"] == "The Mansion"
+    assert compiled.stat().st_mtime_ns == written
+
+    data["levels"][0]["name"] = "The Old Mansion"
+    source.write_text(json.dumps(data), encoding="utf-8")
+    os.utime(source, ns=(written + 10**9, written + 10**9))
+    assert load_content_pack(source).level("mansion")["name"] == "The Old Mansion"
+
+
+def test_a_damaged_compiled_file_is_rebuilt(data, tmp_path):
+    source = tmp_path / "levels.json"
+    source.write_text(json.dumps(data), encoding="utf-8")
+    source.with_suffix(".pack").write_bytes(b"not a pack")
+    assert load_content_pack(source).level_ids()[0] == "mansion"
+
+
+def test_invalid_content_is_rejected(data):
+    missing = copy.deepcopy(data)
+    del missing["levels"][0]["name"]
+    with pytest.raises(ContentError):
+        validate(missing)
+
+    placeholder = copy.deepcopy(data)
+    placeholder["levels"][0]["start"][0] = "Welcome to {nowhere}!"
+    with pytest.raises(ContentError):
+        validate(placeholder)
+
+
+def test_shipped_content_has_no_plain_answers(data):
+    for level in data["levels"]:
+        assert "answer" not in level["puzzle"]
+
+    pack = load_content_pack()
+    for level_id, answer in [("mansion", "legacy"), ("garden", "Nightshade"), ("observatory", "ursa major"),
+                             ("study", "5"), ("kitchen", "500 grams")]:
+        puzzle_content = pack.level(level_id)["puzzle"]
+        assert "answer" not in puzzle_content
+        assert Puzzle.from_content(level_id, puzzle_content).check(answer)
+
+
+def test_plain_answers_are_hashed_when_the_pack_is_built(data, tmp_path):
+    mansion = data["levels"][0]["puzzle"]
+    del mansion["answer_hashes"]
+    mansion["answer"] = "zebracorn"
+    source = tmp_path / "levels.json"
+    source.write_text(json.dumps(data), encoding="utf-8")
+
+    pack = load_content_pack(source)
+    assert b"zebracorn" not in source.with_suffix(".pack").read_bytes()
+    assert Puzzle.from_content("mansion", pack.level("mansion")["puzzle"]).check("Zebracorn")
+
+
+def test_content_with_both_answers_and_hashes_is_rejected(data):
+    data["levels"][0]["puzzle"]["answer"] = "legacy"
+    with pytest.raises(ContentError, match="both an answer and answer hashes"):
+        validate(data)
+    del data["levels"][0]["puzzle"]["answer"]
+    data["levels"][0]["puzzle"]["answer_hashes"]["hashes"] = ["abc"]
+    with pytest.raises(ContentError, match="SHA-256"):
+        validate(data)
@@ -0,0 +1,70 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for the event bus the levels publish their progress on
+#
+# Usage: python -m pytest tests/test_events.py
+
+import asyncio
+import logging
+
+from events import Event, EventBus, StatementFound, MotiveFound, LevelSolved, SessionStats, EventLogger
+
+
+def test_handlers_get_their_events_and_subclasses():
+    async def run():
+        bus = EventBus()
+        seen = []
+
+        async def slow(event):
+            seen.append(("async", event.statement))
+
+        bus.subscribe(StatementFound, lambda event: seen.append(("statement", event.statement)))
+        bus.subscribe(StatementFound, slow)
+        bus.subscribe(Event, lambda event: seen.append(("any", type(event).__name__)))
+        await bus.publish(StatementFound("I saw her"))
+        await bus.publish(MotiveFound("Money"))
+        return seen
+
+    assert asyncio.run(run()) == [("statement", "I saw her"), ("async", "I saw her"), ("any", "StatementFound"),
+                                  ("any", "MotiveFound")]
+
+
+def test_batched_handlers_wait_for_a_flush():
+    async def run():
+        bus = EventBus(batch_size=3)
+        batches = []
+        bus.subscribe((StatementFound, LevelSolved), batches.append, batched=True)
+        await bus.publish(StatementFound("One"))
+        await bus.publish(MotiveFound("Not wanted"))
+        before_flush = list(batches)
+        await bus.publish(LevelSolved(0, "The Mansion"))  # The third event fills the batch
+        await bus.publish(StatementFound("Two"))
+        await bus.flush()
+        return before_flush, batches
+
+    before_flush, batches = asyncio.run(run())
+    assert before_flush == []
+    assert [[type(event).__name__ for event in batch] for batch in batches] == [
+        ["StatementFound", "LevelSolved"], ["StatementFound"]]
+
+
+def test_stats_and_logging(caplog):
+    stats = SessionStats()
+    events = [StatementFound("One"), StatementFound("Two"), LevelSolved(0, "The Mansion")]
+    stats(events)
+    assert stats.counts == {"StatementFound": 2, "LevelSolved": 1}
+
+    with caplog.at_level(logging.INFO, logger="mystery.events"):
+        EventLogger(session="Tester")(events)
+    assert len(caplog.records) == 3 and "Tester" in caplog.records[0].getMessage()
+
+
+def test_the_game_keeps_its_state_from_events(play):
+    game, _ = play(["Tester", "1", "groundskeeper", "4", "legacy"])
+    assert game._current_level == 1
+    assert len(game.witness_statements) == 1 and "Broken Key Part 1" in game.inventory
+    assert game.stats.counts["LevelSolved"] == 1
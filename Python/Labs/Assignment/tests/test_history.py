@@ -0,0 +1,64 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for the rewind history: checkpoints after commands, undo, redo and jumping to a checkpoint
+#
+# Usage: python -m pytest tests/test_history.py
+
+from OOP_Assignment import Game, ScriptedIO
+from history import History
+from save_storage import JsonSaveBackend
+
+
+def new_game(tmp_path, limit=1000):
+    game = Game(io=ScriptedIO([]), save_backend=JsonSaveBackend(tmp_path / "save_game.json"), seed=1)
+    game.history = History(game, limit)
+    return game
+
+
+def test_unchanged_game_is_not_recorded_twice(tmp_path):
+    game = new_game(tmp_path)
+    assert game.history.record("start").number == 1
+    assert game.history.record("inventory") is None
+    game.inventory.add("A lamp")
+    assert game.history.record("search").number == 2
+    assert len(game.history) == 2
+
+
+def test_undo_and_redo_restore_the_game(tmp_path):
+    game = new_game(tmp_path)
+    game.history.record("start")
+    game.inventory.add("A lamp")
+    game.history.record("search")
+
+    assert game.history.undo().number == 1 and "A lamp" not in game.inventory
+    assert game.history.undo() is None
+    assert game.history.redo().label == "search" and "A lamp" in game.inventory
+    assert game.history.redo() is None
+
+
+def test_a_new_command_drops_what_could_be_redone(tmp_path):
+    game = new_game(tmp_path)
+    game.history.record("start")
+    game.inventory.add("A lamp")
+    game.history.record("search")
+    game.history.undo()
+    game.witness_statements.add("A statement")
+    assert game.history.record("talk").number == 2
+    assert [checkpoint.label for checkpoint in game.history] == ["start", "talk"]
+
+
+def test_only_the_last_checkpoints_are_kept(tmp_path):
+    game = new_game(tmp_path, limit=3)
+    for number in range(5):
+        game.inventory.add(f"Item {number}")
+        game.history.record("search")
+    assert [checkpoint.number for checkpoint in game.history] == [3, 4, 5]
+    assert game.history.jump(2) is None
+    assert game.history.jump(3).number == 3 and game.inventory.to_list() == ["Item 0", "Item 1", "Item 2"]
+
+    game = new_game(tmp_path, limit=0)
+    assert game.history.record("start") is None and len(game.history) == 0
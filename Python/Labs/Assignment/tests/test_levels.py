@@ -0,0 +1,47 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for the level registry: levels are played in order and only built when the player reaches them
+#
+# Usage: python -m pytest tests/test_levels.py
+
+import pytest
+
+from OOP_Assignment import Game, ScriptedIO, LevelRegistry, level_registry, MansionLevel, FinalLevel
+from save_storage import JsonSaveBackend
+from benchmark_playthrough import PLAYTHROUGH_SCRIPT
+
+
+def test_levels_are_built_when_reached(tmp_path):
+    game = Game(io=ScriptedIO([]), save_backend=JsonSaveBackend(tmp_path / "save_game.json"))
+    assert len(game.levels) == len(level_registry) == 7
+    assert game.levels.created() == 0
+    assert isinstance(game.levels[0], MansionLevel) and isinstance(game.levels[-1], FinalLevel)
+    assert game.levels.created() == 2
+    assert game.levels[0] is game.levels[0]  # Built once
+    with pytest.raises(IndexError):
+        game.levels[7]
+
+
+def test_levels_can_be_registered_in_place():
+    registry = LevelRegistry()
+    registry.register(MansionLevel)
+    registry.register(FinalLevel)
+
+    @registry.register(index=-1)
+    class ExtraLevel(MansionLevel):
+        pass
+
+    assert registry.factories == (MansionLevel, ExtraLevel, FinalLevel)
+    levels = registry.levels_for(None)
+    registry.register(MansionLevel)
+    assert len(levels) == 3  # A running game keeps the levels it started with
+
+
+def test_loading_a_save_only_builds_the_current_level(play):
+    play(PLAYTHROUGH_SCRIPT[:8])
+    game, _ = play(["yes"])
+    assert game._current_level == 1 and game.levels.created() == 1
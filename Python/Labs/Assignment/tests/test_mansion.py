@@ -0,0 +1,46 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for procedurally generated mansions
+#
+# Usage: python -m pytest tests/test_mansion.py
+
+import pytest
+
+from OOP_Assignment import Game, ScriptedIO, GeneratedMansion, ContentLevel, FinalLevel
+from content_pack import validate_level
+from mansion_generator import MansionGenerator
+from save_storage import JsonSaveBackend
+
+
+def test_the_same_seed_gives_the_same_rooms():
+    mansion = MansionGenerator(10000, seed=4)
+    assert mansion.room(9000) == MansionGenerator(10000, seed=4).room(9000)  # Without making the rooms before it
+    assert mansion.room(9000) != MansionGenerator(10000, seed=5).room(9000)
+    with pytest.raises(IndexError):
+        mansion.room(9999)  # The last level is the final level
+
+
+def test_generated_rooms_are_valid_content():
+    for room in MansionGenerator(50, seed=1).stream():
+        validate_level(room, room["id"])
+
+
+def test_a_game_only_keeps_the_last_few_rooms(tmp_path):
+    game = Game(io=ScriptedIO([]), save_backend=JsonSaveBackend(tmp_path / "save_game.json"),
+                registry=GeneratedMansion(1000, seed=2), seed=2)
+    assert len(game.levels) == 1000
+    for index in range(20):
+        assert isinstance(game.levels[index], ContentLevel)
+    assert isinstance(game.levels[-1], FinalLevel)
+    assert game.levels.created() == 21 and len(game.levels._levels) == GeneratedMansion.keep
+
+
+def test_generated_rooms_have_generated_puzzles(tmp_path):
+    game = Game(io=ScriptedIO([]), save_backend=JsonSaveBackend(tmp_path / "save_game.json"),
+                registry=GeneratedMansion(10, seed=3), seed=3)
+    for index in range(9):
+        assert game.levels[index].generated_puzzle is not None
@@ -0,0 +1,111 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for the game's timing metrics
+#
+# Usage: python -m pytest tests/test_metrics.py
+
+import json
+import asyncio
+
+from OOP_Assignment import Game, ScriptedIO
+from metrics import Metrics, Histogram, NO_METRICS
+from save_storage import JsonSaveBackend
+
+
+def test_histogram_counts_and_percentiles():
+    histogram = Histogram((1.0, 2.0, 5.0, float("inf")))
+    for seconds in (0.5, 0.5, 1.5, 4.0, 9.0):
+        histogram.add(seconds)
+
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.count == 5
+    assert histogram.total == 15.5
+    assert histogram.largest == 9.0
+    assert histogram.quantile(0.4) == 1.0
+    assert histogram.quantile(1.0) == 9.0
+    assert Histogram((1.0,)).quantile(0.5) == 0.0
+
+
+def test_player_thinking_is_kept_apart():
+    metrics = Metrics()
+    metrics.record("command", 0.0, think=1.0, command="Solve")
+
+    think = metrics.histogram("command_think", command="Solve")
+    assert think.count == 1
+    assert think.total == 1.0
+    assert metrics.histogram("command", command="Solve").count == 1
+
+
+def test_instrument_times_methods():
+    class Room:
+        def look(self):
+            return "a room"
+
+        async def search(self):
+            return "a clue"
+
+    metrics = Metrics()
+    room = Room()
+    metrics.instrument(room, ["look", "search"], "level", level="Room")
+
+    assert room.look() == "a room"
+    assert asyncio.run(room.search()) == "a clue"
+    assert metrics.histogram("level", level="Room", method="look").count == 1
+    assert metrics.histogram("level", level="Room", method="search").count == 1
+
+    room = Room()
+    NO_METRICS.instrument(room, ["look"], "level")
+    assert "look" not in vars(room)  # Nothing is wrapped when metrics are turned off
+
+
+def test_prometheus_and_json_export(tmp_path):
+    metrics = Metrics()
+    metrics.observe("storage", 0.002, operation="save")
+    metrics.observe("storage", 0.5, operation='a "quoted"\nname')
+    metrics.histogram("level", method="never_called")
+    metrics.export(tmp_path / "metrics")
+
+    prometheus = (tmp_path / "metrics.prom").read_text()
+    assert "# TYPE mystery_storage_seconds histogram" in prometheus
+    assert 'mystery_storage_seconds_bucket{operation="save",le="0.0025"} 1' in prometheus
+    assert 'mystery_storage_seconds_bucket{operation="save",le="+Inf"} 1' in prometheus
+    assert 'operation="a \\"quoted\\"\\nname"' in prometheus
+    assert 'mystery_storage_seconds_count{operation="save"} 1' in prometheus
+    assert "never_called" not in prometheus
+
+    summary = json.loads((tmp_path / "metrics.json").read_text())
+    assert [(series["metric"], series["count"]) for series in summary["series"]] == [("storage", 1), ("storage", 1)]
+
+
+def test_game_is_timed(tmp_path):
+    metrics = Metrics()
+    game = Game(io=ScriptedIO(["Tester", "3", "4", "legacy", "3"]), metrics=metrics, seed=1,
+                save_backend=JsonSaveBackend(tmp_path / "save_game.json"))
+    try:
+        asyncio.run(game.start())
+    except EOFError:
+        pass
+    game.autosaver.flush()
+
+    names = {name for name, _ in metrics._histograms}
+    assert {"command", "menu", "level", "level_transition", "storage"} <= names
+    assert metrics.histogram("storage", operation="save").count >= 1
+
+
+def test_levels_are_labelled_by_kind(tmp_path):
+    metrics = Metrics()
+    game = Game(io=ScriptedIO(["Tester", "3", "4", "legacy", "3"]), metrics=metrics, seed=1,
+                save_backend=JsonSaveBackend(tmp_path / "save_game.json"))
+    try:
+        asyncio.run(game.start())
+    except EOFError:
+        pass
+    game.autosaver.flush()
+
+    levels = {dict(labels)["level"] for _, labels in metrics._histograms if "level" in dict(labels)}
+    assert levels == {type(game.levels[0]).__name__, type(game.levels[1]).__name__}
+    assert not levels & {game.levels[0].name, game.levels[1].name}
@@ -0,0 +1,36 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for the NPC name generator
+#
+# Usage: python -m pytest tests/test_names.py
+
+import pytest
+
+from OOP_Assignment import NameGenerator, NamePoolExhausted
+
+
+def test_the_same_seed_gives_the_same_names():
+    assert [NameGenerator(3).generate() for _ in range(5)] == [NameGenerator(3).generate() for _ in range(5)]
+    assert NameGenerator(3).generate_batch(20) == NameGenerator(3).generate_batch(20)
+    assert NameGenerator(3).generate_batch(20) != NameGenerator(4).generate_batch(20)
+
+
+def test_batch_names_are_unique():
+    names = NameGenerator(1).generate_batch(len(NameGenerator.POOL))
+    assert len(set(names)) == len(NameGenerator.POOL)
+    large = NameGenerator(1, pool=NameGenerator.LARGE_POOL).generate_batch(1000)
+    assert len(set(large)) == 1000
+
+
+def test_a_batch_bigger_than_the_pool_is_refused():
+    with pytest.raises(NamePoolExhausted):
+        NameGenerator(1, pool=["Dr. Smith", "Mr. Jones"]).generate_batch(3)
+
+
+def test_the_game_seed_gives_the_same_npcs(play):
+    answers = ["Tester", "1"]
+    assert play(answers, seed=5)[1] == play(answers, seed=5)[1]
@@ -0,0 +1,82 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for pacing the story: pauses can be sped up, skipped until the next prompt, or turned off
+#
+# Usage: python -m pytest tests/test_pacing.py
+
+import time
+import asyncio
+
+from OOP_Assignment import Pacer
+from mystery_server import StreamIO
+
+
+class FakeWriter:
+    """
+    Collects what the server sends to a player
+    """
+
+    def __init__(self):
+        self.sent = bytearray()
+
+    def write(self, data):
+        self.sent += data
+
+    async def drain(self):
+        pass
+
+
+def stream_io(data, pace=1.0):
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return StreamIO(reader, FakeWriter(), Pacer(speed=pace))
+
+
+def test_pacer_delays():
+    pacer = Pacer(speed=2)
+    assert pacer.delay(3) == 1.5
+    pacer.fast_forward()
+    assert pacer.delay(3) == 0.75
+    pacer.skip()
+    assert pacer.delay(3) == 0
+    pacer.prompt_shown()
+    assert pacer.delay(3) == 0.75
+    assert Pacer(enabled=False).delay(3) == 0 and Pacer(speed=0).delay(3) == 0
+
+
+def test_an_empty_line_skips_the_story():
+    async def run():
+        io = stream_io(b"\nyes\n")
+        start = time.perf_counter()
+        await io.pause(30)
+        await io.pause(30)  # Still skipping until the next prompt
+        elapsed = time.perf_counter() - start
+        answer = await io.read("Load? ")
+        return elapsed, answer, io
+
+    elapsed, answer, io = asyncio.run(run())
+    assert elapsed < 1 and answer == "yes"
+    assert not io.pacer.skipping  # The prompt ends the skip
+
+
+def test_an_answer_typed_during_the_story_is_kept():
+    async def run():
+        io = stream_io(b"3\n")
+        await io.pause(30)
+        return await io.read("Enter your choice: ")
+
+    assert asyncio.run(run()) == "3"
+
+
+def test_fast_speeds_up_the_rest_of_the_session():
+    async def run():
+        io = stream_io(b"fast\n")
+        await io.pause(0.2)
+        return io.pacer.speed
+
+    assert asyncio.run(run()) == 2
@@ -0,0 +1,55 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for playing the whole game without a terminal, the way benchmark_playthrough.py does
+#
+# Usage: python -m pytest tests/test_playthrough.py
+
+import asyncio
+
+import pytest
+
+from OOP_Assignment import Game, ScriptedIO
+from save_storage import JsonSaveBackend
+from benchmark_playthrough import PLAYTHROUGH_SCRIPT, run_playthrough, run_all
+
+
+def test_scripted_playthrough_reaches_the_end(tmp_path):
+    results = [asyncio.run(run_playthrough(seed, tmp_path / f"save_{seed}.json")) for seed in range(5)]
+    assert any(completed for completed, _, _ in results)  # The Cellar fight can be lost, but not every time
+    for _, latencies, _ in results:
+        assert latencies and all(latency >= 0 for latency in latencies)
+
+
+def test_the_same_seed_plays_the_same_playthrough(tmp_path):
+    first = asyncio.run(run_playthrough(3, tmp_path / "first.json"))
+    second = asyncio.run(run_playthrough(3, tmp_path / "second.json"))
+    assert first[2] == second[2]  # The same output, whatever else ran in this process before
+
+
+def test_many_playthroughs_in_one_process():
+    outcomes, latencies, _ = asyncio.run(run_all(range(5)))
+    assert [number for number, _, _ in outcomes] == list(range(5))
+    assert len({checksum for _, _, checksum in outcomes}) == 5  # Every playthrough has its own seed
+    assert latencies
+
+
+def test_output_goes_to_the_io_channel(play, capsys):
+    game, output = play(["Tester", "3"])
+    assert "Welcome to the mystery adventure game" in output
+    assert "You search the mansion foyer for clues." in output
+    assert capsys.readouterr().out == ""  # Nothing was printed to the terminal
+
+
+def test_the_game_is_saved_after_a_level(play, tmp_path):
+    game, _ = play(PLAYTHROUGH_SCRIPT[:8])
+    assert game._current_level == 1
+    assert (tmp_path / "save_game.json").exists()
+
+
+def test_running_out_of_answers_ends_the_game(tmp_path):
+    with pytest.raises(EOFError):
+        asyncio.run(Game(io=ScriptedIO([]), save_backend=JsonSaveBackend(tmp_path / "save_game.json")).start())
@@ -0,0 +1,130 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for puzzle checking, the puzzle attempt limit and the puzzle generators
+#
+# Usage: python -m pytest tests/test_puzzles.py
+
+import json
+import random
+
+import pytest
+
+from puzzles import (Puzzle, AttemptLimiter, GeneratedPuzzle, ModularInversePuzzles, RecipeRatioPuzzles, RiddlePuzzles,
+                     PUZZLE_GENERATORS, FUZZY_MIN_LENGTH, canonical_number, normalize_answer)
+from benchmark_playthrough import STUDY_ANSWER, KITCHEN_ANSWER, solve_from_text
+from benchmark_puzzles import sample_puzzle
+
+
+@pytest.mark.parametrize("name", sorted(PUZZLE_GENERATORS))
+def test_every_generator_accepts_its_answer(name):
+    generator = PUZZLE_GENERATORS[name](random.Random(3))
+    for _ in range(50):
+        puzzle, answer, wrong = sample_puzzle(generator)
+        assert puzzle.check(answer)
+        assert not puzzle.check(wrong)
+
+
+def test_answers_are_normalized_before_hashing():
+    assert normalize_answer("  Ｕrsa   MAJOR. ") == "ursa major"
+    puzzle = Puzzle("test", ["Ursa Major"])
+    assert puzzle.check("  ursa   MAJOR. ")
+    assert not puzzle.check("ursa minor")
+    number = Puzzle("test", [500], match="number")
+    assert canonical_number("0500.0 g") == "500" and canonical_number("many") is None
+    assert number.check("500g") and number.check("0500.0") and not number.check("501") and not number.check("five")
+
+
+def test_fuzzy_answers_allow_one_typo():
+    puzzle = Puzzle("test", ["nightshade"], fuzzy=True)
+    assert puzzle.check("nightshad") and puzzle.check("nigthshade") and puzzle.check("nightshadex")
+    assert not puzzle.check("nightmare")
+    assert not Puzzle("test", ["nightshade"]).check("nightshad")
+
+
+def test_stored_hashes_check_the_same_answers():
+    content = {"answer": "nightshade", "fuzzy": True}
+    stored = {"answer_hashes": Puzzle.hash_content("garden", content), "fuzzy": True}
+    puzzle = Puzzle.from_content("garden", stored)
+    assert puzzle.check("Nightshade") and puzzle.check("nightshad")
+    assert not puzzle.check("hemlock")
+    assert "nightshade" not in json.dumps(stored)
+    # Every puzzle gets its own salt, so the same answer hashes differently
+    assert Puzzle.hash_content("garden", content)["hashes"] != stored["answer_hashes"]["hashes"]
+
+
+def test_any_of_several_answers_is_accepted():
+    puzzle = Puzzle("test", ["legacy", "a legacy"])
+    assert puzzle.check("Legacy") and puzzle.check("A legacy") and not puzzle.check("heritage")
+
+
+def test_a_puzzle_needs_an_answer():
+    with pytest.raises(ValueError):
+        Puzzle("test", ["many"], match="number")
+    with pytest.raises(ValueError):
+        Puzzle("test", ["legacy"], match="regex")
+
+
+def test_attempts_are_limited():
+    now = [0.0]
+    limiter = AttemptLimiter(burst=2, interval=5, clock=lambda: now[0])
+    assert limiter.allow("study") and limiter.allow("study")
+    assert not limiter.allow("study") and limiter.wait_time("study") == 5
+    assert limiter.allow("kitchen")  # Each puzzle has its own limit
+    now[0] = 5
+    assert limiter.allow("study")
+
+
+def test_generated_puzzles_check_their_answers():
+    for generated in ModularInversePuzzles(random.Random(1)).stream(50):
+        answer = int(solve_from_text(STUDY_ANSWER, "\n".join(generated.lines)))
+        assert generated.puzzle.check(str(answer)) and not generated.puzzle.check(str(answer + 1))
+
+    for generated in RecipeRatioPuzzles(random.Random(1)).stream(50):
+        answer = int(solve_from_text(KITCHEN_ANSWER, generated.clue))
+        assert generated.puzzle.check(f"{answer} grams") and not generated.puzzle.check(str(answer + 1))
+
+
+def test_riddles_take_words_with_a_typo():
+    answers = {f"'{riddle}'": answer for riddle, answer, _ in RiddlePuzzles.RIDDLES}
+    for generated in RiddlePuzzles(random.Random(1)).stream(20):
+        answer = answers[generated.lines[1]]
+        assert generated.puzzle.check(answer.upper()) and not generated.puzzle.check("banana")
+        if len(answer) >= 5:
+            assert generated.puzzle.check(answer[:-1])
+
+
+def test_the_same_seed_gives_the_same_puzzles():
+    first = [generated.clue for generated in ModularInversePuzzles(random.Random(3)).stream(10)]
+    assert first == [generated.clue for generated in ModularInversePuzzles(random.Random(3)).stream(10)]
+
+
+def test_a_record_keeps_only_hashes():
+    generated = RecipeRatioPuzzles(random.Random(2)).generate()
+    record = generated.to_record()
+    assert "answer" not in record
+    restored = GeneratedPuzzle.from_record(record)
+    assert restored.puzzle.check(solve_from_text(KITCHEN_ANSWER, generated.clue)) and restored.clue == generated.clue
+
+
+def test_a_fuzzy_puzzle_survives_a_record_round_trip():
+    answers = {f"'{riddle}'": answer for riddle, answer, _ in RiddlePuzzles.RIDDLES}
+    for generated in RiddlePuzzles(random.Random(1)).stream(20):
+        answer = answers[generated.lines[1]]
+        record = json.loads(json.dumps(generated.to_record()))
+        assert "salt" in record and f'"{answer}"' not in json.dumps(record)
+
+        restored = GeneratedPuzzle.from_record(record).puzzle
+        assert restored.check(answer.upper()) and not restored.check("banana")
+        if len(answer) >= FUZZY_MIN_LENGTH:  # Shorter answers have no typo hashes to store
+            assert record["typo_hashes"] and restored.fuzzy
+            assert restored.check(answer[:-1]) and restored.check(answer[1] + answer[0] + answer[2:])
+
+
+def test_the_mansion_puzzle_takes_its_answer(play):
+    game, _ = play(["Tester", "4", "LEGACY"])
+    assert game._current_level == 1
+    assert game.levels[1].generated_puzzle is not None  # The Study gets a fresh puzzle
@@ -0,0 +1,86 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for recording sessions and replaying them with output checks
+#
+# Usage: python -m pytest tests/test_recording.py
+
+import gzip
+import asyncio
+
+import pytest
+
+from OOP_Assignment import Game, ScriptedIO
+from benchmark_playthrough import PLAYTHROUGH_SCRIPT
+from recording import SessionRecorder, Recording, ReplayMismatch, replay
+from save_storage import JsonSaveBackend, SQLiteSaveBackend
+
+
+def record(tmp_path, answers, name="session", seed=7, save_backend=None):
+    """
+    Play and record a game until the answers run out, returns the recording
+    """
+
+    path = tmp_path / f"{name}.jsonl.gz"
+    save_backend = save_backend if save_backend is not None else JsonSaveBackend(tmp_path / "save_game.json")
+    recorder = SessionRecorder(path, ScriptedIO(answers), save_backend)
+    game = Game(io=recorder.io, save_backend=recorder.save_backend, seed=seed)
+    with pytest.raises(EOFError):
+        asyncio.run(recorder.play(game))
+    game.autosaver.flush()
+    return Recording.load(path)
+
+
+def test_a_playthrough_replays_the_same(tmp_path):
+    recording = record(tmp_path, PLAYTHROUGH_SCRIPT)
+    assert recording.answers == len(PLAYTHROUGH_SCRIPT) and recording.header["seed"] == 7
+    assert recording.end[3] == "EOFError"
+
+    io = asyncio.run(replay(recording))
+    assert io.count == recording.answers
+
+
+def test_a_loaded_save_is_replayed_from_the_recording(tmp_path):
+    record(tmp_path, PLAYTHROUGH_SCRIPT[:8], "first")
+    recording = record(tmp_path, ["yes", "7"], "second")
+    (tmp_path / "save_game.json").unlink()  # The replay does not need the save file
+    assert asyncio.run(replay(recording)).count == 2
+
+
+def test_a_shared_backend_replays_asking_for_the_name(tmp_path):
+    backend = SQLiteSaveBackend(tmp_path / "saves.db")
+    record(tmp_path, PLAYTHROUGH_SCRIPT[:8], "first", save_backend=backend)
+    recording = record(tmp_path, ["yes", "Benchmark", "7"], "second", save_backend=backend)
+    backend.close()
+    assert recording.header["single_save"] is False
+    assert asyncio.run(replay(recording)).count == 3
+
+
+def test_a_different_game_is_found(tmp_path):
+    recording = record(tmp_path, PLAYTHROUGH_SCRIPT[:8])
+    reads = [event for event in recording.events if event[0] == "read"]
+    reads[1][2] = "7"  # Look at the inventory instead of searching
+
+    with pytest.raises(ReplayMismatch, match="before answer 3"):
+        asyncio.run(replay(recording))
+    assert asyncio.run(replay(recording, verify=False)).count == 8
+
+
+def test_a_cut_off_recording_is_read_as_far_as_it_goes(tmp_path):
+    recording = record(tmp_path, PLAYTHROUGH_SCRIPT[:8])
+    data = gzip.decompress(recording.path.read_bytes())
+    recording.path.write_bytes(gzip.compress(data[:-10]))
+
+    cut = Recording.load(recording.path)
+    assert cut.end is None and cut.answers == 8
+    assert asyncio.run(replay(cut)).count == 8
+
+
+def test_other_files_are_not_recordings(tmp_path):
+    path = tmp_path / "notes.jsonl.gz"
+    path.write_bytes(gzip.compress(b'{"format": "something else"}\n'))
+    with pytest.raises(ValueError, match="not a version 1 recording"):
+        Recording.load(path)
@@ -0,0 +1,66 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for collecting the game's output into one write per screen
+#
+# Usage: python -m pytest tests/test_render.py
+
+import asyncio
+
+from OOP_Assignment import Renderer
+from mystery_server import StreamIO
+
+
+def test_a_screen_is_sent_with_its_prompt():
+    sent = []
+    renderer = Renderer(sent.append)
+    renderer.write("Line 1")
+    renderer.write("Line 2")
+    assert sent == []
+    renderer.flush("Choice: ")
+    renderer.flush()  # Nothing left to send
+    assert sent == ["Line 1\nLine 2\nChoice: "] and renderer.writes == 1
+
+
+def test_a_big_screen_is_sent_in_parts():
+    sent = []
+    renderer = Renderer(sent.append, high_water=10)
+    renderer.write("12345")
+    renderer.write("67890")
+    assert sent == ["12345\n67890\n"]
+
+
+def test_line_policy_sends_every_line():
+    sent = []
+    renderer = Renderer(sent.append, flush_policy="line")
+    renderer.write("Line 1\nLine 2")
+    assert sent == ["Line 1\n", "Line 2\n"] and renderer.writes == 2
+
+
+def test_a_player_gets_one_write_per_screen():
+    class CountingWriter:
+        def __init__(self):
+            self.writes = []
+
+        def write(self, data):
+            self.writes.append(data)
+
+        async def drain(self):
+            pass
+
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"yes\n")
+        writer = CountingWriter()
+        io = StreamIO(reader, writer)
+        io.write("Welcome!")
+        io.write("A dark and stormy night.")
+        answer = await io.read("Ready? ")
+        return answer, writer.writes
+
+    answer, writes = asyncio.run(run())
+    assert answer == "yes"
+    assert writes == [b"Welcome!\nA dark and stormy night.\nReady? "]
@@ -0,0 +1,342 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for saving the game: every save backend gives back what was saved, the save journal does so even after
+# a crash part way through a write, binary saves only decode what is used and a damaged save raises CorruptSaveError
+#
+# Usage: python -m pytest tests/test_save_storage.py
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from OOP_Assignment import Game, ScriptedIO, static_text
+from benchmark_playthrough import PLAYTHROUGH_SCRIPT
+from save_storage import (SaveJournal, JsonSaveBackend, SQLiteSaveBackend, BinarySaveBackend, LazySaveState,
+                          CorruptSaveError, check_header, check_state, has_type, state_delta,
+                          apply_delta)
+
+
+STATE = {"player_name": "Tester", "current_level": 2,
+         "witness_statements": ["Witness 1's statement", "Something new"], "suspect_motives": ["A motive"],
+         "inventory": ["Key part 1"]}
+STRINGS = ["Witness 1's statement", "A motive", "Key part 1"]  # Text stored as ids in a binary save
+
+
+@pytest.fixture(params=["json", "sqlite", "binary", "compressed"])
+def backend(request, tmp_path):
+    if request.param == "json":
+        backend = JsonSaveBackend(tmp_path / "save_game.json")
+    elif request.param == "sqlite":
+        backend = SQLiteSaveBackend(tmp_path / "saves.db")
+    else:
+        backend = BinarySaveBackend(tmp_path / "saves", STRINGS, compress=request.param == "compressed")
+    yield backend
+    backend.close()
+
+
+def test_round_trip(backend):
+    backend.save(STATE)
+    assert dict(backend.load("Tester")) == STATE
+    assert backend.load("Nobody") is None
+    assert backend.players() == ["Tester"]
+    assert backend.players_on_level(2) == ["Tester"] and backend.players_on_level(0) == []
+
+
+def test_later_saves_replace_earlier_ones(backend):
+    backend.save(STATE)
+    backend.save(dict(STATE, current_level=3, inventory=["Key part 1", "Key part 2"]))
+    state = backend.load("Tester")
+    assert state["current_level"] == 3 and state["inventory"] == ["Key part 1", "Key part 2"]
+
+
+def test_sqlite_keeps_a_save_per_player(tmp_path):
+    backend = SQLiteSaveBackend(tmp_path / "saves.db")
+    backend.save_many([dict(STATE, player_name=f"Player {number}", current_level=number % 3) for number in range(10)])
+    assert backend.load("Player 4")["current_level"] == 1
+    assert backend.players(limit=2) == ["Player 0", "Player 1"]
+    assert backend.players_on_level(0) == ["Player 0", "Player 3", "Player 6", "Player 9"]
+    backend.close()
+
+
+def test_binary_save_only_decodes_what_is_used(tmp_path):
+    backend = BinarySaveBackend(tmp_path, STRINGS)
+    backend.save(STATE)
+    state = backend.load("Tester")
+    assert isinstance(state, LazySaveState)
+    assert (state["player_name"], state["current_level"]) == ("Tester", 2)
+    assert not state._decoded  # Only the header has been read
+    assert state["inventory"] == ["Key part 1"] and state._decoded
+
+
+def test_binary_save_keeps_any_text_and_fields(tmp_path):
+    backend = BinarySaveBackend(tmp_path, static_text())
+    state = dict(STATE, player_name="Détective Zoë/1", witness_statements=static_text()[:2] + ["A note of my own"],
+                 settings={"hints": True})
+    backend.save(state)
+    assert dict(backend.load("Détective Zoë/1")) == state
+    assert backend.players() == ["Détective Zoë/1"]
+
+
+def test_binary_save_needs_the_same_game_text(tmp_path):
+    BinarySaveBackend(tmp_path, STRINGS).save(STATE)
+    with pytest.raises(ValueError, match="different game text"):
+        BinarySaveBackend(tmp_path, STRINGS + ["More text"]).load("Tester")
+
+
+def test_journal_round_trip(tmp_path):
+    journal = SaveJournal(tmp_path / "save_game.json")
+    assert not journal.exists() and journal.load() is None
+    journal.save(STATE)
+    journal.save(dict(STATE, current_level=3, inventory=["Key part 1", "Key part 2"]))
+    state = SaveJournal(tmp_path / "save_game.json").load()
+    assert state == dict(STATE, current_level=3, inventory=["Key part 1", "Key part 2"])
+
+
+def test_only_changes_are_journalled():
+    new_state = dict(STATE, current_level=3, inventory=["Key part 1", "Key part 2"])
+    delta = state_delta(STATE, new_state)
+    assert delta == {"set": {"current_level": 3}, "extend": {"inventory": ["Key part 2"]}}
+    state = dict(STATE)
+    apply_delta(state, delta)
+    assert state == new_state
+
+
+def test_torn_journal_entry_is_cut_off(tmp_path):
+    journal = SaveJournal(tmp_path / "save_game.json")
+    journal.save(STATE)
+    journal.save(dict(STATE, current_level=3))
+    with open(journal.journal_path, "ab") as file:
+        file.write(b'{"set": {"current_level": 4}, "se')  # A crash part way through a write
+
+    state = SaveJournal(tmp_path / "save_game.json").load()
+    assert state["current_level"] == 3
+    assert journal.journal_path.read_bytes().endswith(b"\n")
+
+
+def test_compaction_keeps_the_state(tmp_path):
+    journal = SaveJournal(tmp_path / "save_game.json", compact_every=3)
+    for level in range(10):
+        journal.save(dict(STATE, current_level=level))
+    assert SaveJournal(tmp_path / "save_game.json").load()["current_level"] == 9
+    assert len(journal.journal_path.read_bytes().splitlines()) < 3
+
+
+def test_entries_in_the_snapshot_are_not_applied_twice(tmp_path):
+    journal = SaveJournal(tmp_path / "save_game.json")
+    journal.save(STATE)
+    journal.save(dict(STATE, inventory=["Key part 1", "Key part 2"]))
+    entries = journal.journal_path.read_bytes()
+    journal.compact()
+    journal.journal_path.write_bytes(entries)  # A crash after the snapshot was written but before the journal emptied
+    assert SaveJournal(tmp_path / "save_game.json").load()["inventory"] == ["Key part 1", "Key part 2"]
+
+
+def test_game_is_loaded_from_its_save(play):
+    play(PLAYTHROUGH_SCRIPT[:8])
+    game, output = play(["yes"])
+    assert "Game loaded successfully! Welcome back Benchmark!" in output
+    assert game._current_level == 1
+
+
+def test_game_asks_which_player_is_loading(tmp_path):
+    backend = SQLiteSaveBackend(tmp_path / "saves.db")
+    backend.save_many([dict(STATE, player_name="Alice", current_level=1), dict(STATE, player_name="Bob")])
+    io = ScriptedIO(["yes", "Bob"])
+    game = Game(io=io, save_backend=backend)
+    with pytest.raises(EOFError):
+        asyncio.run(game.start())
+    assert "Game loaded successfully! Welcome back Bob!" in io.output
+    assert game._current_level == 2
+    backend.close()
+
+
+@pytest.mark.parametrize("kind", ["sqlite", "binary"])
+def test_a_shared_backend_never_loads_someone_elses_save(tmp_path, kind):
+    if kind == "sqlite":
+        backend = SQLiteSaveBackend(tmp_path / "saves.db")
+    else:
+        backend = BinarySaveBackend(tmp_path / "saves", STRINGS)
+    backend.save(dict(STATE, player_name="Alice"))  # The only save, but it is not Bob's
+
+    io = ScriptedIO(["yes", "Bob"])
+    game = Game(io=io, save_backend=backend)
+    with pytest.raises(EOFError):
+        asyncio.run(game.start())
+    assert "Please enter the name you saved with: " in io.output
+    assert "No save file found." in io.output
+    assert game._current_level == 0 and not game.inventory
+
+    io = ScriptedIO(["yes", "Alice"])
+    game = Game(io=io, save_backend=backend)
+    with pytest.raises(EOFError):
+        asyncio.run(game.start())
+    assert "Game loaded successfully! Welcome back Alice!" in io.output
+    backend.close()
+
+
+def damage(path, position):
+    """
+    Flip every bit of one byte of a save file
+    """
+
+    data = bytearray(path.read_bytes())
+    data[position] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+
+def test_damaged_json_snapshot(tmp_path):
+    backend = JsonSaveBackend(tmp_path / "save_game.json")
+    backend.save(STATE)
+    backend.journal.compact()
+    (tmp_path / "save_game.json").write_text('{"player_name": "Tes')
+    with pytest.raises(CorruptSaveError, match="not valid JSON"):
+        JsonSaveBackend(tmp_path / "save_game.json").load("Tester")
+
+
+def test_damaged_sqlite_row(tmp_path):
+    backend = SQLiteSaveBackend(tmp_path / "saves.db")
+    backend.save(STATE)
+    with sqlite3.connect(tmp_path / "saves.db") as connection:
+        connection.execute("UPDATE saves SET state = ? WHERE player_name = ?", ('{"player_name": "Tes', "Tester"))
+    with pytest.raises(CorruptSaveError, match="not valid JSON"):
+        backend.load("Tester")
+    with sqlite3.connect(tmp_path / "saves.db") as connection:
+        connection.execute("UPDATE saves SET state = ? WHERE player_name = ?", ("[1, 2]", "Tester"))
+    with pytest.raises(CorruptSaveError, match="not a game state"):
+        backend.load("Tester")
+    backend.close()
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_damaged_binary_header(tmp_path, compress):
+    backend = BinarySaveBackend(tmp_path, STRINGS, compress)
+    backend.save(STATE)
+    damage(backend.path_for("Tester"), 0)
+    with pytest.raises(CorruptSaveError, match="Not a binary save"):
+        backend.load("Tester")
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_damaged_binary_payload_is_found_when_read(tmp_path, compress):
+    backend = BinarySaveBackend(tmp_path, STRINGS, compress)
+    backend.save(STATE)
+    damage(backend.path_for("Tester"), -3)
+
+    state = backend.load("Tester")
+    assert check_header(state)["current_level"] == 2  # Only the header has been read so far
+    with pytest.raises(CorruptSaveError, match="checksum"):
+        state["inventory"]
+    assert [error is not None for _, error in backend.verify()] == [True]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_binary_save_cut_short_or_too_long(tmp_path, compress):
+    backend = BinarySaveBackend(tmp_path, STRINGS, compress)
+    backend.save(STATE)
+    path = backend.path_for("Tester")
+    data = path.read_bytes()
+
+    path.write_bytes(data[:-2])
+    with pytest.raises(CorruptSaveError):
+        dict(backend.load("Tester"))
+    path.write_bytes(data + b"more")
+    with pytest.raises(CorruptSaveError, match="after the end"):
+        dict(backend.load("Tester"))
+
+
+def test_binary_save_under_another_name(tmp_path):
+    backend = BinarySaveBackend(tmp_path, STRINGS)
+    backend.save(STATE)
+    backend.path_for("Tester").rename(backend.path_for("Somebody"))
+    with pytest.raises(CorruptSaveError, match="belongs to 'Tester'"):
+        backend.load("Somebody")
+    assert [error is not None for _, error in backend.verify()] == [True]
+
+
+def test_verify_passes_good_saves(tmp_path):
+    backend = BinarySaveBackend(tmp_path, STRINGS, compress=True)
+    for number in range(3):
+        backend.save(dict(STATE, player_name=f"Player {number}"))
+    assert [error for _, error in backend.verify()] == [None, None, None]
+
+
+def test_checking_the_header_does_not_decode_the_payload(tmp_path):
+    backend = BinarySaveBackend(tmp_path, STRINGS)
+    backend.save(STATE)
+    state = backend.load("Tester")
+    assert isinstance(state, LazySaveState)
+    check_header(state)
+    assert not state._decoded
+
+
+def test_invalid_fields_are_rejected():
+    assert check_state(dict(STATE)) == STATE
+    with pytest.raises(CorruptSaveError, match="player name"):
+        check_header(dict(STATE, player_name=None))
+    with pytest.raises(CorruptSaveError, match="current level"):
+        check_header(dict(STATE, current_level=True))
+    with pytest.raises(CorruptSaveError, match="inventory"):
+        check_state(dict(STATE, inventory=["Key part 1", 2]))
+    with pytest.raises(CorruptSaveError, match="level states"):
+        check_state(dict(STATE, levels={"first": []}))
+
+
+def test_types_of_level_state_values():
+    fighter = {"health": int, "charge": bool}
+    assert has_type(True, bool) and has_type({"health": 3, "charge": False}, fighter)
+    assert not has_type(1, bool) and not has_type(True, int)
+    assert not has_type("abc", fighter) and not has_type({"health": 3}, fighter)
+    assert not has_type({"health": 3, "charge": False, "user": "Detective"}, fighter)
+    assert not has_type({"health": "3", "charge": False}, fighter)
+
+
+FIGHTER = {"health": 35, "damage": 8, "charge": False, "user": "Detective"}
+
+
+@pytest.mark.parametrize("levels, message", [
+    ({"3": [False, "abc", FIGHTER]}, "invalid Detective for CellarLevel"),
+    ({"3": [False, FIGHTER, dict(FIGHTER, health="35")]}, "invalid Skeleton for CellarLevel"),
+    ({"3": [False, FIGHTER, dict(FIGHTER, charge=None)]}, "invalid Skeleton for CellarLevel"),
+    ({"0": ["yes"]}, "invalid searched for MansionLevel"),
+    ({"0": [True, False]}, "MansionLevel state with 2 values instead of 1"),
+    ({"6": [True]}, "FinalLevel state with 1 values instead of 3"),
+    ({"40": [True]}, "state for level 41, the game only has 7"),
+    ({"²": [True]}, "invalid level states"),
+])
+def test_game_rejects_damaged_level_states(tmp_path, levels, message):
+    backend = JsonSaveBackend(tmp_path / "save_game.json")
+    backend.save(dict(STATE, current_level=3, levels=levels))
+
+    io = ScriptedIO([])
+    game = Game(io=io, save_backend=backend, seed=1)
+    with pytest.raises(CorruptSaveError, match=message):
+        asyncio.run(game.load_game("Tester"))
+    assert "Your save is damaged" in "\n".join(io.output)
+    assert game._current_level == 0 and not game.inventory  # Nothing was loaded from the damaged save
+    assert game.levels.created() == 0  # The levels were checked without building them
+
+
+def test_game_reports_a_damaged_binary_payload(tmp_path):
+    backend = BinarySaveBackend(tmp_path, STRINGS)
+    backend.save(dict(STATE, current_level=0))
+    damage(backend.path_for("Tester"), -3)
+
+    io = ScriptedIO([])
+    game = Game(io=io, save_backend=backend, seed=1)
+    with pytest.raises(CorruptSaveError):
+        asyncio.run(game.load_game("Tester"))
+    assert "Your save is damaged" in "\n".join(io.output)
+    assert not game.inventory  # Nothing was loaded from the damaged save
+
+
+def test_game_rejects_a_level_past_the_end(tmp_path):
+    backend = JsonSaveBackend(tmp_path / "save_game.json")
+    backend.save(dict(STATE, current_level=40))
+    game = Game(io=ScriptedIO([]), save_backend=backend, seed=1)
+    with pytest.raises(CorruptSaveError, match="only has 7"):
+        asyncio.run(game.load_game("Tester"))
@@ -0,0 +1,60 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for the game's seed: the same seed gives the same game, games do not share random numbers and each of
+# a game's random number generators has its own stream
+#
+# Usage: python -m pytest tests/test_seeds.py
+
+import random
+
+from OOP_Assignment import Game, ScriptedIO, CellarLevel, session_seed
+
+
+def streams(game):
+    return ([game.rng.random() for _ in range(5)], [game.name_generator.rng.random() for _ in range(5)],
+            [game.puzzle_rng.random() for _ in range(5)])
+
+
+def test_each_generator_has_its_own_stream():
+    game_rng, names, puzzles = streams(Game(io=ScriptedIO([]), seed=7))
+    assert game_rng != names and game_rng != puzzles and names != puzzles
+
+
+def test_the_same_seed_gives_the_same_streams():
+    assert streams(Game(io=ScriptedIO([]), seed=7)) == streams(Game(io=ScriptedIO([]), seed=7))
+    assert streams(Game(io=ScriptedIO([]), seed=7)) != streams(Game(io=ScriptedIO([]), seed=8))
+
+
+def test_a_game_without_a_seed_picks_one():
+    first, second = Game(io=ScriptedIO([])), Game(io=ScriptedIO([]))
+    assert first.seed != second.seed
+    assert Game(io=ScriptedIO([]), seed=first.seed).rng.random() == first.rng.random()
+
+
+def test_levels_use_the_game_generator():
+    game = Game(io=ScriptedIO([]), seed=7)
+    cellar = next(level for level in game.levels if isinstance(level, CellarLevel))
+    assert cellar.rng is game.rng
+
+
+def test_the_same_seed_plays_the_same_game(play):
+    answers = ["Tester", "3", "1", "2"]
+    assert play(answers, seed=3)[1] == play(answers, seed=3)[1]
+
+
+def test_games_do_not_use_the_random_module():
+    state = random.getstate()
+    game = Game(io=ScriptedIO([]), seed=7)
+    game.rng.random()
+    game.name_generator.generate_batch(3)
+    assert random.getstate() == state
+
+
+def test_session_seeds_depend_on_the_index():
+    assert session_seed(1, 0) == session_seed(1, 0)
+    assert len({session_seed(1, 0), session_seed(1, 1), session_seed(2, 0)}) == 3
+    assert len({session_seed(1, "names"), session_seed(1, "puzzles"), session_seed(1, 0)}) == 3
@@ -0,0 +1,63 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for the network server: several players play at once, each in their own game
+#
+# Usage: python -m pytest tests/test_server.py
+
+import asyncio
+import sqlite3
+
+from mystery_server import MysteryServer
+from save_storage import SQLiteSaveBackend
+
+
+async def talk(port, lines):
+    """
+    Connect, send the lines one at a time and return everything the server sent until it hung up
+    """
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for line in lines:
+        writer.write(f"{line}\n".encode("utf-8"))
+    await writer.drain()
+    writer.write_eof()
+    received = await reader.read()
+    writer.close()
+    return received.decode("utf-8")
+
+
+async def play_together(server, scripts):
+    listener = await asyncio.start_server(server.handle_player, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    async with listener:
+        return await asyncio.gather(*(talk(port, lines) for lines in scripts))
+
+
+def test_players_have_their_own_games(tmp_path):
+    backend = SQLiteSaveBackend(tmp_path / "saves.db")
+    server = MysteryServer(backend)
+    alice, bob = asyncio.run(play_together(server, [["Alice", "3"], ["Bob", "7"]]))
+
+    assert "Welcome to the mystery adventure game" in alice and "Welcome to the mystery adventure game" in bob
+    assert "You search the mansion foyer for clues." in alice and "You search the mansion foyer" not in bob
+    assert server.finished_sessions == 2 and server.active_sessions == 0
+    backend.close()
+
+
+def test_a_damaged_save_is_reported_to_the_player(tmp_path, capsys):
+    backend = SQLiteSaveBackend(tmp_path / "saves.db")
+    backend.save({"player_name": "Alice", "current_level": 0, "witness_statements": [], "suspect_motives": [],
+                  "inventory": [], "levels": {"0": ["not a flag"]}})
+    server = MysteryServer(backend)
+    alice, = asyncio.run(play_together(server, [["yes", "Alice"]]))
+
+    assert "Your save is damaged and cannot be loaded" in alice
+    assert "The game has stopped so your save is not written over" in alice
+    assert server.finished_sessions == 1 and server.active_sessions == 0
+    assert "A damaged save stopped a session" in capsys.readouterr().err
+    assert backend.load("Alice")["levels"] == {"0": ["not a flag"]}  # Left for someone to look at
+    backend.close()
@@ -0,0 +1,86 @@
+# CMPU 2016 Object Oriented Programming
+# TU857-2
+# 2024/2025 Semester 1
+#
+# Group: Null Pointer
+#
+# Tests for game snapshots: taking and restoring them, and keeping the level state in saves
+#
+# Usage: python -m pytest tests/test_snapshots.py
+
+import asyncio
+
+import pytest
+
+from OOP_Assignment import Game, ScriptedIO, OrderedSet, CellarLevel, FinalLevel, static_text
+from save_storage import JsonSaveBackend, SQLiteSaveBackend, BinarySaveBackend
+
+
+def level_of(game, kind):
+    return next(level for level in game.levels if isinstance(level, kind))
+
+
+def test_ordered_set_snapshot_is_not_a_copy():
+    items = OrderedSet(["a", "b"])
+    snapshot = items.snapshot()
+    items.add("c")
+    assert snapshot[0] is items._order
+    assert OrderedSet.from_snapshot(snapshot).to_list() == ["a", "b"]
+
+
+def test_restore_puts_the_game_back(play):
+    game, _ = play(["Tester", "2"])
+    snapshot = game.snapshot()
+    cellar = level_of(game, CellarLevel)
+    health = cellar.Detective["health"]
+
+    game.inventory.add("A lamp")
+    game.levels[0].searched = True
+    cellar.Detective["health"] -= 3
+    game._current_level = 3
+
+    game.restore(snapshot)
+    assert "A lamp" not in game.inventory and game._current_level == 0
+    assert not game.levels[0].searched
+    assert cellar.Detective["health"] == health
+
+
+@pytest.fixture(params=["json", "sqlite", "binary"])
+def backend(request, tmp_path):
+    if request.param == "json":
+        return JsonSaveBackend(tmp_path / "save_game.json")
+    if request.param == "sqlite":
+        return SQLiteSaveBackend(tmp_path / "saves.db")
+    return BinarySaveBackend(tmp_path, static_text())
+
+
+def test_saves_keep_the_level_state(backend):
+    game = Game(io=ScriptedIO([]), save_backend=backend, seed=1)
+    game._player_name = "Tester"
+    game.levels[0].searched = True
+    cellar = level_of(game, CellarLevel)
+    cellar.Detective["health"] = 4
+    cellar.Skeleton["charge"] = True
+    final = level_of(game, FinalLevel)
+    final.in_chamber = True
+    game.save_game()
+    game.autosaver.flush()
+
+    loaded = Game(io=ScriptedIO([]), save_backend=backend, seed=1)
+    with pytest.raises(EOFError):
+        asyncio.run(loaded.load_game("Tester"))
+    assert loaded.levels[0].searched
+    assert level_of(loaded, CellarLevel).Detective["health"] == 4
+    assert level_of(loaded, CellarLevel).Skeleton["charge"] is True
+    assert level_of(loaded, FinalLevel).in_chamber
+
+
+def test_older_saves_without_levels_still_load(tmp_path):
+    backend = JsonSaveBackend(tmp_path / "save_game.json")
+    backend.save({"player_name": "Tester", "current_level": 1, "witness_statements": [], "suspect_motives": [],
+                  "inventory": ["Broken Key Part 1"]})
+
+    game = Game(io=ScriptedIO([]), save_backend=backend, seed=1)
+    with pytest.raises(EOFError):
+        asyncio.run(game.load_game("Tester"))
+    assert game._current_level == 1 and not game.levels[1].searched